@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, Request
+import httpx
+from cache import TTLCache
+from config import Settings
+from github_client import endpoint_timeout
+from security import token_fingerprint
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# GitHub only serves public events from the last 90 days (at most 300 of them)
+EVENT_RETENTION_DAYS = 90
+MAX_EVENT_PAGES = 3
+# The only repository fields summarize reads; the rest of GitHub's ~80 are dropped
+REPOSITORY_FIELDS = (
+    "id", "name", "full_name", "html_url", "language", "stargazers_count",
+    "forks_count", "pushed_at", "updated_at", "private",
+)
+
+
+@dataclass
+class AnalyticsState:
+    """Per-user aggregation state kept between visits
+
+    Events are folded in incrementally: each refresh only walks the event
+    feed until it reaches an event id that was already counted.
+    """
+    login: str
+    repositories: List[dict] = field(default_factory=list)
+    # event id -> (day, commits pushed)
+    events: Dict[str, Tuple[str, int]] = field(default_factory=dict)
+    summary: Optional[dict] = None
+
+
+def last_page(response: httpx.Response) -> int:
+    """Page count from GitHub's Link header (1 when there is no next page)"""
+    last = response.links.get("last", {}).get("url")
+    if not last:
+        return 1
+    try:
+        return int(httpx.URL(last).params.get("page", 1))
+    except ValueError:
+        return 1
+
+
+def slim_repository(repo: dict) -> dict:
+    """Keep only the fields the aggregates need so cached states stay small"""
+    return {name: repo.get(name) for name in REPOSITORY_FIELDS}
+
+
+def summarize(state: AnalyticsState, activity_days: int, now: datetime) -> dict:
+    """Compute language, star and activity aggregates from the current state"""
+    repositories = state.repositories
+    languages = Counter(repo["language"] for repo in repositories if repo.get("language"))
+    top_repositories = sorted(repositories, key=lambda repo: repo["stargazers_count"], reverse=True)[:5]
+
+    since = (now - timedelta(days=activity_days)).date().isoformat()
+    activity = Counter(day for day, _ in state.events.values() if day >= since)
+
+    return {
+        "login": state.login,
+        "total_repos": len(repositories),
+        "public_repos": sum(1 for repo in repositories if not repo.get("private")),
+        "private_repos": sum(1 for repo in repositories if repo.get("private")),
+        "total_stars": sum(repo["stargazers_count"] for repo in repositories),
+        "total_forks": sum(repo["forks_count"] for repo in repositories),
+        "languages": dict(languages.most_common()),
+        "top_languages": languages.most_common(5),
+        "top_repositories": [
+            {
+                "id": repo["id"],
+                "name": repo["name"],
+                "html_url": repo["html_url"],
+                "stargazers_count": repo["stargazers_count"],
+                "forks_count": repo["forks_count"],
+            }
+            for repo in top_repositories
+        ],
+        "total_commits": sum(commits for _, commits in state.events.values()),
+        "active_days": len(activity),
+        "activity": dict(sorted(activity.items())),
+        "generated_at": now.isoformat(),
+    }
+
+
+class AnalyticsService:
+    """Server-side replacement for the Analytics page's browser fan-out
+
+    Repository pages are fetched concurrently through the shared client, the
+    aggregates are computed here and cached per token so repeat visits cost a
+    single cheap request. Concurrent visits by the same user share one
+    computation.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        settings: Settings,
+        rate_limits=None,
+        ttl: float = 300.0,
+        retention: float = 86400.0,
+        max_entries: int = 1024,
+        page_concurrency: int = 4,
+        max_repo_pages: int = 10,
+        activity_days: int = 30,
+        clock=time.time,
+    ):
+        self.client = client
+        self.settings = settings
+        self.rate_limits = rate_limits
+        # Stale states are retained so the next refresh can be incremental
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl, stale_window=retention, clock=clock)
+        self.flight = SingleFlight()
+        self.page_concurrency = page_concurrency
+        self.max_repo_pages = max_repo_pages
+        self.activity_days = activity_days
+        self._clock = clock
+
+    async def _get(self, path: str, github_token: str, params: Optional[dict] = None) -> httpx.Response:
+        if self.rate_limits is not None:
+            await self.rate_limits.acquire(github_token, "core")
+        try:
+            response = await self.client.get(
+                f"{self.settings.github_api_base}{path}",
+                params=params,
+                headers={
+                    "Authorization": f"Bearer {github_token}",
+                    "Accept": "application/vnd.github.v3+json",
+                },
+                timeout=endpoint_timeout(self.settings, self.settings.github_user_timeout),
+            )
+        except httpx.TimeoutException:
+            logger.error(f"GitHub API request timeout for {path}")
+            raise HTTPException(status_code=504, detail="Request timeout. Please try again.")
+        except httpx.RequestError as e:
+            logger.error(f"GitHub API connection error: {str(e)}")
+            raise HTTPException(status_code=503, detail="Connection error occurred")
+
+        if response.status_code == 401:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        if response.status_code != 200:
+            logger.error(f"GitHub API error for {path}: {response.status_code}")
+            raise HTTPException(status_code=response.status_code, detail="GitHub API error occurred")
+        return response
+
+    async def _fetch_repositories(self, github_token: str) -> List[dict]:
+        """Fetch every page of the user's repositories, pages 2..N concurrently"""
+        params = {"per_page": 100, "sort": "updated"}
+        first = await self._get("/user/repos", github_token, {**params, "page": 1})
+        pages = min(last_page(first), self.max_repo_pages)
+
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+
+        async def fetch(page: int) -> list:
+            async with semaphore:
+                response = await self._get("/user/repos", github_token, {**params, "page": page})
+                return [slim_repository(repo) for repo in response.json()]
+
+        rest = await asyncio.gather(*(fetch(page) for page in range(2, pages + 1)))
+        repositories = [slim_repository(repo) for repo in first.json()]
+        for page in rest:
+            repositories.extend(page)
+        return repositories
+
+    async def _fetch_new_events(self, state: AnalyticsState, github_token: str) -> Dict[str, Tuple[str, int]]:
+        """Events newer than the last counted one (the feed is newest first)"""
+        new_events = {}
+        for page in range(1, MAX_EVENT_PAGES + 1):
+            response = await self._get(
+                f"/users/{state.login}/events/public", github_token, {"per_page": 100, "page": page}
+            )
+            events = response.json()
+            for event in events:
+                if event["id"] in state.events:
+                    return new_events
+                commits = 0
+                if event["type"] == "PushEvent":
+                    commits = len((event.get("payload") or {}).get("commits") or [])
+                new_events[event["id"]] = (event["created_at"][:10], commits)
+            if len(events) < 100:
+                break
+        return new_events
+
+    def _prune_events(self, state: AnalyticsState, now: datetime):
+        cutoff = (now - timedelta(days=EVENT_RETENTION_DAYS)).date().isoformat()
+        state.events = {event_id: event for event_id, event in state.events.items() if event[0] >= cutoff}
+
+    async def _compute(self, key: str, github_token: str, previous: Optional[AnalyticsState]) -> dict:
+        if previous is None:
+            user = await self._get("/user", github_token)
+            state = AnalyticsState(login=user.json()["login"])
+        else:
+            state = previous
+
+        repositories, new_events = await asyncio.gather(
+            self._fetch_repositories(github_token),
+            self._fetch_new_events(state, github_token),
+        )
+        # Only merge once everything succeeded so a failed refresh can simply be retried
+        state.repositories = repositories
+        state.events.update(new_events)
+
+        now = datetime.fromtimestamp(self._clock(), timezone.utc)
+        self._prune_events(state, now)
+        state.summary = summarize(state, self.activity_days, now)
+        await self.cache.set(key, state)
+        return state.summary
+
+    async def get(self, github_token: str) -> dict:
+        """Aggregated analytics for a token, recomputed at most once per TTL"""
+        key = f"analytics:{token_fingerprint(github_token)}"
+        entry = await self.cache.get_entry(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            return entry.value.summary
+
+        previous = entry.value if entry is not None else None
+        return await self.flight.do(key, lambda: self._compute(key, github_token, previous))
+
+
+async def get_analytics(request: Request) -> AnalyticsService:
+    """Dependency returning the app-wide analytics service"""
+    return request.app.state.analytics
@@ -0,0 +1,193 @@
+"""Local stand-in for the parts of the GitHub API the backend calls
+
+Serves /search/repositories and /user over real HTTP (so the pooled client,
+keep-alive and timeouts behave as in production) with configurable latency,
+rate-limit headers and error injection. Responses are deterministic for a
+given seed so benchmark runs are comparable.
+"""
+import asyncio
+import hashlib
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Tuple
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+@dataclass
+class FakeGitHubConfig:
+    latency: float = 0.05
+    jitter: float = 0.01
+    rate_limit: int = 1_000_000
+    rate_window: float = 60.0
+    error_rate: float = 0.0
+    seed: int = 1234
+
+
+def repository(repo_id: int, query: str) -> dict:
+    """A search item roughly as wide as GitHub's (most fields are dropped by our models)"""
+    name = f"{query.split()[0] if query.split() else 'repo'}-{repo_id}"
+    api = f"https://api.github.com/repos/bench/{name}"
+    item = {
+        "id": repo_id,
+        "node_id": f"R_{repo_id:010d}",
+        "name": name,
+        "full_name": f"bench/{name}",
+        "private": False,
+        "owner": {
+            "login": "bench",
+            "id": 1,
+            "avatar_url": "https://avatars.githubusercontent.com/u/1?v=4",
+            "html_url": "https://github.com/bench",
+            "type": "User",
+        },
+        "html_url": f"https://github.com/bench/{name}",
+        "description": f"Benchmark repository {repo_id} for {query}",
+        "fork": False,
+        "created_at": "2020-01-01T00:00:00Z",
+        "updated_at": "2024-01-01T00:00:00Z",
+        "pushed_at": "2024-01-01T00:00:00Z",
+        "stargazers_count": 100000 - repo_id,
+        "watchers_count": 100000 - repo_id,
+        "forks_count": repo_id % 1000,
+        "open_issues_count": repo_id % 50,
+        "language": ("Python", "Go", "Rust", "TypeScript")[repo_id % 4],
+        "topics": ["benchmark"],
+        "default_branch": "main",
+        "score": 1.0,
+    }
+    for name in ("forks", "keys", "hooks", "events", "branches", "tags", "languages",
+                 "stargazers", "contributors", "commits", "issues", "pulls", "releases"):
+        item[f"{name}_url"] = f"{api}/{name}"
+    return item
+
+
+class FakeGitHub:
+    def __init__(self, config: FakeGitHubConfig):
+        self.base_config = config
+        self.config = config
+        self.random = random.Random(config.seed)
+        # bucket -> (remaining, window reset epoch)
+        self.budgets: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self.requests = 0
+        self.app = Starlette(routes=[
+            Route("/search/repositories", self.search),
+            Route("/user", self.user),
+        ])
+
+    def reset(self, **overrides):
+        """Start a scenario: fresh budgets, counters and random stream, optional config changes"""
+        self.config = replace(self.base_config, **overrides)
+        self.random = random.Random(self.config.seed)
+        self.budgets.clear()
+        self.requests = 0
+
+    async def _delay(self):
+        delay = self.config.latency + self.random.uniform(-self.config.jitter, self.config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _rate_limit(self, request: Request, resource: str) -> Tuple[dict, bool]:
+        token = request.headers.get("authorization", "anonymous")
+        now = time.time()
+        remaining, reset = self.budgets.get((token, resource), (self.config.rate_limit, now + self.config.rate_window))
+        if now >= reset:
+            remaining, reset = self.config.rate_limit, now + self.config.rate_window
+        exhausted = remaining <= 0
+        remaining = max(remaining - 1, 0)
+        self.budgets[(token, resource)] = (remaining, reset)
+        headers = {
+            "x-ratelimit-limit": str(self.config.rate_limit),
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": str(int(reset)),
+            "x-ratelimit-resource": resource,
+        }
+        return headers, exhausted
+
+    async def _preamble(self, request: Request, resource: str):
+        self.requests += 1
+        await self._delay()
+        headers, exhausted = self._rate_limit(request, resource)
+        if exhausted:
+            return headers, JSONResponse({"message": "API rate limit exceeded"}, status_code=403, headers=headers)
+        if self.config.error_rate and self.random.random() < self.config.error_rate:
+            return headers, JSONResponse({"message": "Server Error"}, status_code=502)
+        return headers, None
+
+    async def search(self, request: Request) -> Response:
+        headers, failure = await self._preamble(request, "search")
+        if failure is not None:
+            return failure
+        query = request.query_params.get("q", "")
+        page = int(request.query_params.get("page", 1))
+        per_page = int(request.query_params.get("per_page", 30))
+        base = int(hashlib.sha256(query.encode()).hexdigest()[:6], 16) * 1000
+        start = (page - 1) * per_page
+        items = [repository(base + start + i, query) for i in range(per_page)]
+        return JSONResponse(
+            {"total_count": 1000, "incomplete_results": False, "items": items}, headers=headers
+        )
+
+    async def user(self, request: Request) -> Response:
+        headers, failure = await self._preamble(request, "core")
+        if failure is not None:
+            return failure
+        token = request.headers.get("authorization", "")
+        if not token.startswith("Bearer "):
+            return JSONResponse({"message": "Requires authentication"}, status_code=401)
+        user_id = int(hashlib.sha256(token.encode()).hexdigest()[:6], 16)
+        etag = f'W/"{user_id:x}"'
+        headers["etag"] = etag
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(
+            {
+                "id": user_id,
+                "login": f"bench-{user_id}",
+                "avatar_url": "https://avatars.githubusercontent.com/u/1?v=4",
+                "name": "Bench User",
+                "bio": None,
+            },
+            headers=headers,
+        )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeGitHubServer:
+    """Run the fake API with uvicorn in a background thread for the benchmark's duration"""
+
+    def __init__(self, config: FakeGitHubConfig = None, port: int = None):
+        self.fake = FakeGitHub(config or FakeGitHubConfig())
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(
+            self.fake.app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False,
+        ))
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "FakeGitHubServer":
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Fake GitHub server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self._thread.join(timeout=5)
@@ -0,0 +1,313 @@
+"""Load test: drive the API at fixed concurrency against a fake GitHub
+
+Run from the backend directory:
+
+    python -m benchmarks.loadtest                      # all scenarios, compare with baselines
+    python -m benchmarks.loadtest search_hot user_github --requests 1000
+    python -m benchmarks.loadtest --save-baseline      # record new baselines
+
+The app runs in-process (through the ASGI transport, so no socket noise on
+our side) with its real lifespan, caches, database and Argon2 pool; only
+GitHub is replaced, by benchmarks.fake_github served over localhost HTTP.
+Each scenario reports throughput, p50/p95/p99 latency, status codes and
+how much resident memory it added. With baselines present, a throughput drop or p95 increase beyond
+the tolerance exits non-zero so request-path regressions are caught.
+Baselines are machine specific: record them on the machine that compares.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+import httpx
+from benchmarks.fake_github import FakeGitHubConfig, FakeGitHubServer
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+# (client, request number) -> response
+RequestFn = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    request: RequestFn
+    requests: int = 500
+    concurrency: int = 16
+    setup: Optional[Callable[[httpx.AsyncClient], Awaitable[None]]] = None
+    # Fake GitHub settings for this scenario (latency, error_rate, ...)
+    github: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class Result:
+    scenario: str
+    requests: int
+    concurrency: int
+    duration: float
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    status_codes: Dict[str, int]
+    github_requests: int
+    # Resident memory gained while the scenario ran (not the process peak)
+    rss_growth_mb: Optional[float]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident memory of this process (None where it can't be read)"""
+    gc.collect()
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+# Scenarios
+
+async def search_cold(client: httpx.AsyncClient, i: int) -> httpx.Response:
+    # Every query is new: cache miss, upstream call, index ingest and page-2 prefetch
+    return await client.get("/api/search", params={"q": f"cold{i}", "per_page": 30})
+
+
+async def search_degraded(client: httpx.AsyncClient, i: int) -> httpx.Response:
+    return await client.get("/api/search", params={"q": f"degraded{i}", "per_page": 30})
+
+
+async def search_hot(client: httpx.AsyncClient, i: int) -> httpx.Response:
+    return await client.get("/api/search", params={"q": f"hot{i % 10}", "per_page": 30})
+
+
+async def user_github(client: httpx.AsyncClient, i: int) -> httpx.Response:
+    return await client.get("/api/user", params={"authorization": f"Bearer gho_bench_{i % 20}"})
+
+
+async def login_once(client: httpx.AsyncClient) -> str:
+    response = await client.post("/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    return response.json()["access_token"]
+
+
+async def ensure_bench_user(client: httpx.AsyncClient):
+    await client.post(
+        "/auth/register",
+        json={"email": BENCH_EMAIL, "username": "bench", "password": BENCH_PASSWORD},
+    )
+
+
+_state: Dict[str, str] = {}
+
+
+async def setup_user_local(client: httpx.AsyncClient):
+    await ensure_bench_user(client)
+    _state["token"] = await login_once(client)
+
+
+async def user_local(client: httpx.AsyncClient, i: int) -> httpx.Response:
+    return await client.get("/api/user", params={"authorization": f"Bearer {_state['token']}"})
+
+
+async def login(client: httpx.AsyncClient, i: int) -> httpx.Response:
+    return await client.post("/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+
+
+async def register(client: httpx.AsyncClient, i: int) -> httpx.Response:
+    run = _state.setdefault("run", str(int(time.time())))
+    return await client.post(
+        "/auth/register",
+        json={"email": f"bench-{run}-{i}@example.com", "username": f"bench{i}", "password": BENCH_PASSWORD},
+    )
+
+
+SCENARIOS = [
+    Scenario("search_cold", "/api/search, unique queries (upstream on every request)", search_cold),
+    Scenario("search_hot", "/api/search, 10 repeated queries (cache hits)", search_hot, requests=2000),
+    Scenario(
+        "search_degraded", "/api/search against a slow upstream failing 5% of calls", search_degraded,
+        requests=300, github={"latency": 0.2, "jitter": 0.05, "error_rate": 0.05},
+    ),
+    Scenario("user_github", "/api/user with 20 GitHub tokens (cached profiles)", user_github, requests=1000),
+    Scenario("user_local", "/api/user with a local JWT (database lookup)", user_local, requests=1000, setup=setup_user_local),
+    Scenario("login", "/auth/login (Argon2 verify on the hashing pool)", login, requests=40, concurrency=4, setup=ensure_bench_user),
+    Scenario("register", "/auth/register with unique emails (Argon2 hash + insert)", register, requests=40, concurrency=4),
+]
+
+
+async def run_scenario(client: httpx.AsyncClient, server: FakeGitHubServer, scenario: Scenario) -> Result:
+    if scenario.setup is not None:
+        await scenario.setup(client)
+    server.fake.reset(**scenario.github)
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = iter(range(scenario.requests))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await scenario.request(client, i)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(scenario.concurrency)))
+    duration = time.perf_counter() - start
+    rss_after = rss_mb()
+
+    latencies.sort()
+    return Result(
+        scenario=scenario.name,
+        requests=scenario.requests,
+        concurrency=scenario.concurrency,
+        duration=round(duration, 3),
+        throughput=round(scenario.requests / duration, 1),
+        p50_ms=round(percentile(latencies, 50) * 1000, 2),
+        p95_ms=round(percentile(latencies, 95) * 1000, 2),
+        p99_ms=round(percentile(latencies, 99) * 1000, 2),
+        status_codes=dict(sorted(statuses.items())),
+        github_requests=server.fake.requests,
+        rss_growth_mb=round(rss_after - rss_before, 1) if rss_before is not None else None,
+    )
+
+
+def compare(result: Result, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of ``result`` against a stored baseline (empty when within tolerance)"""
+    problems = []
+    if result.throughput < baseline["throughput"] * (1 - tolerance):
+        problems.append(f"throughput {result.throughput}/s vs baseline {baseline['throughput']}/s")
+    if result.p95_ms > baseline["p95_ms"] * (1 + tolerance):
+        problems.append(f"p95 {result.p95_ms}ms vs baseline {baseline['p95_ms']}ms")
+    # A handler failing fast looks like a speed-up, so new status codes count too
+    new_statuses = set(result.status_codes) - set(baseline["status_codes"])
+    if new_statuses:
+        problems.append(f"new status codes {sorted(new_statuses)}")
+    return problems
+
+
+def configure_backend(github_url: str, workdir: str):
+    """Point the app at the fake GitHub and throwaway storage before it is imported"""
+    os.environ.update({
+        "GITHUB_CLIENT_ID": "bench",
+        "GITHUB_CLIENT_SECRET": "bench",
+        "SECRET_KEY": "bench-secret-key",
+        "FRONTEND_URL": "http://localhost:5173",
+        "GITHUB_API_BASE": github_url,
+        "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+        "SEARCH_INDEX_PATH": f"{workdir}/search_index.db",
+        "CACHE_BACKEND": "memory",
+        # Background refresh loops would add load the scenarios don't control
+        "SEARCH_HOT_REFRESH_INTERVAL": "0",
+        "SAVED_REFRESH_INTERVAL": "0",
+        # Every simulated user shares one IP here; per-client quotas would just measure 429s
+        "CLIENT_RATE_LIMIT_ENABLED": "false",
+    })
+
+
+async def run(scenarios: List[Scenario], server: FakeGitHubServer) -> List[Result]:
+    from main import app
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for scenario in scenarios:
+                result = await run_scenario(client, server, scenario)
+                growth = "n/a" if result.rss_growth_mb is None else f"{result.rss_growth_mb:+}MB"
+                print(
+                    f"{result.scenario:<16} {result.throughput:>8.1f} req/s  "
+                    f"p50 {result.p50_ms:>8.2f}ms  p95 {result.p95_ms:>8.2f}ms  p99 {result.p99_ms:>8.2f}ms  "
+                    f"rss {growth}  {result.status_codes}"
+                )
+                results.append(result)
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", help="Scenario names (default: all)")
+    parser.add_argument("--requests", type=int, help="Override requests per scenario")
+    parser.add_argument("--concurrency", type=int, help="Override concurrency per scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake GitHub latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake GitHub calls failing with 502")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to benchmarks/baselines")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's upstream error logs")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression vs baseline (fraction)")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        # Injected upstream failures would otherwise flood the output
+        logging.disable(logging.ERROR)
+
+    by_name = {scenario.name: scenario for scenario in SCENARIOS}
+    unknown = [name for name in args.scenarios if name not in by_name]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(by_name)})")
+    scenarios = [by_name[name] for name in args.scenarios] or SCENARIOS
+    for scenario in scenarios:
+        scenario.requests = args.requests or scenario.requests
+        scenario.concurrency = args.concurrency or scenario.concurrency
+
+    config = FakeGitHubConfig(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    with tempfile.TemporaryDirectory() as workdir, FakeGitHubServer(config) as server:
+        configure_backend(server.url, workdir)
+        results = asyncio.run(run(scenarios, server))
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        for result in results:
+            baseline = {
+                **asdict(result),
+                "github": {**asdict(config), **by_name[result.scenario].github},
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            }
+            (BASELINE_DIR / f"{result.scenario}.json").write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Saved {len(results)} baselines to {BASELINE_DIR}")
+        return 0
+
+    failed = False
+    for result in results:
+        path = BASELINE_DIR / f"{result.scenario}.json"
+        if not path.exists():
+            continue
+        problems = compare(result, json.loads(path.read_text()), args.tolerance)
+        if problems:
+            failed = True
+            print(f"REGRESSION {result.scenario}: {'; '.join(problems)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Microbenchmark: parsing and rendering a 100-item GitHub search page
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization
+"""
+import json
+import timeit
+import httpx
+from fastapi.encoders import jsonable_encoder
+from models.searchresponse import SearchResponse
+
+try:
+    import orjson
+except ImportError:  # optional, only used for comparison
+    orjson = None
+
+
+def github_item(repo_id: int) -> dict:
+    """A repository roughly as wide as GitHub returns it (~90 fields incl. owner)"""
+    api = f"https://api.github.com/repos/owner/repo-{repo_id}"
+    item = {
+        "id": repo_id,
+        "node_id": "R_kgDOAbCdEf",
+        "name": f"repo-{repo_id}",
+        "full_name": f"owner/repo-{repo_id}",
+        "private": False,
+        "owner": {
+            "login": "owner",
+            "id": 1,
+            "avatar_url": "https://avatars.githubusercontent.com/u/1?v=4",
+            "type": "User",
+            "site_admin": False,
+            **{f"{name}_url": f"https://api.github.com/users/owner/{name}" for name in (
+                "html", "followers", "following", "gists", "starred", "subscriptions",
+                "organizations", "repos", "events", "received_events",
+            )},
+        },
+        "html_url": f"https://github.com/owner/repo-{repo_id}",
+        "description": "A fairly typical repository description of moderate length.",
+        "fork": False,
+        "created_at": "2020-01-01T00:00:00Z",
+        "updated_at": "2024-01-01T00:00:00Z",
+        "pushed_at": "2024-01-01T00:00:00Z",
+        "size": 1024,
+        "stargazers_count": 1000 - repo_id,
+        "watchers_count": 1000 - repo_id,
+        "forks_count": 42,
+        "open_issues_count": 7,
+        "language": "Python",
+        "topics": ["api", "web", "python"],
+        "license": {"key": "mit", "name": "MIT License", "spdx_id": "MIT"},
+        "default_branch": "main",
+        "score": 1.0,
+    }
+    for name in (
+        "forks", "keys", "collaborators", "teams", "hooks", "issue_events", "events",
+        "assignees", "branches", "tags", "blobs", "git_tags", "git_refs", "trees",
+        "statuses", "languages", "stargazers", "contributors", "subscribers",
+        "subscription", "commits", "git_commits", "comments", "issue_comment",
+        "contents", "compare", "merges", "archive", "downloads", "issues", "pulls",
+        "milestones", "notifications", "labels", "releases", "deployments",
+    ):
+        item[f"{name}_url"] = f"{api}/{name}"
+    return item
+
+
+PAYLOAD = json.dumps({
+    "total_count": 100000,
+    "incomplete_results": False,
+    "items": [github_item(i) for i in range(100)],
+}).encode()
+
+
+def upstream_response() -> httpx.Response:
+    return httpx.Response(200, content=PAYLOAD, headers={"content-type": "application/json"})
+
+
+def legacy_path() -> bytes:
+    """response.json() -> SearchResponse(...) -> response_model re-validation -> stdlib json"""
+    data = upstream_response().json()
+    result = SearchResponse(
+        total_count=data["total_count"],
+        items=data["items"],
+        incomplete_results=data["incomplete_results"],
+    )
+    revalidated = SearchResponse.model_validate(result.model_dump())
+    return json.dumps(jsonable_encoder(revalidated), separators=(",", ":")).encode()
+
+
+def orjson_path() -> bytes:
+    """orjson parse -> validate -> orjson render"""
+    data = orjson.loads(upstream_response().content)
+    result = SearchResponse.model_validate(data)
+    return orjson.dumps(result.model_dump())
+
+
+def fast_path() -> bytes:
+    """What fetch_search/model_response do: one validating parse, direct JSON render"""
+    result = SearchResponse.model_validate_json(upstream_response().content)
+    return result.model_dump_json().encode()
+
+
+def main(number: int = 200, repeat: int = 5):
+    paths = [legacy_path, fast_path]
+    if orjson is not None:
+        paths.insert(1, orjson_path)
+
+    # All paths must agree on the rendered document
+    expected = json.loads(legacy_path())
+    for path in paths:
+        assert json.loads(path()) == expected, path.__name__
+
+    baseline = None
+    for path in paths:
+        best = min(timeit.repeat(path, number=number, repeat=repeat)) / number
+        baseline = baseline or best
+        print(f"{path.__name__:<12} {best * 1e3:8.3f} ms/page  {baseline / best:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from fastapi import Request
+from config import Settings
+from models.searchresponse import SearchResponse
+from security import token_fingerprint
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    fresh_until: float
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+    @property
+    def has_validators(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+def encode_entry(entry: CacheEntry, level: int = 6) -> bytes:
+    """Serialize an entry to compressed JSON for shared (cross-worker) stores"""
+    if isinstance(entry.value, SearchResponse):
+        kind, data = "search", entry.value.model_dump(mode="json")
+    else:
+        kind, data = "json", entry.value
+    document = {
+        "kind": kind,
+        "value": data,
+        "fresh_until": entry.fresh_until,
+        "expires_at": entry.expires_at,
+        "etag": entry.etag,
+        "last_modified": entry.last_modified,
+    }
+    return zlib.compress(json.dumps(document, separators=(",", ":")).encode(), level)
+
+
+def decode_entry(payload: bytes) -> CacheEntry:
+    document = json.loads(zlib.decompress(payload))
+    value = document["value"]
+    if document["kind"] == "search":
+        value = SearchResponse.model_validate(value)
+    return CacheEntry(
+        value=value,
+        fresh_until=document["fresh_until"],
+        expires_at=document["expires_at"],
+        etag=document["etag"],
+        last_modified=document["last_modified"],
+    )
+
+
+class CacheBackend:
+    """Storage for cache entries; freshness policy and counters live in TTLCache"""
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    async def set(self, key: str, entry: CacheEntry) -> int:
+        """Store an entry and return how many entries were evicted to make room"""
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+    async def size(self) -> int:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU store holding live objects (no serialization cost)"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry) -> int:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """On-disk store shared by all workers on a host and surviving restarts
+
+    Uses WAL journaling so readers in one worker never block writers in
+    another. Queries run in a worker thread to keep the event loop free.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        table: str = "cache_entries",
+        max_entries: int = 1024,
+        compression_level: int = 6,
+        clock: Callable[[], float] = time.time,
+    ):
+        if not table.replace("_", "").isalnum():
+            raise ValueError(f"Invalid cache table name: {table}")
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.compression_level = compression_level
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, payload BLOB NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_accessed ON {table} (accessed_at)")
+
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT payload, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = self._clock()
+            if row[1] <= now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        return decode_entry(row[0])
+
+    def _set(self, key: str, payload: bytes, expires_at: float) -> int:
+        with self._lock:
+            now = self._clock()
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, payload, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, expires_at, now),
+            )
+            self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            excess = count - self.max_entries
+            if excess <= 0:
+                return 0
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            return excess
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, entry: CacheEntry) -> int:
+        payload = encode_entry(entry, self.compression_level)
+        return await asyncio.to_thread(self._set, key, payload, entry.expires_at)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._execute, f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    async def clear(self):
+        await asyncio.to_thread(self._execute, f"DELETE FROM {self.table}")
+
+    async def size(self) -> int:
+        rows = await asyncio.to_thread(self._execute, f"SELECT COUNT(*) FROM {self.table}")
+        return rows[0][0]
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Store shared by every worker and host through any Redis-protocol server
+
+    Expiry is delegated to the server (PX on SET) and memory bounds to its
+    ``maxmemory-policy``. ``client`` may be any object exposing the async
+    ``redis.asyncio.Redis`` methods used here, which is how tests run it.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        prefix: str = "lens:cache:",
+        compression_level: int = 6,
+        client=None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("cache_backend='redis' requires the 'redis' package") from e
+            client = redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.compression_level = compression_level
+        self._clock = clock
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        payload = await self.client.get(self.prefix + key)
+        return decode_entry(payload) if payload is not None else None
+
+    async def set(self, key: str, entry: CacheEntry) -> int:
+        ttl_ms = int((entry.expires_at - self._clock()) * 1000)
+        if ttl_ms <= 0:
+            await self.delete(key)
+            return 0
+        await self.client.set(self.prefix + key, encode_entry(entry, self.compression_level), px=ttl_ms)
+        return 0
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    async def clear(self):
+        keys = [key async for key in self.client.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def size(self) -> int:
+        return len([key async for key in self.client.scan_iter(match=self.prefix + "*")])
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_cache_backend(settings: Settings, namespace: str, max_entries: int) -> CacheBackend:
+    """Build the configured storage backend for one cache namespace"""
+    if settings.cache_backend == "sqlite":
+        return SQLiteCacheBackend(
+            settings.cache_sqlite_path,
+            table=f"cache_{namespace}",
+            max_entries=max_entries,
+            compression_level=settings.cache_compression_level,
+        )
+    if settings.cache_backend == "redis":
+        return RedisCacheBackend(
+            settings.cache_redis_url,
+            prefix=f"lens:{namespace}:",
+            compression_level=settings.cache_compression_level,
+        )
+    if settings.cache_backend != "memory":
+        raise ValueError(f"Unknown cache backend: {settings.cache_backend}")
+    return MemoryCacheBackend(max_entries)
+
+
+class TTLCache:
+    """Bounded cache with per-entry TTL over a pluggable storage backend
+
+    Entries are fresh for ``ttl`` seconds. When ``retention`` is set, stale
+    entries carrying an ETag/Last-Modified are kept that much longer so they
+    can be revalidated upstream with a conditional request instead of being
+    re-fetched in full. Every entry is kept for at least ``stale_window``
+    seconds past its TTL so it can be served while a refresh runs.
+
+    Times are wall-clock so entries written by one worker are judged the
+    same way by the others when the backend is shared.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 60.0,
+        retention: float = 0.0,
+        stale_window: float = 0.0,
+        backend: Optional[CacheBackend] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.retention = retention
+        self.stale_window = stale_window
+        self.backend = backend if backend is not None else MemoryCacheBackend(max_entries)
+        self._clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self.stale_served = 0
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.is_fresh(self._clock())
+
+    def within_stale_window(self, entry: CacheEntry) -> bool:
+        """Whether a stale entry may still be served while it is refreshed"""
+        return self._clock() < entry.fresh_until + self.stale_window
+
+    def expires_within(self, entry: CacheEntry, seconds: float) -> bool:
+        return entry.fresh_until - self._clock() <= seconds
+
+    def _keep_for(self, has_validators: bool) -> float:
+        return max(self.stale_window, self.retention if has_validators else 0.0)
+
+    async def _live_entry(self, key: str) -> Optional[CacheEntry]:
+        entry = await self.backend.get(key)
+        if entry is not None and entry.expires_at <= self._clock():
+            await self.backend.delete(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the value only if it is still fresh"""
+        entry = await self.get_entry(key)
+        if entry is None or not entry.is_fresh(self._clock()):
+            return None
+        return entry.value
+
+    async def peek(self, key: str) -> Optional[CacheEntry]:
+        """Look an entry up without touching counters"""
+        entry = await self.backend.get(key)
+        if entry is None or entry.expires_at <= self._clock():
+            return None
+        return entry
+
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry, fresh or stale-but-retained; stale lookups count as misses"""
+        entry = await self._live_entry(key)
+        if entry is None or not entry.is_fresh(self._clock()):
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        ttl = self.ttl if ttl is None else ttl
+        now = self._clock()
+        # Only entries that can be revalidated are worth keeping past the stale window
+        retention = self._keep_for(bool(etag or last_modified))
+        entry = CacheEntry(
+            value=value,
+            fresh_until=now + ttl,
+            expires_at=now + ttl + retention,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        self.evictions += await self.backend.set(key, entry)
+
+    async def touch(self, key: str, ttl: Optional[float] = None) -> Optional[CacheEntry]:
+        """Mark an entry fresh again after upstream answered 304 Not Modified"""
+        ttl = self.ttl if ttl is None else ttl
+        self.revalidations += 1
+        self.not_modified += 1
+        entry = await self.backend.get(key)
+        if entry is None:
+            return None
+        now = self._clock()
+        entry.fresh_until = now + ttl
+        entry.expires_at = now + ttl + self._keep_for(entry.has_validators)
+        self.evictions += await self.backend.set(key, entry)
+        return entry
+
+    def record_revalidation(self):
+        """Count a conditional request that returned a new body"""
+        self.revalidations += 1
+
+    async def delete(self, key: str):
+        await self.backend.delete(key)
+
+    async def clear(self):
+        await self.backend.clear()
+
+    async def close(self):
+        await self.backend.close()
+
+    async def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": await self.backend.size(),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "stale_window": self.stale_window,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "revalidations": self.revalidations,
+            "not_modified": self.not_modified,
+            "stale_served": self.stale_served,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+async def get_search_cache(request: Request) -> Optional[TTLCache]:
+    """Dependency returning the search response cache (None when disabled)"""
+    return request.app.state.search_cache
+
+
+def user_cache_key(token: str) -> str:
+    """User cache key for a GitHub token (keyed by its fingerprint, never the token)"""
+    return f"user:{token_fingerprint(token)}"
+
+
+async def get_user_cache(request: Request) -> Optional[TTLCache]:
+    """Dependency returning the GitHub /user profile cache (None when disabled)"""
+    return request.app.state.user_cache
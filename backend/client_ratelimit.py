@@ -0,0 +1,309 @@
+import asyncio
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import HTTPException, Request
+from starlette.datastructures import Headers, QueryParams
+from cache import user_cache_key
+from config import Settings
+from principal import Principal, bearer_token, request_authorization
+
+
+@dataclass(frozen=True)
+class Quota:
+    """Token bucket: ``burst`` requests at once, refilled at ``rate`` per second"""
+    rate: float
+    burst: int
+
+
+def parse_quotas(spec: str) -> Dict[str, Quota]:
+    """Parse ``"/api/search=60/60,/api/analytics=20/60"`` (path=requests/seconds) into quotas"""
+    quotas = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        path, _, limit = part.partition("=")
+        requests, _, seconds = limit.partition("/")
+        try:
+            quotas[path.strip()] = Quota(rate=int(requests) / float(seconds), burst=int(requests))
+        except (ValueError, ZeroDivisionError):
+            raise ValueError(f"Invalid rate limit '{part}', expected path=requests/seconds")
+    return quotas
+
+
+# Bucket that fan-out routes (batch, stream) charge their GitHub searches to
+SEARCH_PATH = "/api/search"
+TOO_MANY_REQUESTS = "Too many requests. Please slow down."
+
+
+class BucketStore:
+    """Storage for token buckets; ``take`` must be atomic per key"""
+
+    async def take(self, key: str, quota: Quota, cost: int = 1) -> float:
+        """Spend ``cost`` tokens; returns 0 when allowed, else seconds until they are available"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+def refill(tokens: float, updated: float, now: float, quota: Quota, cost: int = 1) -> Tuple[float, float]:
+    """Apply the refill since ``updated`` and try to spend ``cost`` tokens -> (tokens left, wait)"""
+    # A cost above the burst could never be paid, so it empties a full bucket instead
+    cost = min(cost, quota.burst)
+    tokens = min(quota.burst, tokens + max(now - updated, 0.0) * quota.rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / quota.rate
+
+
+class MemoryBucketStore(BucketStore):
+    """Per-process buckets, least recently seen clients dropped past ``max_keys``"""
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, quota: Quota, cost: int = 1) -> float:
+        now = self._clock()
+        tokens, updated = self._buckets.pop(key, (quota.burst, now))
+        tokens, wait = refill(tokens, updated, now, quota, cost)
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteBucketStore(BucketStore):
+    """Buckets shared by every worker on a host through one SQLite file"""
+
+    def __init__(self, path: str, table: str = "client_rate_limits", clock: Callable[[], float] = time.time):
+        if not table.replace("_", "").isalnum():
+            raise ValueError(f"Invalid rate limit table name: {table}")
+        self.table = table
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._takes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _take(self, key: str, quota: Quota, cost: int) -> float:
+        with self._lock:
+            now = self._clock()
+            # IMMEDIATE takes the write lock up front so workers can't interleave read-modify-write
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT tokens, updated FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, wait = refill(*(row or (quota.burst, now)), now, quota, cost)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                self._takes += 1
+                if self._takes % 1000 == 0:
+                    # Idle buckets are full again after an hour at any sensible rate
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE updated < ?", (now - 3600,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def take(self, key: str, quota: Quota, cost: int = 1) -> float:
+        return await asyncio.to_thread(self._take, key, quota, cost)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Refill-and-take done atomically on the Redis server; the float is returned
+# as a string because Redis truncates Lua numbers to integers
+TAKE_SCRIPT = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local cost = math.min(tonumber(ARGV[4]), burst)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated, 0) * rate)
+local wait = 0
+if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisBucketStore(BucketStore):
+    """Buckets shared by every worker and host through a Redis-protocol server"""
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "lens:ratelimit:", client=None, clock: Callable[[], float] = time.time):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("client_rate_limit_backend='redis' requires the 'redis' package") from e
+            client = redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self._clock = clock
+
+    async def take(self, key: str, quota: Quota, cost: int = 1) -> float:
+        wait = await self.client.eval(TAKE_SCRIPT, 1, self.prefix + key, quota.rate, quota.burst, self._clock(), cost)
+        return float(wait)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_bucket_store(settings: Settings) -> BucketStore:
+    """Build the configured bucket storage (sharing the cache's SQLite file / Redis server)"""
+    if settings.client_rate_limit_backend == "sqlite":
+        return SQLiteBucketStore(settings.cache_sqlite_path)
+    if settings.client_rate_limit_backend == "redis":
+        return RedisBucketStore(settings.cache_redis_url)
+    if settings.client_rate_limit_backend != "memory":
+        raise ValueError(f"Unknown rate limit backend: {settings.client_rate_limit_backend}")
+    return MemoryBucketStore(settings.client_rate_limit_max_clients)
+
+
+class ClientRateLimiter:
+    """Per-client token buckets for the routes that have a quota
+
+    Clients are identified by local account (``LocalUser.id``), by GitHub
+    login for tokens whose profile is already in the /user cache, and by IP
+    address otherwise. Unverified bearer tokens deliberately fall back to the
+    IP so rotating made-up tokens doesn't buy a fresh bucket each time.
+
+    Each request costs one token from its route's bucket; routes fanning out
+    into several GitHub searches additionally pay per search from the
+    ``/api/search`` bucket through ``charge_search_calls``.
+    """
+
+    def __init__(self, store: BucketStore, quotas: Dict[str, Quota], trust_forwarded: bool = False):
+        self.store = store
+        self.quotas = quotas
+        self.trust_forwarded = trust_forwarded
+        self.allowed = 0
+        self.limited = 0
+
+    def client_ip(self, scope) -> str:
+        if self.trust_forwarded:
+            forwarded = Headers(scope=scope).get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def client_key(self, scope, principal: Principal, token: Optional[str], user_cache=None) -> str:
+        if principal.kind == "local" and principal.user_id is not None:
+            return f"user:{principal.user_id}"
+        if principal.kind == "github" and token and user_cache is not None:
+            entry = await user_cache.peek(user_cache_key(token))
+            if entry is not None and entry.value.get("login"):
+                return f"github:{entry.value['login']}"
+        return f"ip:{self.client_ip(scope)}"
+
+    async def check(self, path: str, key: str, cost: int = 1) -> float:
+        """Seconds the client must wait before calling ``path`` again (0 when allowed)"""
+        wait = await self.store.take(f"{path}|{key}", self.quotas[path], cost)
+        if wait > 0:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    async def close(self):
+        await self.store.close()
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "quotas": {path: {"requests": q.burst, "per_seconds": q.burst / q.rate} for path, q in self.quotas.items()},
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+def retry_after(wait: float) -> str:
+    return str(max(math.ceil(wait), 1))
+
+
+class ClientRateLimitMiddleware:
+    """ASGI middleware answering 429 + Retry-After once a client's bucket is empty
+
+    Reads the limiter and principal resolver from ``app.state`` so both share
+    the lifespan of the other app resources; requests pass straight through
+    when limiting is disabled or the route has no quota.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        state = scope["app"].state
+        limiter: Optional[ClientRateLimiter] = getattr(state, "client_limiter", None)
+        path = scope["path"]
+        if limiter is None or path not in limiter.quotas or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        # Same token sources as the routes: the Authorization header or ?authorization=
+        authorization = request_authorization(
+            Headers(scope=scope).get("authorization"),
+            QueryParams(scope["query_string"]).get("authorization"),
+        )
+        token = bearer_token(authorization)
+        principal = await state.principal_resolver.resolve(authorization)
+        key = await limiter.client_key(scope, principal, token, getattr(state, "user_cache", None))
+        # Routes charging per GitHub search (charge_search_calls) reuse the key
+        scope.setdefault("state", {})["client_key"] = key
+        wait = await limiter.check(path, key)
+        if wait <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": TOO_MANY_REQUESTS}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", retry_after(wait).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def charge_search_calls(request: Request, calls: int):
+    """Charge a fan-out route's GitHub searches to the caller's ``/api/search`` bucket
+
+    Batch and stream requests already paid one token on their own route;
+    this makes each search they trigger cost what a single search would.
+    """
+    limiter: Optional[ClientRateLimiter] = request.app.state.client_limiter
+    key = getattr(request.state, "client_key", None)
+    if limiter is None or key is None or SEARCH_PATH not in limiter.quotas:
+        return
+    wait = await limiter.check(SEARCH_PATH, key, cost=calls)
+    if wait > 0:
+        raise HTTPException(
+            status_code=429, detail=TOO_MANY_REQUESTS, headers={"Retry-After": retry_after(wait)}
+        )
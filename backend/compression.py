@@ -0,0 +1,140 @@
+import gzip
+from typing import Callable, Dict, Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+# brotli and zstandard are optional; without them only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Server preference when the client accepts several encodings equally
+PREFERENCE = ("zstd", "br", "gzip")
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def negotiate(accept_encoding: Optional[str], available) -> Optional[str]:
+    """Pick the best available encoding for an Accept-Encoding header (None for identity)"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag for an encoded variant: each representation needs its own validator"""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def decoded_etag(etag: str) -> str:
+    """Undo ``encoded_etag`` so conditional requests match the route's own ETag"""
+    for encoding in PREFERENCE:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def make_compressors(gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3) -> Dict[str, Callable[[bytes], bytes]]:
+    """Compressors for every encoding usable in this environment, in preference order"""
+    compressors = {}
+    if zstandard is not None:
+        zstd = zstandard.ZstdCompressor(level=zstd_level)
+        compressors["zstd"] = zstd.compress
+    if brotli is not None:
+        compressors["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+    compressors["gzip"] = lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return {name: compressors[name] for name in PREFERENCE if name in compressors}
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete JSON/text responses above a size threshold
+
+    Streamed responses (NDJSON/SSE search streams) pass through untouched so
+    events still reach the client as they are produced. Encoded variants get
+    the coding appended to their ETag (``"<tag>-gzip"``), as RFC 9110 requires
+    distinct strong validators per representation.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressors = make_compressors(gzip_level, brotli_quality, zstd_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), self.compressors)
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Hold the headers until we know whether the body is compressed
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            content_type = headers.get("content-type", "")
+            compressible = start["status"] == 200 and content_type.startswith(COMPRESSIBLE_TYPES)
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+
+            body = message.get("body", b"")
+            if (
+                not compressible
+                or encoding is None
+                or message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            body = self.compressors[encoding](body)
+            headers["Content-Encoding"] = encoding
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], encoding)
+            headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
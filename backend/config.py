@@ -9,10 +9,141 @@ class Settings(BaseSettings):
     frontend_url: str
     github_api_base: str = "https://api.github.com"
     github_oauth_base: str = "https://github.com"
-    
+    # Search provider: "rest" (/search/repositories) or "graphql" (authenticated calls only)
+    search_provider: str = "rest"
+
+    # Response compression (gzip; br/zstd when brotli/zstandard are installed)
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    # Browser/CDN caching of /api/search responses (ETag + Cache-Control max-age)
+    search_http_max_age: int = 60
+
+    # Prometheus-style /metrics; nothing is instrumented while disabled
+    metrics_enabled: bool = False
+
+    # Database
+    database_url: str = "sqlite:///./scheduler.db"
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30.0
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+
+    # Password hashing (Argon2id) worker pool
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536
+    argon2_parallelism: int = 4
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 16
+
+    # Shared GitHub HTTP client (connection pool)
+    github_http2: bool = False
+    github_max_connections: int = 100
+    github_max_keepalive_connections: int = 20
+    github_keepalive_expiry: float = 30.0
+    github_connect_timeout: float = 5.0
+    github_search_timeout: float = 30.0
+    github_user_timeout: float = 10.0
+    github_oauth_timeout: float = 10.0
+
+    # Upstream resilience: retries (idempotent calls, 5xx/connection errors) with
+    # full-jitter backoff, optional hedging after the recent p95, and per-endpoint
+    # circuit breakers (0 attempts/threshold disables retries/breaking)
+    github_retry_attempts: int = 2
+    github_retry_backoff: float = 0.2
+    github_retry_max_backoff: float = 2.0
+    github_hedge_enabled: bool = False
+    github_hedge_percentile: float = 95.0
+    github_hedge_min_delay: float = 0.5
+    github_breaker_failure_threshold: int = 5
+    github_breaker_reset_timeout: float = 30.0
+
+    # Global cap on concurrent GitHub calls; extra calls queue briefly, then get 429 (0 disables)
+    github_max_in_flight: int = 50
+    github_max_queued: int = 200
+    github_queue_timeout: float = 5.0
+
+    # Per-client token buckets ("path=requests/seconds", comma-separated), keyed by
+    # local user, verified GitHub login or client IP; "memory", "sqlite" or "redis" store
+    client_rate_limit_enabled: bool = True
+    client_rate_limits: str = "/api/search=60/60,/api/search/stream=20/60,/api/search/batch=10/60,/api/analytics=20/60"
+    client_rate_limit_backend: str = "memory"
+    client_rate_limit_max_clients: int = 100000
+    # Only behind a trusted proxy: take the client IP from X-Forwarded-For
+    client_rate_limit_trust_forwarded: bool = False
+
+    # GitHub rate-limit scheduling
+    github_rate_limit_reserve: int = 0
+    github_rate_limit_max_delay: float = 5.0
+    github_server_tokens: str = ""  # comma-separated tokens for anonymous searches
+    github_rate_limit_max_buckets: int = 10000  # callers' token budgets kept (LRU)
+
+    # Streaming search: GitHub pages fetched concurrently ahead of the client
+    search_stream_concurrency: int = 4
+    search_batch_max_queries: int = 50
+    search_batch_concurrency: int = 4
+    # Speculative fetch of page N+1, skipped when fewer search calls remain
+    search_prefetch_enabled: bool = True
+    search_prefetch_min_remaining: int = 10
+    # Server-side analytics aggregation (/api/analytics)
+    analytics_cache_ttl: float = 300.0
+    analytics_state_retention: float = 86400.0
+    analytics_cache_max_entries: int = 1024
+    analytics_page_concurrency: int = 4
+    analytics_max_repo_pages: int = 10
+    analytics_activity_days: int = 30
+    # Saved repositories sync and star-count refresh job (GraphQL, needs server tokens)
+    saved_sync_max_items: int = 500
+    saved_refresh_interval: float = 3600.0
+    saved_refresh_batch_size: int = 100
+    # Local full-text index fed by GitHub search results (source=local|hybrid)
+    search_index_enabled: bool = True
+    search_index_path: str = "./search_index.db"
+    search_index_max_repositories: int = 100000
+
+    # Bearer token -> principal resolution cache
+    principal_cache_ttl: float = 30.0
+    principal_cache_max_entries: int = 4096
+    # Verified local JWT claims, kept until each token's exp
+    jwt_cache_max_entries: int = 4096
+
+    # Cache storage: "memory" (per worker), "sqlite" (shared on-disk) or "redis"
+    cache_backend: str = "memory"
+    cache_sqlite_path: str = "./cache.db"
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_compression_level: int = 6
+
+    # Search response cache
+    search_cache_enabled: bool = True
+    search_cache_ttl: float = 60.0
+    search_cache_max_entries: int = 1024
+    # How long stale entries with an ETag/Last-Modified are kept for revalidation
+    search_cache_retention: float = 600.0
+    # Stale-while-revalidate and hot key pre-refresh (0 disables)
+    search_stale_while_revalidate: float = 30.0
+    search_refresh_max_concurrency: int = 4
+    search_hot_keys: int = 20
+    search_hot_refresh_interval: float = 10.0
+    search_hot_refresh_ahead: float = 15.0
+
+    # GitHub /user profile cache (revalidated with conditional requests once stale)
+    user_cache_enabled: bool = True
+    user_cache_ttl: float = 300.0
+    user_cache_max_entries: int = 1024
+    user_cache_retention: float = 3600.0
+
     model_config = SettingsConfigDict(env_file=".env")
 
 
+    @property
+    def github_server_token_list(self) -> list[str]:
+        return [t.strip() for t in self.github_server_tokens.split(",") if t.strip()]
+
+
 @lru_cache()
 def get_settings():
     return Settings()
@@ -0,0 +1,44 @@
+from fastapi import Request
+import httpx
+from config import Settings
+from github_resilience import create_resilient_transport
+
+
+def create_github_client(settings: Settings, rate_limits=None, metrics=None) -> httpx.AsyncClient:
+    """Create the application-wide pooled client used for all GitHub calls"""
+    limits = httpx.Limits(
+        max_connections=settings.github_max_connections,
+        max_keepalive_connections=settings.github_max_keepalive_connections,
+        keepalive_expiry=settings.github_keepalive_expiry,
+    )
+    # Per-endpoint read timeouts are passed on each request; this is the fallback
+    timeout = httpx.Timeout(
+        settings.github_search_timeout,
+        connect=settings.github_connect_timeout,
+    )
+    event_hooks = {"request": [], "response": []}
+    if rate_limits:
+        event_hooks["response"].append(rate_limits.on_response)
+    if metrics:
+        event_hooks["request"].append(metrics.on_github_request)
+        event_hooks["response"].append(metrics.on_github_response)
+    # Retries and hedges happen below the hooks, so rate-limit tracking and
+    # metrics see one logical call with its final response
+    transport = create_resilient_transport(
+        settings, httpx.AsyncHTTPTransport(limits=limits, http2=settings.github_http2)
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=timeout,
+        event_hooks=event_hooks,
+    )
+
+
+def endpoint_timeout(settings: Settings, seconds: float) -> httpx.Timeout:
+    """Build a request timeout for a single GitHub endpoint"""
+    return httpx.Timeout(seconds, connect=settings.github_connect_timeout)
+
+
+async def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Dependency returning the shared client created in the app lifespan"""
+    return request.app.state.http_client
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import httpx
+from fastapi import HTTPException, Request
+from security import token_fingerprint
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS = "anonymous"
+
+
+@dataclass
+class RateBudget:
+    """Last known GitHub budget for one token and resource (core, search, ...)"""
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_at: Optional[float] = None
+    blocked_until: Optional[float] = None
+    updated_at: Optional[float] = None
+
+
+def bucket_for(token: Optional[str]) -> str:
+    """Budget bucket name for a token; tokens are only kept as fingerprints"""
+    return f"token:{token_fingerprint(token)}" if token else ANONYMOUS
+
+
+def resource_for_path(path: str) -> str:
+    """GitHub rate-limit resource that a REST path is charged against"""
+    if path.startswith("/search/"):
+        return "search"
+    if path.startswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+class RateLimitManager:
+    """Track GitHub rate-limit budgets per token and schedule calls against them
+
+    Budgets are learned from the X-RateLimit-* and Retry-After headers of every
+    GitHub response. Before a call, ``acquire`` reserves one unit: when the
+    budget is exhausted the call is delayed until the window resets if that is
+    soon enough, otherwise it is shed with a 429 instead of burning a request
+    that GitHub would reject anyway.
+
+    Callers' tokens are tracked least-recently-used up to ``max_buckets``
+    budgets, so made-up tokens can't grow the table; the anonymous and
+    server-token budgets are never evicted.
+    """
+
+    def __init__(
+        self,
+        reserve: int = 0,
+        max_delay: float = 5.0,
+        server_tokens: Optional[List[str]] = None,
+        max_buckets: int = 10000,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], object] = asyncio.sleep,
+    ):
+        self.reserve = reserve
+        self.max_delay = max_delay
+        self.server_tokens = list(server_tokens or [])
+        self.max_buckets = max_buckets
+        self._clock = clock
+        self._sleep = sleep
+        self._budgets: "OrderedDict[Tuple[str, str], RateBudget]" = OrderedDict()
+        self._server_buckets = {bucket_for(token): i for i, token in enumerate(self.server_tokens)}
+        self.delayed = 0
+        self.shed = 0
+
+    def budget(self, token: Optional[str], resource: str) -> RateBudget:
+        key = (bucket_for(token), resource)
+        budget = self._budgets.get(key)
+        if budget is not None:
+            self._budgets.move_to_end(key)
+            return budget
+        budget = self._budgets[key] = RateBudget()
+        if len(self._budgets) > self.max_buckets:
+            self._evict()
+        return budget
+
+    def _pinned(self, bucket: str) -> bool:
+        return bucket == ANONYMOUS or bucket in self._server_buckets
+
+    def _evict(self):
+        """Drop the least recently used caller budget"""
+        for key in self._budgets:
+            if not self._pinned(key[0]):
+                del self._budgets[key]
+                return
+
+    def record(self, token: Optional[str], resource: str, headers: httpx.Headers, status_code: int = 200):
+        """Update a budget from the headers of a GitHub response"""
+        now = self._clock()
+        resource = headers.get("x-ratelimit-resource", resource)
+        budget = self.budget(token, resource)
+
+        try:
+            if "x-ratelimit-limit" in headers:
+                budget.limit = int(headers["x-ratelimit-limit"])
+            if "x-ratelimit-remaining" in headers:
+                budget.remaining = int(headers["x-ratelimit-remaining"])
+            if "x-ratelimit-reset" in headers:
+                budget.reset_at = float(headers["x-ratelimit-reset"])
+            if "retry-after" in headers:
+                budget.blocked_until = now + float(headers["retry-after"])
+        except ValueError:
+            logger.warning("Ignoring malformed GitHub rate-limit headers")
+            return
+
+        # Secondary limits can come back as 403/429 without Retry-After
+        if status_code in (403, 429) and budget.remaining == 0 and budget.blocked_until is None:
+            budget.blocked_until = budget.reset_at
+        budget.updated_at = now
+
+    async def on_response(self, response: httpx.Response):
+        """httpx response hook feeding every GitHub response into the tracker"""
+        if "x-ratelimit-remaining" not in response.headers and "retry-after" not in response.headers:
+            return
+        authorization = response.request.headers.get("authorization", "")
+        token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else None
+        self.record(token, resource_for_path(response.request.url.path), response.headers, response.status_code)
+
+    def _wait_time(self, budget: RateBudget, now: float) -> float:
+        if budget.blocked_until and budget.blocked_until > now:
+            return budget.blocked_until - now
+        if budget.remaining is not None and budget.remaining <= self.reserve:
+            if budget.reset_at and budget.reset_at > now:
+                return budget.reset_at - now
+        return 0.0
+
+    async def acquire(self, token: Optional[str], resource: str):
+        """Reserve one call against a budget, delaying or shedding when exhausted"""
+        budget = self.budget(token, resource)
+        now = self._clock()
+        wait = self._wait_time(budget, now)
+
+        if wait > self.max_delay:
+            self.shed += 1
+            logger.warning(f"Shedding GitHub {resource} call for {bucket_for(token)}, budget resets in {wait:.0f}s")
+            raise HTTPException(
+                status_code=429,
+                detail="API rate limit exceeded. Please try again later or authenticate.",
+                headers={"Retry-After": str(int(wait) + 1)},
+            )
+
+        if wait > 0:
+            self.delayed += 1
+            await self._sleep(wait)
+            # The window has rolled over; the next response refreshes the real numbers
+            budget.remaining = None
+            budget.blocked_until = None
+
+        if budget.remaining is not None:
+            budget.remaining -= 1
+
+    def has_headroom(self, token: Optional[str], resource: str, keep: int = 0) -> bool:
+        """Whether an optional call can run now while leaving ``keep`` calls above the reserve"""
+        budget = self.budget(token, resource)
+        if self._wait_time(budget, self._clock()) > 0:
+            return False
+        return budget.remaining is None or budget.remaining > self.reserve + keep
+
+    def pick_server_token(self, resource: str) -> Optional[str]:
+        """Pick the configured server-side token with the most budget left"""
+        if not self.server_tokens:
+            return None
+        now = self._clock()
+
+        def headroom(token: str) -> float:
+            budget = self.budget(token, resource)
+            if self._wait_time(budget, now) > 0:
+                return -1
+            return float("inf") if budget.remaining is None else budget.remaining
+
+        return max(self.server_tokens, key=headroom)
+
+    def snapshot(self) -> dict:
+        """Anonymous and server-token budgets in detail, callers' tokens only as totals"""
+        now = self._clock()
+        budgets = []
+        callers: Dict[str, Dict[str, int]] = {}
+        for (bucket, resource), budget in sorted(self._budgets.items()):
+            if not self._pinned(bucket):
+                totals = callers.setdefault(resource, {"tracked": 0, "exhausted": 0})
+                totals["tracked"] += 1
+                if self._wait_time(budget, now) > 0:
+                    totals["exhausted"] += 1
+                continue
+            budgets.append({
+                "bucket": bucket if bucket == ANONYMOUS else f"server:{self._server_buckets[bucket]}",
+                "resource": resource,
+                "limit": budget.limit,
+                "remaining": budget.remaining,
+                "reset_in": max(budget.reset_at - now, 0) if budget.reset_at else None,
+                "blocked_for": max(budget.blocked_until - now, 0) if budget.blocked_until else None,
+            })
+        return {
+            "budgets": budgets,
+            "caller_tokens": callers,
+            "server_tokens": len(self.server_tokens),
+            "delayed": self.delayed,
+            "shed": self.shed,
+        }
+
+
+async def get_rate_limits(request: Request) -> RateLimitManager:
+    """Dependency returning the app-wide GitHub rate-limit manager"""
+    return request.app.state.rate_limits
@@ -0,0 +1,398 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+import httpx
+from fastapi import HTTPException
+from config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Only requests that are safe to send twice are retried or hedged; read-only
+# POSTs (GraphQL queries) opt in with ``extensions=IDEMPOTENT``
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+IDEMPOTENT = {"idempotent": True}
+RETRYABLE_STATUSES = frozenset({500, 502, 503, 504})
+# Failures where the request most likely never reached GitHub's application.
+# Read timeouts are not retried: the caller has already waited the full timeout.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling GitHub while an endpoint group's breaker is open"""
+
+    def __init__(self, group: str, retry_after: float, request: httpx.Request = None):
+        super().__init__(f"Circuit open for GitHub '{group}' calls", request=request)
+        self.group = group
+        self.retry_after = retry_after
+
+
+class UpstreamBusy(HTTPException):
+    """Shed with 429 when every upstream slot is taken and the wait queue is full or too slow
+
+    An HTTPException rather than an httpx error so it is never mistaken for
+    GitHub being unreachable (and never retried or counted by the breakers).
+    """
+
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__(
+            status_code=429,
+            detail="Server is busy. Please try again shortly.",
+            headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+        )
+
+
+def endpoint_group(path: str) -> str:
+    """Breaker/latency bucket for a GitHub path: its first segment (search, user, graphql, ...)"""
+    return path.strip("/").split("/", 1)[0] or "root"
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe
+
+    After ``failure_threshold`` failures in a row the breaker opens and
+    calls fail fast for ``reset_timeout`` seconds. Then one probe request
+    is let through: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, group: str, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.group = group
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started: Optional[float] = None
+        self.rejected = 0
+
+    def before_request(self, request: httpx.Request = None):
+        if self.state == "closed" or self.failure_threshold <= 0:
+            return
+        now = self._clock()
+        if self.state == "open":
+            remaining = self.opened_at + self.reset_timeout - now
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.group, remaining, request)
+            self.state = "half_open"
+        # Half-open: one probe at a time (a probe that never reported back expires)
+        if self.probe_started is not None and now - self.probe_started < self.reset_timeout:
+            self.rejected += 1
+            raise CircuitOpenError(self.group, self.reset_timeout, request)
+        self.probe_started = now
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"GitHub '{self.group}' circuit closed")
+        self.state = "closed"
+        self.failures = 0
+        self.probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_started = None
+        if self.failure_threshold <= 0:
+            return
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"GitHub '{self.group}' circuit opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = self._clock()
+
+
+class LatencyTracker:
+    """Rolling window of recent response times used to pick the hedge delay"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(max(math.ceil(pct / 100 * len(ordered)) - 1, 0), len(ordered) - 1)]
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """Wraps the pooled transport with retries, hedging and circuit breaking
+
+    Idempotent requests failing with a 5xx or a connection-level error are
+    retried up to ``retry_attempts`` times with full-jitter exponential
+    backoff (honouring a short Retry-After). With hedging on, an idempotent
+    request still unanswered after the endpoint's recent ``hedge_percentile``
+    latency gets a second copy and whichever answers first wins. Each
+    endpoint group has its own breaker, so a search outage doesn't stop
+    profile lookups. Every hedge or retry spends GitHub rate-limit budget,
+    which is why hedging is off by default.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        retry_attempts: int = 2,
+        retry_backoff: float = 0.2,
+        retry_max_backoff: float = 2.0,
+        hedge_enabled: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_delay: float = 0.5,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable = asyncio.sleep,
+        jitter: Callable[[], float] = random.random,
+    ):
+        self.transport = transport
+        self.retry_attempts = retry_attempts
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._sleep = sleep
+        self._jitter = jitter
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def breaker(self, group: str) -> CircuitBreaker:
+        breaker = self.breakers.get(group)
+        if breaker is None:
+            breaker = self.breakers[group] = CircuitBreaker(
+                group, self.failure_threshold, self.reset_timeout, self._clock
+            )
+        return breaker
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential delay before retry ``attempt`` (0-based)"""
+        if retry_after is not None:
+            try:
+                return min(max(float(retry_after), 0.0), self.retry_max_backoff)
+            except ValueError:
+                pass
+        return self._jitter() * min(self.retry_max_backoff, self.retry_backoff * 2 ** attempt)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        group = endpoint_group(request.url.path)
+        breaker = self.breaker(group)
+        idempotent = request.method in IDEMPOTENT_METHODS or bool(request.extensions.get("idempotent"))
+        attempt = 0
+        while True:
+            breaker.before_request(request)
+            retry_after = None
+            try:
+                response = await self._send(request, group, hedge=idempotent and self.hedge_enabled)
+            except httpx.PoolTimeout:
+                # Our own pool is saturated; that says nothing about GitHub's health
+                breaker.probe_started = None
+                raise
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                if not idempotent or attempt >= self.retry_attempts or not isinstance(e, RETRYABLE_ERRORS):
+                    raise
+                logger.warning(f"Retrying GitHub {group} call after {type(e).__name__}")
+            else:
+                if response.status_code not in RETRYABLE_STATUSES:
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+                if not idempotent or attempt >= self.retry_attempts:
+                    return response
+                retry_after = response.headers.get("retry-after")
+                await response.aclose()
+                logger.warning(f"Retrying GitHub {group} call after HTTP {response.status_code}")
+
+            await self._sleep(self.backoff(attempt, retry_after))
+            attempt += 1
+            self.retries += 1
+
+    async def _send(self, request: httpx.Request, group: str, hedge: bool) -> httpx.Response:
+        tracker = self.latencies.get(group)
+        if tracker is None:
+            tracker = self.latencies[group] = LatencyTracker()
+        start = self._clock()
+        delay = tracker.percentile(self.hedge_percentile) if hedge else None
+        if delay is None:
+            response = await self.transport.handle_async_request(request)
+        else:
+            response = await self._hedged(request, max(delay, self.hedge_min_delay))
+        if response.status_code < 500:
+            tracker.observe(self._clock() - start)
+        return response
+
+    async def _hedged(self, request: httpx.Request, delay: float) -> httpx.Response:
+        primary = asyncio.ensure_future(self.transport.handle_async_request(request))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.hedges += 1
+            backup = asyncio.ensure_future(self.transport.handle_async_request(request))
+            pending = {primary, backup}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if not winners:
+                    error = error or next(iter(done)).exception()
+                    continue
+                # Prefer the primary on a tie; close any other finished response
+                winner = primary if primary in winners else winners[0]
+                for task in winners:
+                    if task is not winner:
+                        await task.result().aclose()
+                if winner is backup:
+                    self.hedge_wins += 1
+                return winner.result()
+            raise error
+        finally:
+            # The losing copy (or both, if we were cancelled) is abandoned
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "circuits": {
+                group: {"state": breaker.state, "failures": breaker.failures, "rejected": breaker.rejected}
+                for group, breaker in sorted(self.breakers.items())
+            },
+        }
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that gives back its admission slot once it is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class AdmissionTransport(httpx.AsyncBaseTransport):
+    """Global cap on in-flight GitHub calls with a bounded, time-limited queue
+
+    A slot is held from the first attempt until the response body is closed,
+    covering retries and hedges of the same logical call. Callers beyond
+    ``max_in_flight`` wait in line; when ``max_queued`` are already waiting or
+    no slot frees up within ``queue_timeout`` they get a 429 straight away,
+    so overload shows up as fast rejections instead of piling up timeouts.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        max_in_flight: int = 50,
+        max_queued: int = 200,
+        queue_timeout: float = 5.0,
+    ):
+        self.transport = transport
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def _acquire(self):
+        if self._semaphore.locked() and self.queued >= self.max_queued:
+            self.rejected += 1
+            raise UpstreamBusy(self.queue_timeout)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise UpstreamBusy(self.queue_timeout)
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+
+    def _releaser(self) -> Callable[[], None]:
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.in_flight -= 1
+                self._semaphore.release()
+        return release
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._acquire()
+        release = self._releaser()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, release),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+def create_resilient_transport(settings: Settings, transport: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    """Admission cap (when configured) over retries/hedging/breakers over the pooled transport"""
+    resilient = ResilientTransport(
+        transport,
+        retry_attempts=settings.github_retry_attempts,
+        retry_backoff=settings.github_retry_backoff,
+        retry_max_backoff=settings.github_retry_max_backoff,
+        hedge_enabled=settings.github_hedge_enabled,
+        hedge_percentile=settings.github_hedge_percentile,
+        hedge_min_delay=settings.github_hedge_min_delay,
+        failure_threshold=settings.github_breaker_failure_threshold,
+        reset_timeout=settings.github_breaker_reset_timeout,
+    )
+    if settings.github_max_in_flight <= 0:
+        return resilient
+    return AdmissionTransport(
+        resilient,
+        max_in_flight=settings.github_max_in_flight,
+        max_queued=settings.github_max_queued,
+        queue_timeout=settings.github_queue_timeout,
+    )
@@ -0,0 +1,401 @@
+from fastapi import HTTPException
+from dataclasses import dataclass
+from typing import Optional
+import base64
+import httpx
+import logging
+from pydantic import ValidationError
+from cache import CacheEntry, TTLCache
+from config import Settings
+from github_client import endpoint_timeout
+from github_resilience import IDEMPOTENT, CircuitOpenError
+from search_stream import MAX_SEARCH_RESULTS
+from security import token_fingerprint
+from models.searchresponse import SearchResponse
+from models.searchrequest import SearchRequest
+
+logger = logging.getLogger(__name__)
+
+
+# Requests exactly the fields models/repository.py exposes
+GRAPHQL_SEARCH_QUERY = """
+query($query: String!, $first: Int!, $after: String) {
+  search(query: $query, type: REPOSITORY, first: $first, after: $after) {
+    repositoryCount
+    nodes {
+      ... on Repository {
+        databaseId
+        name
+        nameWithOwner
+        description
+        url
+        stargazerCount
+        forkCount
+        primaryLanguage { name }
+        updatedAt
+        owner { login avatarUrl }
+      }
+    }
+    pageInfo { endCursor hasNextPage }
+  }
+}
+"""
+
+GRAPHQL_SORTS = {"stars", "forks", "updated"}
+
+
+def build_search_query(search_params: SearchRequest) -> str:
+    """Build the GitHub search qualifier string from validated parameters"""
+    search_query = search_params.q
+
+    if search_params.language:
+        search_query += f" language:{search_params.language}"
+
+    if search_params.min_stars:
+        search_query += f" stars:>={search_params.min_stars}"
+
+    return search_query
+
+
+@dataclass
+class SearchResult:
+    """Upstream search outcome; ``response`` is None when GitHub answered 304"""
+    response: Optional[SearchResponse]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.response is None
+
+
+def upstream_unavailable(e: CircuitOpenError) -> HTTPException:
+    """Fail fast while the breaker for a GitHub endpoint group is open"""
+    return HTTPException(
+        status_code=503,
+        detail="GitHub is temporarily unavailable. Please try again shortly.",
+        headers={"Retry-After": str(max(int(e.retry_after + 0.999), 1))},
+    )
+
+
+def conditional_headers(etag: Optional[str], last_modified: Optional[str]) -> dict:
+    """Validator headers turning a re-fetch into a (rate-limit free) revalidation"""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def graphql_search_query(search_params: SearchRequest) -> str:
+    """GraphQL search has no sort arguments, so sort/order become a qualifier"""
+    search_query = build_search_query(search_params)
+    sort = (search_params.sort or "").lower()
+    if sort in GRAPHQL_SORTS:
+        order = "asc" if (search_params.order or "").lower() == "asc" else "desc"
+        search_query += f" sort:{sort}-{order}"
+    return search_query
+
+
+def graphql_cursor(offset: int) -> Optional[str]:
+    """Cursor for the item after ``offset`` results, mapping page/per_page onto GraphQL
+
+    GitHub's search cursors are opaque; today they are base64-encoded
+    ``cursor:<position>``, which lets any page be requested directly. That
+    encoding is undocumented, so ``fetch_search_graphql`` falls back to
+    walking ``pageInfo.endCursor`` from page 1 when such a cursor is rejected.
+    """
+    if offset <= 0:
+        return None
+    return base64.b64encode(f"cursor:{offset}".encode()).decode()
+
+
+def repository_from_graphql(node: dict) -> dict:
+    """Map a GraphQL Repository node onto the REST field names our models use"""
+    return {
+        "id": node["databaseId"],
+        "name": node["name"],
+        "full_name": node["nameWithOwner"],
+        "description": node.get("description"),
+        "html_url": node["url"],
+        "stargazers_count": node["stargazerCount"],
+        "forks_count": node["forkCount"],
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        "updated_at": node["updatedAt"],
+        "owner": {
+            "login": node["owner"]["login"],
+            "avatar_url": node["owner"]["avatarUrl"],
+        },
+    }
+
+
+def search_cache_key(search_params: SearchRequest, github_token: Optional[str] = None) -> str:
+    """Normalized cache key; authenticated callers get their own keyspace"""
+    keyspace = f"user:{token_fingerprint(github_token)}" if github_token else "anon"
+    normalized = [
+        " ".join(search_params.q.lower().split()),
+        (search_params.language or "").strip().lower(),
+        str(search_params.min_stars or ""),
+        (search_params.sort or "").lower(),
+        (search_params.order or "").lower(),
+        str(search_params.page),
+        str(search_params.per_page),
+    ]
+    return f"search:{keyspace}:" + "|".join(normalized)
+
+
+def uses_graphql(settings: Settings, github_token: Optional[str]) -> bool:
+    """Whether a search goes to GraphQL (which has no conditional requests) rather than REST"""
+    # GraphQL needs a token; anonymous searches without a server token stay on REST
+    return settings.search_provider == "graphql" and bool(github_token)
+
+
+async def fetch_search(
+    client: httpx.AsyncClient,
+    settings: Settings,
+    search_params: SearchRequest,
+    github_token: Optional[str] = None,
+    rate_limits=None,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> SearchResult:
+    """Run a single (optionally conditional) search against GitHub's /search/repositories"""
+    if uses_graphql(settings, github_token):
+        return await fetch_search_graphql(client, settings, search_params, github_token, rate_limits)
+
+    search_query = build_search_query(search_params)
+
+    # Prepare request parameters
+    params = {
+        "q": search_query,
+        "sort": search_params.sort,
+        "order": search_params.order,
+        "page": search_params.page,
+        "per_page": search_params.per_page,
+    }
+
+    # Prepare headers
+    headers = {
+        "Accept": "application/vnd.github.v3+json",
+    }
+    if github_token:
+        headers["Authorization"] = f"Bearer {github_token}"
+    headers.update(conditional_headers(etag, last_modified))
+
+    # Wait for (or shed when out of) search budget before calling GitHub
+    if rate_limits is not None:
+        await rate_limits.acquire(github_token, "search")
+
+    try:
+        response = await client.get(
+            f"{settings.github_api_base}/search/repositories",
+            params=params,
+            headers=headers,
+            timeout=endpoint_timeout(settings, settings.github_search_timeout),
+        )
+
+        if response.status_code == 304:
+            return SearchResult(response=None, etag=etag, last_modified=last_modified)
+
+        if response.status_code == 422:
+            logger.warning(f"Invalid search query: {search_query}")
+            raise HTTPException(
+                status_code=422,
+                detail="Invalid search query. Please check your parameters."
+            )
+
+        if response.status_code == 403:
+            logger.warning("GitHub API rate limit exceeded")
+            raise HTTPException(
+                status_code=403,
+                detail="API rate limit exceeded. Please try again later or authenticate."
+            )
+
+        if response.status_code != 200:
+            logger.error(f"GitHub API error: {response.status_code}")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="GitHub API error occurred"
+            )
+
+        # Parse and validate in one pass straight from the raw bytes; only the
+        # fields our models expose are materialized, the rest are skipped
+        try:
+            search_response = SearchResponse.model_validate_json(response.content)
+        except ValidationError as e:
+            logger.error(f"Unexpected GitHub search payload: {e.error_count()} validation errors")
+            raise HTTPException(status_code=502, detail="Unexpected response from GitHub")
+
+        return SearchResult(
+            response=search_response,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+
+    except CircuitOpenError as e:
+        raise upstream_unavailable(e)
+    except httpx.TimeoutException:
+        logger.error("GitHub API request timeout")
+        raise HTTPException(status_code=504, detail="Request timeout. Please try again.")
+    except httpx.RequestError as e:
+        logger.error(f"GitHub API connection error: {str(e)}")
+        raise HTTPException(status_code=503, detail="Connection error occurred")
+
+
+class GraphQLQueryError(Exception):
+    """GitHub rejected a GraphQL search (bad query or cursor)"""
+
+
+async def graphql_search_page(
+    client: httpx.AsyncClient,
+    settings: Settings,
+    search_query: str,
+    first: int,
+    after: Optional[str],
+    github_token: str,
+    rate_limits=None,
+) -> dict:
+    """One GraphQL search call -> the ``search`` object (repositoryCount, nodes, pageInfo)"""
+    if rate_limits is not None:
+        await rate_limits.acquire(github_token, "graphql")
+
+    response = await client.post(
+        f"{settings.github_api_base}/graphql",
+        json={"query": GRAPHQL_SEARCH_QUERY, "variables": {"query": search_query, "first": first, "after": after}},
+        headers={"Authorization": f"Bearer {github_token}"},
+        timeout=endpoint_timeout(settings, settings.github_search_timeout),
+        # Queries are read-only, so they may be retried and hedged like GETs
+        extensions=IDEMPOTENT,
+    )
+
+    if response.status_code == 403:
+        logger.warning("GitHub GraphQL rate limit exceeded")
+        raise HTTPException(
+            status_code=403,
+            detail="API rate limit exceeded. Please try again later or authenticate."
+        )
+
+    if response.status_code != 200:
+        logger.error(f"GitHub GraphQL error: {response.status_code}")
+        raise HTTPException(
+            status_code=response.status_code,
+            detail="GitHub API error occurred"
+        )
+
+    # GraphQL reports failures in the body of a 200 response
+    payload = response.json()
+    errors = payload.get("errors") or []
+    if any(error.get("type") == "RATE_LIMITED" for error in errors):
+        logger.warning("GitHub GraphQL rate limit exceeded")
+        raise HTTPException(
+            status_code=403,
+            detail="API rate limit exceeded. Please try again later or authenticate."
+        )
+    if errors or not payload.get("data"):
+        raise GraphQLQueryError(errors)
+    return payload["data"]["search"]
+
+
+async def fetch_search_graphql(
+    client: httpx.AsyncClient,
+    settings: Settings,
+    search_params: SearchRequest,
+    github_token: str,
+    rate_limits=None,
+) -> SearchResult:
+    """Run a search through GitHub's GraphQL API, fetching only the fields we render"""
+    search_query = graphql_search_query(search_params)
+    offset = (search_params.page - 1) * search_params.per_page
+
+    async def page(after: Optional[str]) -> dict:
+        return await graphql_search_page(
+            client, settings, search_query, search_params.per_page, after, github_token, rate_limits,
+        )
+
+    try:
+        try:
+            search = await page(graphql_cursor(offset))
+            # A cursor GitHub no longer understands can also come back as an empty page
+            available = min(search.get("repositoryCount", 0), MAX_SEARCH_RESULTS)
+            if offset and not search.get("nodes") and offset < available:
+                raise GraphQLQueryError("empty page for a built cursor")
+        except GraphQLQueryError:
+            if not offset:
+                raise
+            logger.warning("GitHub rejected a built GraphQL cursor, walking pages from the start")
+            search = await page(None)
+            for _ in range(search_params.page - 1):
+                page_info = search.get("pageInfo") or {}
+                if not page_info.get("hasNextPage"):
+                    search = {**search, "nodes": []}
+                    break
+                search = await page(page_info["endCursor"])
+
+        try:
+            search_response = SearchResponse.model_validate({
+                "total_count": search["repositoryCount"],
+                # Non-repository nodes come back as empty objects
+                "items": [repository_from_graphql(node) for node in search["nodes"] if node],
+                "incomplete_results": False,
+            })
+        except (KeyError, TypeError, ValidationError) as e:
+            logger.error(f"Unexpected GitHub GraphQL payload: {str(e)}")
+            raise HTTPException(status_code=502, detail="Unexpected response from GitHub")
+
+        return SearchResult(response=search_response)
+
+    except GraphQLQueryError:
+        logger.warning(f"Invalid GraphQL search query: {search_query}")
+        raise HTTPException(
+            status_code=422,
+            detail="Invalid search query. Please check your parameters."
+        )
+    except CircuitOpenError as e:
+        raise upstream_unavailable(e)
+    except httpx.TimeoutException:
+        logger.error("GitHub GraphQL request timeout")
+        raise HTTPException(status_code=504, detail="Request timeout. Please try again.")
+    except httpx.RequestError as e:
+        logger.error(f"GitHub GraphQL connection error: {str(e)}")
+        raise HTTPException(status_code=503, detail="Connection error occurred")
+
+
+async def refresh_search(
+    client: httpx.AsyncClient,
+    settings: Settings,
+    cache: Optional[TTLCache],
+    cache_key: str,
+    search_params: SearchRequest,
+    github_token: Optional[str] = None,
+    rate_limits=None,
+    stale: Optional[CacheEntry] = None,
+    index=None,
+) -> SearchResponse:
+    """Fetch a search into the cache, revalidating a stale entry when possible"""
+    # GraphQL POSTs can't be conditional, so a stale entry's validators would be dropped anyway
+    if stale is not None and stale.has_validators and not uses_graphql(settings, github_token):
+        result = await fetch_search(
+            client, settings, search_params, github_token, rate_limits,
+            etag=stale.etag, last_modified=stale.last_modified,
+        )
+        if result.not_modified:
+            if cache is not None:
+                await cache.touch(cache_key)
+            return stale.value
+        if cache is not None:
+            cache.record_revalidation()
+    else:
+        result = await fetch_search(client, settings, search_params, github_token, rate_limits)
+
+    if cache is not None:
+        await cache.set(
+            cache_key, result.response,
+            etag=result.etag, last_modified=result.last_modified,
+        )
+    # Feed new results to the local index so later searches can be served offline;
+    # callers pass ``index`` only for anonymous/server-token searches, whose
+    # results are public
+    if index is not None:
+        await index.ingest(result.response.items)
+    return result.response
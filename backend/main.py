@@ -1,13 +1,169 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, api, local_auth
+from routers import auth, api, local_auth, saved, metrics as metrics_router
 import uvicorn
 import os
 
 from config import get_settings
+from database import engine, async_engine
+from github_client import create_github_client
+from github_ratelimit import RateLimitManager
+from cache import TTLCache, create_cache_backend
+from singleflight import SingleFlight
+from search_refresh import SearchRefresher
+from search_index import SearchIndex
+from analytics import AnalyticsService
+from saved_repos import SavedRepositoryRefresher
+from compression import CompressionMiddleware
+from client_ratelimit import ClientRateLimiter, ClientRateLimitMiddleware, create_bucket_store, parse_quotas
+from metrics import Metrics, MetricsMiddleware, cache_collector, client_limit_collector, upstream_collector
+from principal import PrincipalResolver, TokenVerifier
+from security import PasswordHashPool, make_password_context
 
 settings = get_settings()
-app = FastAPI(title="Lens+Github API")
+
+# Instruments only exist (and hooks are only installed) when metrics are enabled
+metrics = Metrics() if settings.metrics_enabled else None
+if metrics is not None:
+    metrics.instrument_engine(engine)
+    metrics.instrument_engine(async_engine.sync_engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    app.state.rate_limits = RateLimitManager(
+        reserve=settings.github_rate_limit_reserve,
+        max_delay=settings.github_rate_limit_max_delay,
+        server_tokens=settings.github_server_token_list,
+        max_buckets=settings.github_rate_limit_max_buckets,
+    )
+    app.state.metrics = metrics
+    app.state.http_client = create_github_client(settings, app.state.rate_limits, metrics)
+    app.state.search_cache = (
+        TTLCache(
+            max_entries=settings.search_cache_max_entries,
+            ttl=settings.search_cache_ttl,
+            retention=settings.search_cache_retention,
+            stale_window=settings.search_stale_while_revalidate,
+            backend=create_cache_backend(settings, "search", settings.search_cache_max_entries),
+        )
+        if settings.search_cache_enabled
+        else None
+    )
+    app.state.user_cache = (
+        TTLCache(
+            max_entries=settings.user_cache_max_entries,
+            ttl=settings.user_cache_ttl,
+            retention=settings.user_cache_retention,
+            backend=create_cache_backend(settings, "user", settings.user_cache_max_entries),
+        )
+        if settings.user_cache_enabled
+        else None
+    )
+    app.state.search_flight = SingleFlight()
+    app.state.search_index = (
+        SearchIndex(
+            settings.search_index_path,
+            max_repositories=settings.search_index_max_repositories,
+        )
+        if settings.search_index_enabled
+        else None
+    )
+    app.state.password_pool = PasswordHashPool(
+        make_password_context(
+            settings.argon2_time_cost,
+            settings.argon2_memory_cost,
+            settings.argon2_parallelism,
+        ),
+        max_workers=settings.password_hash_workers,
+        max_queue=settings.password_hash_max_queue,
+        metrics=metrics,
+    )
+    app.state.analytics = AnalyticsService(
+        app.state.http_client,
+        settings,
+        app.state.rate_limits,
+        ttl=settings.analytics_cache_ttl,
+        retention=settings.analytics_state_retention,
+        max_entries=settings.analytics_cache_max_entries,
+        page_concurrency=settings.analytics_page_concurrency,
+        max_repo_pages=settings.analytics_max_repo_pages,
+        activity_days=settings.analytics_activity_days,
+    )
+    app.state.principal_resolver = PrincipalResolver(
+        ttl=settings.principal_cache_ttl,
+        max_entries=settings.principal_cache_max_entries,
+        verifier=TokenVerifier(settings.jwt_cache_max_entries),
+    )
+    app.state.client_limiter = (
+        ClientRateLimiter(
+            create_bucket_store(settings),
+            parse_quotas(settings.client_rate_limits),
+            trust_forwarded=settings.client_rate_limit_trust_forwarded,
+        )
+        if settings.client_rate_limit_enabled
+        else None
+    )
+    app.state.search_refresher = None
+    hot_key_loop = None
+    if app.state.search_cache is not None:
+        app.state.search_refresher = SearchRefresher(
+            app.state.http_client,
+            settings,
+            app.state.search_cache,
+            app.state.search_flight,
+            app.state.rate_limits,
+            max_concurrency=settings.search_refresh_max_concurrency,
+            hot_keys=settings.search_hot_keys,
+            index=app.state.search_index,
+            prefetch_min_remaining=settings.search_prefetch_min_remaining,
+        )
+        if settings.search_hot_keys > 0 and settings.search_hot_refresh_interval > 0:
+            hot_key_loop = asyncio.create_task(
+                app.state.search_refresher.run(
+                    settings.search_hot_refresh_interval,
+                    settings.search_hot_refresh_ahead,
+                )
+            )
+    app.state.saved_refresher = SavedRepositoryRefresher(
+        app.state.http_client,
+        settings,
+        app.state.rate_limits,
+        batch_size=settings.saved_refresh_batch_size,
+    )
+    saved_refresh_loop = None
+    if settings.saved_refresh_interval > 0 and settings.github_server_token_list:
+        saved_refresh_loop = asyncio.create_task(
+            app.state.saved_refresher.run(settings.saved_refresh_interval)
+        )
+    try:
+        yield
+    finally:
+        for loop in (hot_key_loop, saved_refresh_loop):
+            if loop is not None:
+                loop.cancel()
+                await asyncio.gather(loop, return_exceptions=True)
+        if app.state.search_refresher is not None:
+            await app.state.search_refresher.close()
+        for cache in (app.state.search_cache, app.state.user_cache):
+            if cache is not None:
+                await cache.close()
+        if app.state.search_index is not None:
+            await app.state.search_index.close()
+        if app.state.client_limiter is not None:
+            await app.state.client_limiter.close()
+        await app.state.http_client.aclose()
+        await async_engine.dispose()
+        app.state.password_pool.shutdown()
+
+
+app = FastAPI(title="Lens+Github API", lifespan=lifespan)
+
+# Per-client quotas; added first so CORS wraps its 429s and browsers can read them
+app.add_middleware(ClientRateLimitMiddleware)
 
 # CORS Configuration
 origins = [
@@ -22,12 +178,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        zstd_level=settings.compression_zstd_level,
+    )
+
+if metrics is not None:
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    metrics.add_collector(cache_collector("search", lambda: getattr(app.state, "search_cache", None)))
+    metrics.add_collector(cache_collector("user", lambda: getattr(app.state, "user_cache", None)))
+    metrics.add_collector(upstream_collector(lambda: getattr(app.state, "http_client", None)))
+    metrics.add_collector(client_limit_collector(lambda: getattr(app.state, "client_limiter", None)))
+    metrics.add_collector(cache_collector(
+        "principal", lambda: getattr(getattr(app.state, "principal_resolver", None), "cache", None)
+    ))
+    metrics.add_collector(cache_collector(
+        "jwt", lambda: getattr(getattr(getattr(app.state, "principal_resolver", None), "verifier", None), "cache", None)
+    ))
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(local_auth.router)
 app.include_router(api.router)
+app.include_router(saved.router)
+app.include_router(metrics_router.router)
 
 
 @app.get("/")
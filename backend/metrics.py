@@ -0,0 +1,296 @@
+import re
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi import Request
+import httpx
+from sqlalchemy import event
+from github_resilience import AdmissionTransport, ResilientTransport
+
+# Latency buckets in seconds, from cache hits up to slow GitHub searches
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with optional labels"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+_USER_PATH = re.compile(r"^/users/[^/]+")
+_REPO_PATH = re.compile(r"^/repos/[^/]+/[^/]+")
+
+
+def github_endpoint(path: str) -> str:
+    """Low-cardinality label for a GitHub API path (logins and repo names collapsed)"""
+    path = _USER_PATH.sub("/users/{user}", path)
+    return _REPO_PATH.sub("/repos/{owner}/{repo}", path)
+
+
+def sql_operation(statement: str) -> str:
+    """Statement verb (SELECT, INSERT, ...) used as the DB metrics label"""
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+
+class Metrics:
+    """Process-wide instruments rendered in the Prometheus text format
+
+    Only created when metrics are enabled; with metrics off no middleware,
+    client hooks or engine listeners are installed, so the hot paths pay
+    nothing. Cache counters are read from the caches at scrape time rather
+    than being double-counted on every lookup.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self.request_latency = Histogram(
+            "http_request_duration_seconds", "Latency of API requests by route",
+            ("method", "route", "status"),
+        )
+        self.requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being served")
+        self.github_latency = Histogram(
+            "github_request_duration_seconds", "Latency of upstream GitHub calls",
+            ("method", "endpoint", "status"),
+        )
+        self.db_latency = Histogram(
+            "db_query_duration_seconds", "Database statement execution time", ("operation",),
+        )
+        self.db_errors = Counter(
+            "db_query_errors_total", "Database statements that raised", ("operation",),
+        )
+        self.hash_latency = Histogram(
+            "password_hash_duration_seconds", "Argon2 hashing/verification time in the worker pool",
+            ("operation",), buckets=HASH_BUCKETS,
+        )
+        self._instruments = [
+            self.request_latency, self.requests_in_flight, self.github_latency,
+            self.db_latency, self.db_errors, self.hash_latency,
+        ]
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+    def add_collector(self, collector: Callable):
+        """Register a scrape-time callback yielding (name, kind, help, labels, value)"""
+        self._collectors.append(collector)
+
+    # httpx hooks for the shared GitHub client
+    async def on_github_request(self, request: httpx.Request):
+        request.extensions["metrics_start"] = self._clock()
+
+    async def on_github_response(self, response: httpx.Response):
+        start = response.request.extensions.get("metrics_start")
+        if start is None:
+            return
+        self.github_latency.observe(
+            self._clock() - start,
+            response.request.method,
+            github_endpoint(response.request.url.path),
+            str(response.status_code),
+        )
+
+    def instrument_engine(self, engine):
+        """Time every statement run through a (sync) SQLAlchemy engine"""
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("metrics_start", []).append(self._clock())
+
+        def after(conn, cursor, statement, parameters, context, executemany):
+            start = conn.info["metrics_start"].pop()
+            self.db_latency.observe(self._clock() - start, sql_operation(statement))
+
+        def error(exception_context):
+            # A failed statement never reaches after_cursor_execute; drop its start
+            # time so later timings on this pooled connection stay paired
+            conn = exception_context.connection
+            starts = conn.info.get("metrics_start") if conn is not None else None
+            if not starts:
+                return
+            starts.pop()
+            self.db_errors.inc(sql_operation(exception_context.statement or ""))
+
+        event.listen(engine, "before_cursor_execute", before)
+        event.listen(engine, "after_cursor_execute", after)
+        event.listen(engine, "handle_error", error)
+
+    def time_hash(self, fn: Callable) -> Callable:
+        """Wrap a password-context call so its time in the worker thread is recorded"""
+        def timed(*args):
+            start = self._clock()
+            try:
+                return fn(*args)
+            finally:
+                self.hash_latency.observe(self._clock() - start, fn.__name__)
+        return timed
+
+    def render(self) -> str:
+        lines = []
+        for instrument in self._instruments:
+            lines.append(f"# HELP {instrument.name} {instrument.help}")
+            lines.append(f"# TYPE {instrument.name} {instrument.kind}")
+            lines.extend(instrument.samples())
+
+        # Several collectors can report the same family; the text format needs each family in one block
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for collector in self._collectors:
+            for name, kind, help, labels, value in collector():
+                family = families.setdefault(name, (kind, help, []))
+                family[2].append(f"{name}{_format_labels(labels.keys(), labels.values())} {value}")
+        for name, (kind, help, samples) in families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests"""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        metrics.requests_in_flight.inc()
+        start = metrics._clock()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.requests_in_flight.dec()
+            # Label by route template, never the raw path, to keep cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.request_latency.observe(
+                metrics._clock() - start, scope["method"], route, str(status["code"])
+            )
+
+
+def cache_collector(name: str, get_cache: Callable) -> Callable:
+    """Scrape-time cache counters and hit ratio for a TTLCache (skipped when disabled)"""
+    def collect():
+        cache = get_cache()
+        if cache is None:
+            return
+        labels = {"cache": name}
+        yield "cache_hits_total", "counter", "Fresh cache hits", labels, cache.hits
+        yield "cache_misses_total", "counter", "Cache misses (including stale lookups)", labels, cache.misses
+        yield "cache_stale_served_total", "counter", "Stale entries served while refreshing", labels, cache.stale_served
+        lookups = cache.hits + cache.misses
+        yield "cache_hit_ratio", "gauge", "Fresh hits over all lookups", labels, cache.hits / lookups if lookups else 0.0
+    return collect
+
+
+def upstream_collector(get_client: Callable) -> Callable:
+    """Scrape-time admission, retry/hedge counters and circuit breaker states of the GitHub client"""
+    def collect():
+        transport = getattr(get_client(), "_transport", None)
+        if isinstance(transport, AdmissionTransport):
+            yield "github_in_flight", "gauge", "GitHub calls holding an admission slot", {}, transport.in_flight
+            yield "github_queued", "gauge", "GitHub calls waiting for an admission slot", {}, transport.queued
+            yield "github_admission_rejected_total", "counter", "GitHub calls shed with 429 by admission control", {}, transport.rejected
+            transport = transport.transport
+        if not isinstance(transport, ResilientTransport):
+            return
+        yield "github_retries_total", "counter", "GitHub calls retried after a 5xx or connection error", {}, transport.retries
+        yield "github_hedges_total", "counter", "Hedged second requests sent", {}, transport.hedges
+        yield "github_hedge_wins_total", "counter", "Hedged requests that answered first", {}, transport.hedge_wins
+        for group, breaker in sorted(transport.breakers.items()):
+            labels = {"group": group}
+            yield "github_circuit_open", "gauge", "1 while the endpoint group's breaker is not closed", labels, int(breaker.state != "closed")
+            yield "github_circuit_rejected_total", "counter", "Calls failed fast by an open breaker", labels, breaker.rejected
+    return collect
+
+
+def client_limit_collector(get_limiter: Callable) -> Callable:
+    """Scrape-time counters of the per-client rate limiter (skipped when disabled)"""
+    def collect():
+        limiter = get_limiter()
+        if limiter is None:
+            return
+        yield "client_requests_allowed_total", "counter", "Rate-limited route requests let through", {}, limiter.allowed
+        yield "client_requests_limited_total", "counter", "Requests rejected with 429 by per-client limits", {}, limiter.limited
+    return collect
+
+
+async def get_metrics(request: Request) -> Optional[Metrics]:
+    """Dependency returning the metrics registry (None when metrics are disabled)"""
+    return request.app.state.metrics
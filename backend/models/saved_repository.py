@@ -0,0 +1,21 @@
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, func
+from database import Base
+
+class SavedRepository(Base):
+    __tablename__ = "saved_repositories"
+    __table_args__ = (
+        UniqueConstraint("user_id", "repo_id", name="uq_saved_repositories_user_repo"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("local_users.id"), nullable=False, index=True)
+    repo_id = Column(Integer, nullable=False, index=True)
+    full_name = Column(String, nullable=False)
+    # Repository payload as the client renders it (JSON)
+    data = Column(Text, nullable=False)
+    stargazers_count = Column(Integer, default=0)
+    forks_count = Column(Integer, default=0)
+    # Per-user change counter; clients sync everything newer than the last version they saw
+    version = Column(Integer, nullable=False, index=True)
+    deleted = Column(Boolean, default=False, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, ForeignKey, Integer
+from database import Base
+
+class SavedVersion(Base):
+    __tablename__ = "saved_versions"
+
+    # One counter row per user; bumping it serializes concurrent syncs
+    user_id = Column(Integer, ForeignKey("local_users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from .repository import Repository
+
+class SavedSyncRequest(BaseModel):
+    since: int = 0
+    upserts: List[Repository] = []
+    deletes: List[int] = []
+
+class SavedChange(BaseModel):
+    repo_id: int
+    version: int
+    deleted: bool
+    repository: Optional[Repository] = None
+
+class SavedSyncResponse(BaseModel):
+    version: int
+    changes: List[SavedChange]
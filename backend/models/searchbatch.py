@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+from .searchresponse import SearchResponse
+
+class SearchBatchRequest(BaseModel):
+    # Validated per query by the service so one bad query doesn't reject the batch
+    queries: List[Dict[str, Any]]
+    source: Literal["github", "local", "hybrid"] = "github"
+
+class SearchBatchResult(BaseModel):
+    status_code: int
+    response: Optional[SearchResponse] = None
+    error: Optional[str] = None
+
+class SearchBatchResponse(BaseModel):
+    results: List[SearchBatchResult]
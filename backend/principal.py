@@ -0,0 +1,171 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Set
+from fastapi import Depends, Header, Query, Request
+from jose import jwt, JWTError
+from sqlalchemy import select
+from cache import TTLCache
+from database import AsyncSessionLocal
+from models.local_user import LocalUser
+from security import SECRET_KEY, ALGORITHM, token_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Who a bearer token belongs to and which GitHub token to call upstream with"""
+    kind: str  # "anonymous", "local" or "github"
+    github_token: Optional[str] = None
+    email: Optional[str] = None
+    user_id: Optional[int] = None
+
+
+ANONYMOUS_PRINCIPAL = Principal(kind="anonymous")
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if authorization and authorization.startswith("Bearer "):
+        return authorization[len("Bearer "):]
+    return None
+
+
+def request_authorization(header: Optional[str], query: Optional[str]) -> Optional[str]:
+    """The Authorization header, else the ``?authorization=`` fallback (EventSource, links)"""
+    return header or query
+
+
+class TokenVerifier:
+    """Bounded cache of signature-verified local JWT claims
+
+    A token's claims are kept until its own ``exp``, so each token is
+    verified once rather than on every request. Tokens that aren't
+    three-segment JWTs (GitHub tokens never contain dots) skip the
+    crypto entirely.
+    """
+
+    def __init__(self, max_entries: int = 4096, clock: Callable[[], float] = time.time):
+        self.cache = TTLCache(max_entries=max_entries, ttl=0, clock=clock)
+        self._clock = clock
+        self.verifications = 0
+
+    async def verify(self, token: str, key: Optional[str] = None) -> Optional[dict]:
+        """Claims of a valid local token, or None for anything else (GitHub tokens, bad or expired JWTs)"""
+        if token.count(".") != 2:
+            return None
+        key = key or token_fingerprint(token)
+        claims = await self.cache.get(key)
+        if claims is not None:
+            return claims
+
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        self.verifications += 1
+        # Only tokens that expire can be cached without outliving their validity
+        if claims.get("exp"):
+            ttl = claims["exp"] - self._clock()
+            if ttl > 0:
+                await self.cache.set(key, claims, ttl=ttl)
+        return claims
+
+
+class PrincipalResolver:
+    """Resolve bearer tokens to principals with a short-TTL in-process cache
+
+    Local JWTs need a LocalUser lookup to find the linked GitHub token; that
+    lookup goes through the async session and its result is cached per token
+    (never past the JWT's own ``exp``) so repeated searches cost a dictionary
+    hit.
+    Entries are dropped when ``github_callback`` links a new GitHub token.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 30.0,
+        max_entries: int = 4096,
+        session_factory: Callable = AsyncSessionLocal,
+        verifier: Optional[TokenVerifier] = None,
+    ):
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.verifier = verifier or TokenVerifier(max_entries)
+        self.session_factory = session_factory
+        self._keys_by_email: Dict[str, Set[str]] = {}
+        self.lookups = 0
+
+    async def _load_user(self, email: str) -> Optional[LocalUser]:
+        async with self.session_factory() as db:
+            result = await db.execute(select(LocalUser).where(LocalUser.email == email))
+            return result.scalars().first()
+
+    async def resolve(self, authorization: Optional[str]) -> Principal:
+        token = bearer_token(authorization)
+        if token is None:
+            return ANONYMOUS_PRINCIPAL
+        if token.count(".") != 2:
+            # Not JWT-shaped, so not ours: it is the GitHub token itself
+            return Principal(kind="github", github_token=token)
+
+        key = token_fingerprint(token)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        payload = await self.verifier.verify(token, key)
+        if payload is None:
+            # Not a valid local token: treat it as a GitHub token
+            return Principal(kind="github", github_token=token)
+
+        email = payload.get("sub")
+        if not email:
+            return ANONYMOUS_PRINCIPAL
+
+        self.lookups += 1
+        user = await self._load_user(email)
+        principal = Principal(
+            kind="local",
+            github_token=user.github_token if user else None,
+            email=email,
+            user_id=user.id if user else None,
+        )
+
+        ttl = self.cache.ttl
+        if payload.get("exp"):
+            ttl = min(ttl, payload["exp"] - datetime.now(timezone.utc).timestamp())
+        if ttl > 0:
+            await self.cache.set(key, principal, ttl=ttl)
+            self._keys_by_email.setdefault(email, set()).add(key)
+            if len(self._keys_by_email) > self.cache.max_entries:
+                await self._prune_index()
+        return principal
+
+    async def _prune_index(self):
+        """Drop invalidation index entries whose cache entries are already gone"""
+        pruned = {}
+        for email, keys in self._keys_by_email.items():
+            live = {key for key in keys if await self.cache.peek(key) is not None}
+            if live:
+                pruned[email] = live
+        self._keys_by_email = pruned
+
+    async def invalidate_email(self, email: str):
+        """Forget every cached principal for a local user (e.g. after re-linking)"""
+        for key in self._keys_by_email.pop(email, set()):
+            await self.cache.delete(key)
+
+
+async def get_principal_resolver(request: Request) -> PrincipalResolver:
+    """Dependency returning the app-wide principal resolver"""
+    return request.app.state.principal_resolver
+
+
+async def get_principal(
+    authorization: Optional[str] = Query(None, description="Bearer token (fallback for clients that can't set headers)"),
+    authorization_header: Optional[str] = Header(None, alias="Authorization"),
+    resolver: PrincipalResolver = Depends(get_principal_resolver),
+) -> Principal:
+    """Dependency resolving the caller from the Authorization header or ``?authorization=``"""
+    return await resolver.resolve(request_authorization(authorization_header, authorization))
@@ -1,18 +1,93 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
 from typing import Optional
+import hashlib
 import httpx
 import logging
 from config import get_settings, Settings
+from github_client import get_http_client, endpoint_timeout
+from github_resilience import CircuitOpenError
+from github_search import conditional_headers, upstream_unavailable
+from cache import TTLCache, get_search_cache, get_user_cache, user_cache_key
+from github_ratelimit import RateLimitManager, get_rate_limits
+from search_refresh import SearchRefresher, get_search_refresher
+from search_index import SearchIndex, get_search_index
+from principal import Principal, get_principal
+from search_service import SearchService, get_search_service
+from search_stream import MAX_SEARCH_RESULTS, stream_page_count, stream_pages, encode_stream
+from analytics import AnalyticsService, get_analytics
+from client_ratelimit import charge_search_calls
+from compression import decoded_etag
 from models.searchresponse import SearchResponse
 from models.searchrequest import SearchRequest
+from models.searchbatch import SearchBatchRequest, SearchBatchResponse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["api"])
 
 
+def build_search_request(**params) -> SearchRequest:
+    """Validate search parameters, mapping validation errors to 422"""
+    try:
+        search_params = SearchRequest(**params)
+        logger.info(f"Search request: query='{search_params.q}', page={search_params.page}")
+        return search_params
+    except ValueError as e:
+        logger.warning(f"Invalid search parameters: {str(e)}")
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def model_response(model: BaseModel) -> Response:
+    """Render an already-validated model straight to JSON bytes
+
+    Returning a Response skips FastAPI's response_model re-validation and
+    generic encoder; the model is only kept on the route for the OpenAPI docs.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """The If-None-Match tag matching our ETag under weak comparison (RFC 9110), if any
+
+    Tags of compressed variants (``"<tag>-gzip"``) match the identity ETag.
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    opaque = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if decoded_etag(tag.removeprefix("W/")) == opaque:
+            return tag
+    return None
+
+
+def cacheable_model_response(request: Request, model: BaseModel, max_age: int, private: bool) -> Response:
+    """Like model_response, with a strong ETag over the body and 304 for matching clients
+
+    Results fetched with a caller's token are only cacheable by that browser;
+    anonymous ones may be shared by a CDN. Either way they vary by Authorization.
+    """
+    body = model.model_dump_json().encode()
+    headers = {
+        "ETag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+        "Cache-Control": f"{'private' if private else 'public'}, max-age={max_age}",
+        "Vary": "Authorization",
+    }
+    matched = matching_etag(request.headers.get("if-none-match"), headers["ETag"])
+    if matched is not None:
+        # Echo the variant's tag: the 304 stands for the representation the client holds
+        headers["ETag"] = matched
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/search", response_model=SearchResponse)
 async def search_repositories(
+    request: Request,
     q: str = Query(..., description="Search query"),
     language: Optional[str] = Query(None, description="Filter by programming language"),
     min_stars: Optional[int] = Query(None, description="Minimum number of stars"),
@@ -20,167 +95,220 @@ async def search_repositories(
     order: Optional[str] = Query("desc", description="Order: asc or desc"),
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(30, ge=1, le=100, description="Results per page"),
-    authorization: Optional[str] = None,
-    settings: Settings = Depends(get_settings)
+    source: str = Query("github", pattern="^(github|local|hybrid)$", description="github, local or hybrid"),
+    principal: Principal = Depends(get_principal),
+    service: SearchService = Depends(get_search_service)
 ):
     """Search GitHub repositories with input validation"""
     
     # Validate input using SearchRequest model
-    try:
-        search_params = SearchRequest(
-            q=q,
-            language=language,
-            min_stars=min_stars,
-            sort=sort,
-            order=order,
-            page=page,
-            per_page=per_page
-        )
-        logger.info(f"Search request: query='{search_params.q}', page={search_params.page}")
-    except ValueError as e:
-        logger.warning(f"Invalid search parameters: {str(e)}")
-        raise HTTPException(status_code=422, detail=str(e))
-    
-    # Build search query using validated parameters
-    search_query = search_params.q
+    search_params = build_search_request(
+        q=q,
+        language=language,
+        min_stars=min_stars,
+        sort=sort,
+        order=order,
+        page=page,
+        per_page=per_page
+    )
     
-    if search_params.language:
-        search_query += f" language:{search_params.language}"
-    
-    if search_params.min_stars:
-        search_query += f" stars:>={search_params.min_stars}"
-    
-    # Prepare request parameters
-    params = {
-        "q": search_query,
-        "sort": search_params.sort,
-        "order": search_params.order,
-        "page": search_params.page,
-        "per_page": search_params.per_page,
-    }
+    result = await service.search(search_params, principal.github_token, source)
+    return cacheable_model_response(
+        request, result, service.settings.search_http_max_age, private=principal.kind != "anonymous"
+    )
+
+
+@router.get("/search/stream")
+async def stream_search_repositories(
+    request: Request,
+    q: str = Query(..., description="Search query"),
+    language: Optional[str] = Query(None, description="Filter by programming language"),
+    min_stars: Optional[int] = Query(None, description="Minimum number of stars"),
+    sort: Optional[str] = Query("stars", description="Sort by: stars, forks, or updated"),
+    order: Optional[str] = Query("desc", description="Order: asc or desc"),
+    limit: int = Query(100, ge=1, le=MAX_SEARCH_RESULTS, description="Maximum repositories to stream"),
+    per_page: int = Query(100, ge=1, le=100, description="GitHub page size used for fetching"),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$", description="ndjson or sse"),
+    principal: Principal = Depends(get_principal),
+    service: SearchService = Depends(get_search_service)
+):
+    """Stream up to `limit` repositories as NDJSON or Server-Sent Events"""
+    search_params = build_search_request(
+        q=q,
+        language=language,
+        min_stars=min_stars,
+        sort=sort,
+        order=order,
+        page=1,
+        per_page=per_page
+    )
+    # Each GitHub page costs the caller what a single search would
+    await charge_search_calls(request, 1)
     
-    # Prepare headers
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-    }
+    # Fetch the first page up front so errors still map to a proper status code
+    first_page = await service.search(search_params, principal.github_token)
+    # total_count is known now, so only pages that will actually be fetched are charged
+    more_pages = stream_page_count(first_page, limit, per_page) - 1
+    if more_pages:
+        await charge_search_calls(request, more_pages)
+    pages = stream_pages(
+        service, search_params, principal.github_token, first_page, limit,
+        service.settings.search_stream_concurrency,
+    )
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        encode_stream(pages, first_page, format),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.post("/search/batch", response_model=SearchBatchResponse)
+async def batch_search_repositories(
+    batch: SearchBatchRequest,
+    request: Request,
+    principal: Principal = Depends(get_principal),
+    service: SearchService = Depends(get_search_service)
+):
+    """Run several searches in one request with per-query results and errors"""
+    max_queries = service.settings.search_batch_max_queries
+    if not batch.queries or len(batch.queries) > max_queries:
+        raise HTTPException(status_code=422, detail=f"A batch must contain 1 to {max_queries} queries")
+    logger.info(f"Batch search request: {len(batch.queries)} queries")
+    await charge_search_calls(request, len(batch.queries))
     
-    # Add authorization if provided
-    github_token = None
-    if authorization and authorization.startswith("Bearer "):
-        token = authorization.replace("Bearer ", "")
-        
-        # Try decoding as local JWT to get linked GitHub token
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            email = payload.get("sub")
-            if email:
-                with next(get_db()) as db:
-                    user = db.query(LocalUser).filter(LocalUser.email == email).first()
-                    if user and user.github_token:
-                        github_token = user.github_token
-        except JWTError:
-            # Fallback: Treat as the GitHub token itself
-            github_token = token
-            
-    if github_token:
-        headers["Authorization"] = f"Bearer {github_token}"
+    results = await service.search_batch(
+        batch.queries, principal.github_token, batch.source,
+        concurrency=service.settings.search_batch_concurrency,
+    )
+    return model_response(SearchBatchResponse(results=results))
+
+
+@router.get("/analytics")
+async def user_analytics(
+    principal: Principal = Depends(get_principal),
+    analytics: AnalyticsService = Depends(get_analytics)
+):
+    """Language, star and activity aggregates for the caller's GitHub account"""
+    if principal.github_token is None:
+        raise HTTPException(status_code=401, detail="GitHub account not connected")
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{settings.github_api_base}/search/repositories",
-                params=params,
-                headers=headers,
-                timeout=30.0,
-            )
-            
-            if response.status_code == 422:
-                logger.warning(f"Invalid search query: {search_query}")
-                raise HTTPException(
-                    status_code=422,
-                    detail="Invalid search query. Please check your parameters."
-                )
-            
-            if response.status_code == 403:
-                logger.warning("GitHub API rate limit exceeded")
-                raise HTTPException(
-                    status_code=403,
-                    detail="API rate limit exceeded. Please try again later or authenticate."
-                )
-            
-            if response.status_code != 200:
-                logger.error(f"GitHub API error: {response.status_code}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="GitHub API error occurred"
-                )
-            
-            data = response.json()
-            
-            return SearchResponse(
-                total_count=data["total_count"],
-                items=data["items"],
-                incomplete_results=data["incomplete_results"]
-            )
-        
-        except httpx.TimeoutException:
-            logger.error("GitHub API request timeout")
-            raise HTTPException(status_code=504, detail="Request timeout. Please try again.")
-        except httpx.RequestError as e:
-            logger.error(f"GitHub API connection error: {str(e)}")
-            raise HTTPException(status_code=503, detail="Connection error occurred")
+    return await analytics.get(principal.github_token)
+
+
+@router.get("/cache/stats")
+async def search_cache_stats(
+    cache: Optional[TTLCache] = Depends(get_search_cache),
+    refresher: Optional[SearchRefresher] = Depends(get_search_refresher),
+    index: Optional[SearchIndex] = Depends(get_search_index)
+):
+    """Hit/miss/eviction counters for the search response cache"""
+    if cache is None:
+        stats = {"enabled": False}
+    else:
+        stats = {"enabled": True, **(await cache.stats())}
+    if refresher is not None:
+        stats["background_refresh"] = refresher.stats()
+    if index is not None:
+        stats["local_index"] = await index.stats()
+    return stats
+
 
+@router.get("/rate-limits")
+async def rate_limit_budgets(rate_limits: RateLimitManager = Depends(get_rate_limits)):
+    """Current GitHub rate-limit budgets per token bucket"""
+    return rate_limits.snapshot()
 
-from jose import jwt, JWTError
-from security import SECRET_KEY, ALGORITHM
-from database import get_db
+
+from database import get_async_db
 from models.local_user import LocalUser
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 @router.get("/user")
 async def get_user(
-    authorization: str,
+    principal: Principal = Depends(get_principal),
     settings: Settings = Depends(get_settings),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    client: httpx.AsyncClient = Depends(get_http_client),
+    rate_limits: RateLimitManager = Depends(get_rate_limits),
+    user_cache: Optional[TTLCache] = Depends(get_user_cache)
 ):
     """Get authenticated user information"""
-    if not authorization.startswith("Bearer "):
+    if principal.kind == "anonymous":
         raise HTTPException(status_code=401, detail="Invalid authorization header")
     
-    token = authorization.replace("Bearer ", "")
+    # Local JWTs were already verified by the principal dependency
+    if principal.kind == "local":
+        result = await db.execute(select(LocalUser).where(LocalUser.email == principal.email))
+        user = result.scalars().first()
+        if user is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        return {
+            "login": user.username,
+            "id": user.id,
+            "avatar_url": user.avatar_url,
+            "name": user.username,
+            "email": user.email,
+            "bio": "Local User",
+            "github_connected": user.github_id is not None
+        }
+    
+    token = principal.github_token
     
-    # Try decoding as local JWT first
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        if email:
-            user = db.query(LocalUser).filter(LocalUser.email == email).first()
-            if user:
-                return {
-                    "login": user.username,
-                    "id": user.id,
-                    "avatar_url": user.avatar_url,
-                    "name": user.username,
-                    "email": user.email,
-                    "bio": "Local User",
-                    "github_connected": user.github_id is not None
-                }
-    except JWTError:
-        pass # Not a local token, try GitHub
+    # GitHub tokens: cached profile while fresh, then revalidated with GitHub
+    cache_key = user_cache_key(token)
+    cached = await user_cache.get_entry(cache_key) if user_cache is not None else None
+    if cached is not None and user_cache.is_fresh(cached):
+        return dict(cached.value)
+    
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github.v3+json",
+    }
+    if cached is not None:
+        headers.update(conditional_headers(cached.etag, cached.last_modified))
     
-    # Fallback to GitHub API
-    async with httpx.AsyncClient() as client:
+    await rate_limits.acquire(token, "core")
+    try:
         response = await client.get(
             f"{settings.github_api_base}/user",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/vnd.github.v3+json",
-            }
+            headers=headers,
+            timeout=endpoint_timeout(settings, settings.github_user_timeout),
         )
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-        
-        data = response.json()
-        data["github_connected"] = True # If we got here with a token, it's connected
-        return data
+    except httpx.RequestError as e:
+        # Stale-if-error: the profile we already hold beats an error page
+        if cached is not None:
+            logger.warning(f"Serving cached GitHub profile after upstream error: {type(e).__name__}")
+            return dict(cached.value)
+        if isinstance(e, CircuitOpenError):
+            raise upstream_unavailable(e)
+        if isinstance(e, httpx.TimeoutException):
+            logger.error("GitHub /user request timeout")
+            raise HTTPException(status_code=504, detail="Request timeout. Please try again.")
+        logger.error(f"GitHub /user connection error: {str(e)}")
+        raise HTTPException(status_code=503, detail="Connection error occurred")
+    
+    if response.status_code == 304 and cached is not None:
+        await user_cache.touch(cache_key)
+        return dict(cached.value)
+    
+    if response.status_code >= 500:
+        if cached is not None:
+            logger.warning(f"Serving cached GitHub profile after upstream error {response.status_code}")
+            return dict(cached.value)
+        logger.error(f"GitHub API error: {response.status_code}")
+        raise HTTPException(status_code=502, detail="GitHub API error occurred")
+    
+    if response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    data = response.json()
+    data["github_connected"] = True # If we got here with a token, it's connected
+    if user_cache is not None:
+        await user_cache.set(
+            cache_key, data,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+    return data
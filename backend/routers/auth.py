@@ -6,10 +6,14 @@ from datetime import datetime, timedelta
 import jwt
 from fastapi import Request, Header
 from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
 from fastapi.responses import RedirectResponse
 import httpx
 from urllib.parse import urlencode, urlparse
 from config import get_settings, Settings
+from github_client import get_http_client, endpoint_timeout
+from cache import TTLCache, get_user_cache, user_cache_key
+from principal import PrincipalResolver, bearer_token, get_principal_resolver
 from models.user import User
 from models.searchrequest import SearchRequest
 
@@ -54,11 +58,10 @@ def get_callback_url(request: Request) -> str:
     return f"{request.base_url.scheme}://{request.base_url.hostname}/auth/callback"
 
 
-from database import get_db
+from database import get_async_db
 from models.local_user import LocalUser
-from sqlalchemy.orm import Session
-from security import SECRET_KEY, ALGORITHM
-from jose import jwt as jose_jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 @router.get("/github")
 async def github_auth(
@@ -112,7 +115,10 @@ async def github_callback(
     state: str,
     request: Request,
     settings: Settings = Depends(get_settings),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    client: httpx.AsyncClient = Depends(get_http_client),
+    resolver: PrincipalResolver = Depends(get_principal_resolver),
+    user_cache: Optional[TTLCache] = Depends(get_user_cache)
 ):
     """Handle GitHub OAuth callback with CSRF validation"""
     logger.info("Processing OAuth callback")
@@ -132,82 +138,99 @@ async def github_callback(
     link_token = request.cookies.get("link_token")
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Exchange code for access token
-            token_response = await client.post(
-                f"{settings.github_oauth_base}/login/oauth/access_token",
-                headers={"Accept": "application/json"},
-                data={
-                    "client_id": settings.github_client_id,
-                    "client_secret": settings.github_client_secret,
-                    "code": code,
-                }
+        # Exchange code for access token
+        token_response = await client.post(
+            f"{settings.github_oauth_base}/login/oauth/access_token",
+            headers={"Accept": "application/json"},
+            data={
+                "client_id": settings.github_client_id,
+                "client_secret": settings.github_client_secret,
+                "code": code,
+            },
+            timeout=endpoint_timeout(settings, settings.github_oauth_timeout),
+        )
+        
+        token_data = token_response.json()
+        access_token = token_data.get("access_token")
+        
+        if not access_token:
+            raise HTTPException(status_code=400, detail="No access token received")
+        
+        # Get user information
+        user_response = await client.get(
+            f"{settings.github_api_base}/user",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Accept": "application/vnd.github.v3+json",
+            },
+            timeout=endpoint_timeout(settings, settings.github_user_timeout),
+        )
+        user_data = user_response.json()
+        
+        # Seed the profile cache so the client's first /api/user call is free
+        if user_cache is not None and user_response.status_code == 200:
+            await user_cache.set(
+                user_cache_key(access_token), {**user_data, "github_connected": True},
+                etag=user_response.headers.get("etag"),
+                last_modified=user_response.headers.get("last-modified"),
             )
-            
-            token_data = token_response.json()
-            access_token = token_data.get("access_token")
-            
-            if not access_token:
-                raise HTTPException(status_code=400, detail="No access token received")
-            
-            # Get user information
-            user_response = await client.get(
-                f"{settings.github_api_base}/user",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json",
-                }
-            )
-            user_data = user_response.json()
-            
-            # If linking, update local user
-            if link_token:
-                try:
-                    payload = jose_jwt.decode(link_token, SECRET_KEY, algorithms=[ALGORITHM])
-                    email = payload.get("sub")
-                    if email:
-                        local_user = db.query(LocalUser).filter(LocalUser.email == email).first()
-                        if local_user:
-                            local_user.github_id = user_data.get("id")
-                            local_user.github_token = access_token
-                            local_user.avatar_url = user_data.get("avatar_url")
-                            db.commit()
-                            logger.info(f"Linked GitHub account {user_data.get('login')} to local user {email}")
-                except Exception as link_err:
-                    logger.error(f"Failed to link account: {str(link_err)}")
-            
-            # Create redirect response
-            callback_redirect = f"{frontend_url}/auth/callback"
-            response = RedirectResponse(url=callback_redirect)
-            
-            is_production = request.base_url.scheme == "https"
-            
-            # Set cookies
-            response.set_cookie(
-                key="github_token",
-                value=access_token,
-                max_age=3600,
-                httponly=True,
-                secure=is_production,
-                samesite="lax"
-            )
-            
-            response.set_cookie(
-                key="user_data",
-                value=json.dumps(user_data),
-                max_age=3600,
-                httponly=False,
-                secure=is_production,
-                samesite="lax"
-            )
-            
-            # Clear temporary cookies
-            response.delete_cookie("oauth_state")
-            response.delete_cookie("frontend_url")
-            response.delete_cookie("link_token")
-            
-            return response
-            
+        
+        # If linking, update local user
+        if link_token:
+            try:
+                # Same verifier (and claims cache) as every other route taking a local token
+                payload = await resolver.verifier.verify(link_token)
+                if payload is None:
+                    logger.warning("Ignoring invalid or expired link token")
+                email = (payload or {}).get("sub")
+                if email:
+                    result = await db.execute(select(LocalUser).where(LocalUser.email == email))
+                    local_user = result.scalars().first()
+                    if local_user:
+                        # The previously linked token's profile no longer applies
+                        if local_user.github_token and user_cache is not None:
+                            await user_cache.delete(user_cache_key(local_user.github_token))
+                        local_user.github_id = user_data.get("id")
+                        local_user.github_token = access_token
+                        local_user.avatar_url = user_data.get("avatar_url")
+                        await db.commit()
+                        await resolver.invalidate_email(email)
+                        logger.info(f"Linked GitHub account {user_data.get('login')} to local user {email}")
+            except Exception as link_err:
+                logger.error(f"Failed to link account: {str(link_err)}")
+        
+        # Create redirect response
+        callback_redirect = f"{frontend_url}/auth/callback"
+        response = RedirectResponse(url=callback_redirect)
+        
+        is_production = request.base_url.scheme == "https"
+        
+        # Set cookies
+        response.set_cookie(
+            key="github_token",
+            value=access_token,
+            max_age=3600,
+            httponly=True,
+            secure=is_production,
+            samesite="lax"
+        )
+        
+        response.set_cookie(
+            key="user_data",
+            value=json.dumps(user_data),
+            max_age=3600,
+            httponly=False,
+            secure=is_production,
+            samesite="lax"
+        )
+        
+        # Clear temporary cookies
+        response.delete_cookie("oauth_state")
+        response.delete_cookie("frontend_url")
+        response.delete_cookie("link_token")
+        
+        return response
+        
     except Exception as e:
         logger.error(f"OAuth authentication failed: {str(e)}")
         error_redirect = f"{frontend_url}/auth/error?message=authentication_failed"
@@ -221,10 +244,15 @@ async def github_callback(
 
 
 @router.post("/logout")
-async def logout(request: Request):
-    """Logout user by clearing cookies"""
+async def logout(request: Request, user_cache: Optional[TTLCache] = Depends(get_user_cache)):
+    """Logout user by clearing cookies and forgetting the cached GitHub profile"""
     frontend_url = get_frontend_url(request)
     
+    if user_cache is not None:
+        for token in (request.cookies.get("github_token"), bearer_token(request.headers.get("authorization"))):
+            if token:
+                await user_cache.delete(user_cache_key(token))
+    
     response = RedirectResponse(url=frontend_url)
     response.delete_cookie("github_token")
     response.delete_cookie("user_data")
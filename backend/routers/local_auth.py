@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from database import get_db, Base, engine
+from database import get_async_db, Base, engine
 from models.local_user import LocalUser
-from security import get_password_hash, verify_password, create_access_token
+from security import PasswordHashPool, PasswordHasherBusy, create_access_token
 from datetime import timedelta
 
 # Create database tables
@@ -25,32 +26,75 @@ class Token(BaseModel):
     token_type: str
     user: dict
 
+
+async def get_password_pool(request: Request) -> PasswordHashPool:
+    """Dependency returning the bounded Argon2 worker pool"""
+    return request.app.state.password_pool
+
+
+def hashing_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service is busy. Please try again shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(LocalUser).filter(LocalUser.email == user.email).first()
+async def register(
+    user: UserCreate,
+    db: AsyncSession = Depends(get_async_db),
+    password_pool: PasswordHashPool = Depends(get_password_pool)
+):
+    result = await db.execute(select(LocalUser).where(LocalUser.email == user.email))
+    db_user = result.scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    # Argon2 is deliberately slow; run it on the bounded hashing pool
+    try:
+        hashed_password = await password_pool.hash(user.password)
+    except PasswordHasherBusy:
+        raise hashing_unavailable()
     new_user = LocalUser(
         email=user.email, 
         username=user.username, 
         hashed_password=hashed_password
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
     return {"message": "User created successfully"}
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(LocalUser).filter(LocalUser.email == user_data.email).first()
-    if not user or not verify_password(user_data.password, user.hashed_password):
+async def login_for_access_token(
+    user_data: UserLogin,
+    db: AsyncSession = Depends(get_async_db),
+    password_pool: PasswordHashPool = Depends(get_password_pool)
+):
+    result = await db.execute(select(LocalUser).where(LocalUser.email == user_data.email))
+    user = result.scalars().first()
+    
+    verified, new_hash = False, None
+    if user:
+        try:
+            verified, new_hash = await password_pool.verify_and_update(
+                user_data.password, user.hashed_password
+            )
+        except PasswordHasherBusy:
+            raise hashing_unavailable()
+    
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    # Transparently upgrade hashes created with older Argon2 parameters
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
         data={"sub": user.email, "type": "local"}, expires_delta=access_token_expires
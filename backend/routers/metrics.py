@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from metrics import Metrics, get_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics(metrics: Optional[Metrics] = Depends(get_metrics)):
+    """Prometheus text exposition of request, upstream, DB, hashing and cache metrics"""
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+import logging
+from config import get_settings, Settings
+from database import get_async_db, Base, engine
+from models.local_user import LocalUser
+from models.repository import Repository
+from models.saved_repository import SavedRepository
+from models.savedsync import SavedChange, SavedSyncRequest, SavedSyncResponse
+from principal import Principal, get_principal
+from saved_repos import apply_changes, changes_since, current_version
+
+# Create database tables
+Base.metadata.create_all(bind=engine)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/saved", tags=["saved"])
+
+
+async def get_saved_owner(
+    principal: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_async_db)
+) -> LocalUser:
+    """Local account owning the caller's saved repositories"""
+    if principal.kind == "local":
+        condition = LocalUser.email == principal.email
+    elif principal.kind == "github":
+        # GitHub sign-ins sync through the local account they are linked to
+        condition = LocalUser.github_token == principal.github_token
+    else:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    
+    result = await db.execute(select(LocalUser).where(condition))
+    user = result.scalars().first()
+    if user is None:
+        raise HTTPException(status_code=403, detail="Saved repositories require a local account")
+    return user
+
+
+def sync_response(version: int, rows: List[SavedRepository]) -> SavedSyncResponse:
+    return SavedSyncResponse(
+        version=version,
+        changes=[
+            SavedChange(
+                repo_id=row.repo_id,
+                version=row.version,
+                deleted=row.deleted,
+                repository=None if row.deleted else Repository.model_validate_json(row.data),
+            )
+            for row in rows
+        ],
+    )
+
+
+@router.get("", response_model=SavedSyncResponse)
+async def list_saved_changes(
+    since: int = Query(0, ge=0, description="Last version the client has seen"),
+    user: LocalUser = Depends(get_saved_owner),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Saved repositories changed after `since` (everything when 0)"""
+    version = await current_version(db, user.id)
+    rows = await changes_since(db, user.id, since) if since < version else []
+    return sync_response(version, rows)
+
+
+@router.post("/sync", response_model=SavedSyncResponse)
+async def sync_saved_repositories(
+    sync: SavedSyncRequest,
+    user: LocalUser = Depends(get_saved_owner),
+    db: AsyncSession = Depends(get_async_db),
+    settings: Settings = Depends(get_settings)
+):
+    """Apply a client's saves/removals and return every change it hasn't seen"""
+    if len(sync.upserts) + len(sync.deletes) > settings.saved_sync_max_items:
+        raise HTTPException(
+            status_code=422,
+            detail=f"A sync may contain at most {settings.saved_sync_max_items} changes"
+        )
+    
+    version = await apply_changes(db, user.id, sync.upserts, sync.deletes)
+    logger.info(f"Saved repository sync for user {user.id}: version {version}")
+    rows = await changes_since(db, user.id, sync.since) if sync.since < version else []
+    return sync_response(version, rows)
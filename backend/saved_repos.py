@@ -0,0 +1,267 @@
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, Iterable, List, Tuple
+from fastapi import HTTPException
+import httpx
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import Settings
+from database import AsyncSessionLocal
+from github_client import endpoint_timeout
+from github_resilience import IDEMPOTENT
+from models.repository import Repository
+from models.saved_repository import SavedRepository
+from models.saved_version import SavedVersion
+
+logger = logging.getLogger(__name__)
+
+
+async def current_version(db: AsyncSession, user_id: int) -> int:
+    """Latest change counter for a user's saved repositories (0 when empty)"""
+    result = await db.execute(
+        select(func.max(SavedRepository.version)).where(SavedRepository.user_id == user_id)
+    )
+    return result.scalar() or 0
+
+
+async def next_version(db: AsyncSession, user_id: int) -> int:
+    """Allocate the user's next change version inside the caller's transaction
+
+    The counter row is written first, which takes the database write lock
+    until commit/rollback, so concurrent syncs get distinct versions and
+    whatever the caller reads afterwards is current. A missing counter is
+    seeded from the rows already stored.
+    """
+    await db.execute(
+        insert(SavedVersion)
+        .values(
+            user_id=user_id,
+            version=select(func.coalesce(func.max(SavedRepository.version), 0))
+            .where(SavedRepository.user_id == user_id)
+            .scalar_subquery(),
+        )
+        .on_conflict_do_nothing(index_elements=["user_id"])
+    )
+    result = await db.execute(
+        update(SavedVersion)
+        .where(SavedVersion.user_id == user_id)
+        .values(version=SavedVersion.version + 1)
+        .returning(SavedVersion.version)
+    )
+    return result.scalar_one()
+
+
+async def changes_since(db: AsyncSession, user_id: int, since: int) -> List[SavedRepository]:
+    """Rows changed after ``since``, with deletion tombstones unless it is a full sync"""
+    query = select(SavedRepository).where(
+        SavedRepository.user_id == user_id, SavedRepository.version > since
+    )
+    if since == 0:
+        query = query.where(SavedRepository.deleted.is_(False))
+    result = await db.execute(query.order_by(SavedRepository.version, SavedRepository.repo_id))
+    return list(result.scalars().all())
+
+
+async def apply_changes(
+    db: AsyncSession,
+    user_id: int,
+    upserts: Iterable[Repository],
+    deletes: Iterable[int],
+) -> int:
+    """Apply a client's saves and removals in one transaction; returns the new version
+
+    Items identical to what is already stored are skipped, so replaying a
+    sync doesn't produce changes for other devices. Everything that does
+    change shares a single new version.
+    """
+    upserts = {repo.id: repo for repo in upserts}
+    deletes = set(deletes) - set(upserts)
+    repo_ids = set(upserts) | deletes
+    if not repo_ids:
+        return await current_version(db, user_id)
+
+    # Allocate first so the rows below are read under the write lock
+    version = await next_version(db, user_id)
+    result = await db.execute(
+        select(SavedRepository).where(
+            SavedRepository.user_id == user_id, SavedRepository.repo_id.in_(repo_ids)
+        )
+    )
+    existing = {row.repo_id: row for row in result.scalars().all()}
+    changed = False
+
+    for repo_id, repo in upserts.items():
+        data = repo.model_dump_json()
+        row = existing.get(repo_id)
+        if row is None:
+            db.add(SavedRepository(
+                user_id=user_id,
+                repo_id=repo_id,
+                full_name=repo.full_name,
+                data=data,
+                stargazers_count=repo.stargazers_count,
+                forks_count=repo.forks_count,
+                version=version,
+                deleted=False,
+            ))
+            changed = True
+        elif row.deleted or row.data != data:
+            row.full_name = repo.full_name
+            row.data = data
+            row.stargazers_count = repo.stargazers_count
+            row.forks_count = repo.forks_count
+            row.deleted = False
+            row.version = version
+            changed = True
+
+    for repo_id in deletes:
+        row = existing.get(repo_id)
+        if row is not None and not row.deleted:
+            row.deleted = True
+            row.version = version
+            changed = True
+
+    if not changed:
+        # Still holding the lock, so the number can be handed back: replays
+        # must not advance the version other devices sync from
+        version -= 1
+        await db.execute(
+            update(SavedVersion).where(SavedVersion.user_id == user_id).values(version=version)
+        )
+    await db.commit()
+    return version
+
+
+def star_query(full_names: List[str]) -> Tuple[str, dict]:
+    """One GraphQL query fetching star/fork counts for many repositories via aliases"""
+    params, fields, variables = [], [], {}
+    for i, full_name in enumerate(full_names):
+        owner, _, name = full_name.partition("/")
+        params.append(f"$o{i}: String!, $n{i}: String!")
+        fields.append(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ stargazerCount forkCount }}")
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = name
+    query = f"query({', '.join(params)}) {{ {' '.join(fields)} }}"
+    return query, variables
+
+
+class SavedRepositoryRefresher:
+    """Periodic job keeping star/fork counts of saved repositories current
+
+    Each distinct repository is looked up once no matter how many users
+    saved it, up to ``batch_size`` per GraphQL call. Rows whose counts moved
+    get a new version so clients pick them up on their next sync.
+    GraphQL needs a token, so the job only runs with server tokens configured.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        settings: Settings,
+        rate_limits=None,
+        session_factory: Callable = AsyncSessionLocal,
+        batch_size: int = 100,
+    ):
+        self.client = client
+        self.settings = settings
+        self.rate_limits = rate_limits
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.runs = 0
+        self.updated = 0
+        self.failed = 0
+
+    async def _fetch_counts(self, full_names: List[str], token: str) -> Dict[str, Tuple[int, int]]:
+        query, variables = star_query(full_names)
+        if self.rate_limits is not None:
+            await self.rate_limits.acquire(token, "graphql")
+        response = await self.client.post(
+            f"{self.settings.github_api_base}/graphql",
+            json={"query": query, "variables": variables},
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=endpoint_timeout(self.settings, self.settings.github_search_timeout),
+            extensions=IDEMPOTENT,
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail="GitHub API error occurred")
+
+        # Deleted or renamed repositories come back as null alongside NOT_FOUND errors
+        data = response.json().get("data") or {}
+        counts = {}
+        for i, full_name in enumerate(full_names):
+            node = data.get(f"r{i}")
+            if node:
+                counts[full_name] = (node["stargazerCount"], node["forkCount"])
+        return counts
+
+    async def _apply_counts(self, db: AsyncSession, counts: Dict[str, Tuple[int, int]]) -> int:
+        result = await db.execute(
+            select(SavedRepository).where(
+                SavedRepository.full_name.in_(counts), SavedRepository.deleted.is_(False)
+            )
+        )
+        stale = [
+            row for row in result.scalars().all()
+            if (row.stargazers_count, row.forks_count) != counts[row.full_name]
+        ]
+        if not stale:
+            return 0
+
+        versions = {}
+        for user_id in {row.user_id for row in stale}:
+            versions[user_id] = await next_version(db, user_id)
+        for row in stale:
+            stars, forks = counts[row.full_name]
+            data = json.loads(row.data)
+            data["stargazers_count"], data["forks_count"] = stars, forks
+            # Same compact encoding as model_dump_json so replayed client syncs still compare equal
+            row.data = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+            row.stargazers_count, row.forks_count = stars, forks
+            row.version = versions[row.user_id]
+        await db.commit()
+        return len(stale)
+
+    async def refresh_all(self) -> int:
+        """Refresh every saved repository's counts; returns the number of rows updated"""
+        token = self.rate_limits.pick_server_token("graphql") if self.rate_limits is not None else None
+        if token is None:
+            logger.debug("Skipping saved repository refresh: no server token configured")
+            return 0
+
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(SavedRepository.full_name)
+                .where(SavedRepository.deleted.is_(False))
+                .distinct()
+                .order_by(SavedRepository.full_name)
+            )
+            full_names = list(result.scalars().all())
+
+            updated = 0
+            for start in range(0, len(full_names), self.batch_size):
+                counts = await self._fetch_counts(full_names[start:start + self.batch_size], token)
+                updated += await self._apply_counts(db, counts)
+
+        self.runs += 1
+        self.updated += updated
+        return updated
+
+    async def run(self, interval: float):
+        """Periodic refresh loop started from the app lifespan"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                updated = await self.refresh_all()
+                logger.info(f"Saved repository refresh updated {updated} rows")
+            except HTTPException as e:
+                self.failed += 1
+                logger.warning(f"Saved repository refresh failed: {e.detail}")
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Saved repository refresh error: {str(e)}")
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "updated": self.updated, "failed": self.failed}
+
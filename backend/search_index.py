@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+from fastapi import Request
+from models.repository import Repository
+from models.searchrequest import SearchRequest
+from models.searchresponse import SearchResponse
+
+logger = logging.getLogger(__name__)
+
+# Column weights for bm25(): name matches outrank full_name, then description
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+SORT_COLUMNS = {
+    "stars": "r.stars",
+    "forks": "r.forks",
+    "updated": "r.updated_at",
+}
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def match_expression(query: str) -> Optional[str]:
+    """Turn a free-text query into an FTS5 MATCH expression (all terms, prefix match)
+
+    GitHub qualifiers such as ``language:python`` are skipped; filters are
+    applied from the validated search parameters instead.
+    """
+    terms = []
+    for word in query.split():
+        if ":" in word:
+            continue
+        terms.extend(_TERM.findall(word.lower()))
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+class SearchIndex:
+    """Persistent full-text index over repositories seen in GitHub search results
+
+    Repositories are stored once per id with their stats, and their name,
+    full name and description are indexed with SQLite FTS5. Queries rank by
+    the requested sort column (stars, forks, updated) and fall back to bm25
+    relevance, so common searches can be answered without calling GitHub.
+    Queries run in a worker thread to keep the event loop free.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_repositories: int = 100000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.max_repositories = max_repositories
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS repositories ("
+            "id INTEGER PRIMARY KEY, payload TEXT NOT NULL, language TEXT COLLATE NOCASE, "
+            "stars INTEGER NOT NULL, forks INTEGER NOT NULL, updated_at TEXT NOT NULL, "
+            "indexed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_repositories_indexed ON repositories (indexed_at)")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS repositories_fts USING fts5("
+            "name, full_name, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        self.hits = 0
+        self.misses = 0
+        self.ingested = 0
+
+    def _ingest(self, repositories: List[Repository]) -> int:
+        now = self._clock()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for repo in repositories:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO repositories "
+                        "(id, payload, language, stars, forks, updated_at, indexed_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            repo.id, repo.model_dump_json(), repo.language,
+                            repo.stargazers_count, repo.forks_count, repo.updated_at, now,
+                        ),
+                    )
+                    self._conn.execute("DELETE FROM repositories_fts WHERE rowid = ?", (repo.id,))
+                    self._conn.execute(
+                        "INSERT INTO repositories_fts (rowid, name, full_name, description) VALUES (?, ?, ?, ?)",
+                        (repo.id, repo.name, repo.full_name, repo.description or ""),
+                    )
+                self._prune()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(repositories)
+
+    def _prune(self):
+        """Drop the least recently seen repositories beyond ``max_repositories``"""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM repositories").fetchone()
+        excess = count - self.max_repositories
+        if excess <= 0:
+            return
+        stale = "SELECT id FROM repositories ORDER BY indexed_at LIMIT ?"
+        self._conn.execute(f"DELETE FROM repositories_fts WHERE rowid IN ({stale})", (excess,))
+        self._conn.execute(f"DELETE FROM repositories WHERE id IN ({stale})", (excess,))
+
+    def _search(self, search_params: SearchRequest) -> SearchResponse:
+        expression = match_expression(search_params.q)
+        if expression is None:
+            return SearchResponse(total_count=0, items=[], incomplete_results=False)
+
+        where = ["repositories_fts MATCH ?"]
+        args: list = [expression]
+        if search_params.language:
+            where.append("r.language = ?")
+            args.append(search_params.language)
+        if search_params.min_stars:
+            where.append("r.stars >= ?")
+            args.append(search_params.min_stars)
+        filters = " AND ".join(where)
+
+        rank = f"bm25(repositories_fts, {', '.join(str(w) for w in BM25_WEIGHTS)})"
+        order = "ASC" if (search_params.order or "").lower() == "asc" else "DESC"
+        sort_column = SORT_COLUMNS.get((search_params.sort or "").lower())
+        order_by = f"{sort_column} {order}, {rank}" if sort_column else rank
+
+        base = "FROM repositories_fts JOIN repositories r ON r.id = repositories_fts.rowid"
+        offset = (search_params.page - 1) * search_params.per_page
+        with self._lock:
+            (total,) = self._conn.execute(f"SELECT COUNT(*) {base} WHERE {filters}", args).fetchone()
+            rows = self._conn.execute(
+                f"SELECT r.payload {base} WHERE {filters} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                (*args, search_params.per_page, offset),
+            ).fetchall()
+
+        return SearchResponse(
+            total_count=total,
+            items=[Repository.model_validate(json.loads(payload)) for (payload,) in rows],
+            incomplete_results=False,
+        )
+
+    def _count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM repositories").fetchone()[0]
+
+    async def ingest(self, repositories: Iterable[Repository]):
+        """Add or update repositories; index failures never fail the search itself"""
+        repositories = list(repositories)
+        if not repositories:
+            return
+        try:
+            self.ingested += await asyncio.to_thread(self._ingest, repositories)
+        except sqlite3.Error as e:
+            logger.warning(f"Search index ingest failed: {str(e)}")
+
+    async def search(self, search_params: SearchRequest) -> SearchResponse:
+        """Answer a search from the index; an empty page counts as a miss"""
+        response = await asyncio.to_thread(self._search, search_params)
+        if response.items:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return response
+
+    async def stats(self) -> dict:
+        return {
+            "repositories": await asyncio.to_thread(self._count),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ingested": self.ingested,
+        }
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+async def get_search_index(request: Request) -> Optional[SearchIndex]:
+    """Dependency returning the local repository index (None when disabled)"""
+    return request.app.state.search_index
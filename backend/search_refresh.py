@@ -0,0 +1,218 @@
+import asyncio
+import heapq
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from fastapi import HTTPException, Request
+import httpx
+from cache import CacheEntry, TTLCache
+from config import Settings
+from github_search import refresh_search
+from models.searchrequest import SearchRequest
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class HotKeyTracker:
+    """Approximate request counts per anonymous search key with periodic decay"""
+
+    def __init__(self, max_tracked: int = 1000):
+        self.max_tracked = max_tracked
+        self._counts: Dict[str, float] = {}
+        self._params: Dict[str, SearchRequest] = {}
+
+    def record(self, key: str, search_params: SearchRequest):
+        self._counts[key] = self._counts.get(key, 0.0) + 1
+        self._params[key] = search_params
+        if len(self._counts) > self.max_tracked:
+            # Drop the coldest key to keep memory bounded
+            coldest = min(self._counts, key=self._counts.get)
+            del self._counts[coldest]
+            del self._params[coldest]
+
+    def top(self, k: int) -> list[Tuple[str, SearchRequest]]:
+        keys = heapq.nlargest(k, self._counts, key=self._counts.get)
+        return [(key, self._params[key]) for key in keys]
+
+    def decay(self, factor: float = 0.5):
+        for key in list(self._counts):
+            self._counts[key] *= factor
+            if self._counts[key] < 0.5:
+                del self._counts[key]
+                del self._params[key]
+
+    def __len__(self):
+        return len(self._counts)
+
+
+class SearchRefresher:
+    """Background refresh of cached searches (stale-while-revalidate and hot keys)
+
+    Refreshes run through the same single-flight group as foreground requests
+    and are bounded by ``max_concurrency``; when that many refreshes are
+    already running, further ones are skipped rather than queued, since the
+    next request for the key will simply try again.
+
+    It also prefetches the page after the one a user just fetched, as long as
+    the token keeps ``prefetch_min_remaining`` search calls in hand, and
+    counts how many prefetched pages were actually requested afterwards.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        settings: Settings,
+        cache: TTLCache,
+        flight: SingleFlight,
+        rate_limits=None,
+        max_concurrency: int = 4,
+        hot_keys: int = 20,
+        index=None,
+        prefetch_min_remaining: int = 10,
+        max_prefetched: int = 1024,
+    ):
+        self.client = client
+        self.settings = settings
+        self.cache = cache
+        self.flight = flight
+        self.rate_limits = rate_limits
+        self.max_concurrency = max_concurrency
+        self.hot_keys = hot_keys
+        self.index = index
+        self.prefetch_min_remaining = prefetch_min_remaining
+        self.max_prefetched = max_prefetched
+        self._prefetched: OrderedDict = OrderedDict()
+        self.tracker = HotKeyTracker()
+        self._tasks: Set[asyncio.Task] = set()
+        self._refreshing: Set[str] = set()
+        self.scheduled = 0
+        self.skipped = 0
+        self.failed = 0
+        self.prefetch_issued = 0
+        self.prefetch_hits = 0
+        self.prefetch_skipped = 0
+
+    def track(self, key: str, search_params: SearchRequest, github_token: Optional[str]):
+        # Only anonymous queries are pre-refreshed, so user tokens are never retained
+        if github_token is None and self.hot_keys > 0:
+            self.tracker.record(key, search_params)
+
+    def schedule(
+        self,
+        key: str,
+        search_params: SearchRequest,
+        github_token: Optional[str] = None,
+        stale: Optional[CacheEntry] = None,
+        fetch_token: Optional[str] = None,
+    ) -> bool:
+        """Start a background refresh for a key unless one is running or we're at capacity
+
+        ``fetch_token`` overrides the token the request is sent with (a server
+        token already budget-checked for an anonymous key); ``github_token``
+        still decides whether the results are anonymous.
+        """
+        if key in self._refreshing:
+            return False
+        if len(self._tasks) >= self.max_concurrency:
+            self.skipped += 1
+            return False
+
+        self._refreshing.add(key)
+        task = asyncio.ensure_future(self._refresh(key, search_params, github_token, stale, fetch_token))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.scheduled += 1
+        return True
+
+    def prefetch(self, key: str, search_params: SearchRequest, github_token: Optional[str] = None) -> bool:
+        """Speculatively fetch a page into the cache if the token's budget allows it"""
+        fetch_token = github_token
+        if github_token is None and self.rate_limits is not None:
+            fetch_token = self.rate_limits.pick_server_token("search")
+        if self.rate_limits is not None and not self.rate_limits.has_headroom(
+            fetch_token, "search", self.prefetch_min_remaining
+        ):
+            self.prefetch_skipped += 1
+            return False
+        if not self.schedule(key, search_params, github_token, fetch_token=fetch_token):
+            return False
+
+        self.prefetch_issued += 1
+        self._prefetched[key] = True
+        if len(self._prefetched) > self.max_prefetched:
+            self._prefetched.popitem(last=False)
+        return True
+
+    def record_request(self, key: str):
+        """Count a foreground request for a key that was prefetched earlier"""
+        if self._prefetched.pop(key, None) is not None:
+            self.prefetch_hits += 1
+
+    async def _refresh(self, key, search_params, github_token, stale, fetch_token=None):
+        # Results fetched with a caller's own token may include private repos
+        index = self.index if github_token is None else None
+        if fetch_token is None:
+            fetch_token = github_token
+        if fetch_token is None and self.rate_limits is not None:
+            fetch_token = self.rate_limits.pick_server_token("search")
+        try:
+            await self.flight.do(
+                key,
+                lambda: refresh_search(
+                    self.client, self.settings, self.cache, key, search_params,
+                    fetch_token, self.rate_limits, stale=stale, index=index,
+                ),
+            )
+        except HTTPException as e:
+            self.failed += 1
+            self._prefetched.pop(key, None)
+            logger.warning(f"Background refresh failed for {key}: {e.detail}")
+        except Exception as e:
+            self.failed += 1
+            self._prefetched.pop(key, None)
+            logger.error(f"Background refresh error for {key}: {str(e)}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def refresh_hot_keys(self, refresh_ahead: float):
+        """Refresh the most requested keys that are missing or about to go stale"""
+        for key, search_params in self.tracker.top(self.hot_keys):
+            entry = await self.cache.peek(key)
+            if entry is None or self.cache.expires_within(entry, refresh_ahead):
+                self.schedule(key, search_params, stale=entry)
+        self.tracker.decay()
+
+    async def run(self, interval: float, refresh_ahead: float):
+        """Periodic hot-key refresh loop started from the app lifespan"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh_hot_keys(refresh_ahead)
+            except Exception as e:
+                logger.error(f"Hot key refresh loop error: {str(e)}")
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._tasks),
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "tracked_keys": len(self.tracker),
+            "prefetch": {
+                "issued": self.prefetch_issued,
+                "hits": self.prefetch_hits,
+                "skipped_budget": self.prefetch_skipped,
+                "hit_ratio": self.prefetch_hits / self.prefetch_issued if self.prefetch_issued else 0.0,
+            },
+        }
+
+
+async def get_search_refresher(request: Request) -> Optional[SearchRefresher]:
+    """Dependency returning the background search refresher (None when disabled)"""
+    return request.app.state.search_refresher
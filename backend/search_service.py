@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+import math
+from fastapi import Depends, HTTPException
+import httpx
+from pydantic import ValidationError
+from cache import TTLCache, get_search_cache
+from config import get_settings, Settings
+from github_client import get_http_client
+from github_ratelimit import RateLimitManager, get_rate_limits
+from github_search import refresh_search, search_cache_key
+from models.searchbatch import SearchBatchResult
+from models.searchrequest import SearchRequest
+from models.searchresponse import SearchResponse
+from search_index import SearchIndex, get_search_index
+from search_refresh import SearchRefresher, get_search_refresher
+from search_stream import MAX_SEARCH_RESULTS
+from singleflight import SingleFlight, get_search_flight
+
+logger = logging.getLogger(__name__)
+
+
+def validation_message(e: ValidationError) -> str:
+    """Readable one-line summary of why a batch query was rejected"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'query'}: {error['msg']}" for error in e.errors()
+    )
+
+
+@dataclass
+class SearchService:
+    """Cached, coalesced and rate-limit aware repository search
+
+    Every search entry point (single, streaming, batch, ...) goes through
+    ``search`` so they all share the response cache, single-flight group
+    and GitHub budget tracking.
+
+    ``source`` selects where answers come from: ``github`` (default),
+    ``local`` (the local index only, never calling GitHub) or ``hybrid``
+    (the local index, falling back to GitHub when it has no results).
+    """
+    client: httpx.AsyncClient
+    settings: Settings
+    cache: Optional[TTLCache]
+    flight: SingleFlight
+    rate_limits: RateLimitManager
+    refresher: Optional[SearchRefresher] = None
+    index: Optional[SearchIndex] = None
+
+    async def search(
+        self,
+        search_params: SearchRequest,
+        github_token: Optional[str] = None,
+        source: str = "github",
+        prefetch: bool = True,
+    ) -> SearchResponse:
+        if source != "github":
+            if self.index is None:
+                raise HTTPException(status_code=503, detail="Local search index is disabled")
+            local = await self.index.search(search_params)
+            if source == "local" or local.items:
+                return local
+
+        return await self._search_github(search_params, github_token, prefetch)
+
+    async def search_batch(
+        self,
+        queries: List[Union[SearchRequest, Dict[str, Any]]],
+        github_token: Optional[str] = None,
+        source: str = "github",
+        concurrency: int = 4,
+    ) -> List[SearchBatchResult]:
+        """Run many searches concurrently, reporting each query's result or error
+
+        Raw queries are validated one by one (invalid ones get a 422 entry),
+        identical queries inside the batch are executed once and at most
+        ``concurrency`` searches run at a time.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(search_params: SearchRequest) -> SearchBatchResult:
+            async with semaphore:
+                try:
+                    # Dashboard tiles rarely page on, so don't prefetch for them
+                    response = await self.search(search_params, github_token, source, prefetch=False)
+                    return SearchBatchResult(status_code=200, response=response)
+                except HTTPException as e:
+                    return SearchBatchResult(status_code=e.status_code, error=e.detail)
+                except Exception as e:
+                    logger.error(f"Batch search error for '{search_params.q}': {str(e)}")
+                    return SearchBatchResult(status_code=500, error="Internal server error")
+
+        tasks: Dict[str, asyncio.Task] = {}
+        keys: List[Union[str, SearchBatchResult]] = []
+        for query in queries:
+            try:
+                search_params = query if isinstance(query, SearchRequest) else SearchRequest(**query)
+            except ValidationError as e:
+                keys.append(SearchBatchResult(status_code=422, error=validation_message(e)))
+                continue
+            key = search_cache_key(search_params, github_token)
+            if key not in tasks:
+                tasks[key] = asyncio.ensure_future(run(search_params))
+            keys.append(key)
+        await asyncio.gather(*tasks.values())
+        return [tasks[key].result() if isinstance(key, str) else key for key in keys]
+
+    async def _search_github(
+        self,
+        search_params: SearchRequest,
+        github_token: Optional[str],
+        prefetch: bool = True,
+    ) -> SearchResponse:
+        # Serve repeated queries from the response cache
+        cache_key = search_cache_key(search_params, github_token)
+        if self.refresher is not None:
+            self.refresher.track(cache_key, search_params, github_token)
+            self.refresher.record_request(cache_key)
+
+        stale = None
+        if self.cache is not None:
+            entry = await self.cache.get_entry(cache_key)
+            if entry is not None and self.cache.is_fresh(entry):
+                return entry.value
+            # Stale-while-revalidate: answer now, refresh in the background
+            if entry is not None and self.refresher is not None and self.cache.within_stale_window(entry):
+                self.refresher.schedule(cache_key, search_params, github_token, stale=entry)
+                self.cache.stale_served += 1
+                return entry.value
+            stale = entry
+
+        # Anonymous searches can be spread across the server-side token pool
+        upstream_token = github_token or self.rate_limits.pick_server_token("search")
+        # Only public results are shared: a caller's own token can see private repos
+        index = self.index if github_token is None else None
+
+        # Identical concurrent searches share one upstream call
+        try:
+            response = await self.flight.do(
+                cache_key,
+                lambda: refresh_search(
+                    self.client, self.settings, self.cache, cache_key, search_params,
+                    upstream_token, self.rate_limits, stale=stale, index=index,
+                ),
+            )
+        except HTTPException as e:
+            # Stale-if-error: while GitHub is failing, the breaker is open or
+            # we are shedding load, an out-of-date answer beats an error page
+            if (e.status_code < 500 and e.status_code != 429) or stale is None:
+                raise
+            logger.warning(f"Serving stale search results after upstream error {e.status_code}")
+            self.cache.stale_served += 1
+            return stale.value
+        if prefetch and self.settings.search_prefetch_enabled:
+            await self._prefetch_next_page(search_params, github_token, response)
+        return response
+
+    async def _prefetch_next_page(
+        self,
+        search_params: SearchRequest,
+        github_token: Optional[str],
+        response: SearchResponse,
+    ):
+        """Warm the cache with page N+1 in the background (users nearly always page on)"""
+        if self.refresher is None or self.cache is None:
+            return
+        total = min(response.total_count, MAX_SEARCH_RESULTS)
+        if search_params.page >= min(math.ceil(total / search_params.per_page), 100):
+            return
+
+        next_params = search_params.model_copy(update={"page": search_params.page + 1})
+        next_key = search_cache_key(next_params, github_token)
+        entry = await self.cache.peek(next_key)
+        if entry is not None and self.cache.is_fresh(entry):
+            return
+        self.refresher.prefetch(next_key, next_params, github_token)
+
+
+async def get_search_service(
+    settings: Settings = Depends(get_settings),
+    client: httpx.AsyncClient = Depends(get_http_client),
+    cache: Optional[TTLCache] = Depends(get_search_cache),
+    flight: SingleFlight = Depends(get_search_flight),
+    rate_limits: RateLimitManager = Depends(get_rate_limits),
+    refresher: Optional[SearchRefresher] = Depends(get_search_refresher),
+    index: Optional[SearchIndex] = Depends(get_search_index),
+) -> SearchService:
+    """Dependency assembling the search service from app-scoped resources"""
+    return SearchService(client, settings, cache, flight, rate_limits, refresher, index)
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import math
+from collections import deque
+from typing import AsyncIterator, List, Optional
+from fastapi import HTTPException
+from models.repository import Repository
+from models.searchrequest import SearchRequest
+from models.searchresponse import SearchResponse
+
+# GitHub's search API never returns more than the first 1000 results
+MAX_SEARCH_RESULTS = 1000
+
+
+def stream_page_count(first_page: SearchResponse, limit: int, per_page: int) -> int:
+    """GitHub pages a stream of up to `limit` results fetches, the first included"""
+    total = min(first_page.total_count, limit, MAX_SEARCH_RESULTS)
+    return math.ceil(total / per_page) if total else 1
+
+
+async def stream_pages(
+    service,
+    search_params: SearchRequest,
+    github_token: Optional[str],
+    first_page: SearchResponse,
+    limit: int,
+    concurrency: int = 4,
+) -> AsyncIterator[List[Repository]]:
+    """Yield pages of repositories in order while fetching up to `concurrency` ahead
+
+    Only a sliding window of pages is ever in flight or buffered, so memory
+    stays bounded no matter how many results are requested.
+    """
+    remaining = min(first_page.total_count, limit, MAX_SEARCH_RESULTS)
+    last_page = stream_page_count(first_page, limit, search_params.per_page)
+
+    items = first_page.items[:remaining]
+    remaining -= len(items)
+    yield items
+
+    pending: deque = deque()
+    next_page = 2
+
+    def schedule_more():
+        nonlocal next_page
+        while next_page <= last_page and len(pending) < concurrency:
+            # Pages past the first are already validated by construction
+            params = search_params.model_copy(update={"page": next_page})
+            pending.append(asyncio.ensure_future(service.search(params, github_token, prefetch=False)))
+            next_page += 1
+
+    try:
+        schedule_more()
+        while pending and remaining > 0:
+            page = await pending.popleft()
+            schedule_more()
+            items = page.items[:remaining]
+            if not items:
+                break
+            remaining -= len(items)
+            yield items
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def encode_stream(
+    pages: AsyncIterator[List[Repository]],
+    first_page: SearchResponse,
+    format: str = "ndjson",
+) -> AsyncIterator[str]:
+    """Render streamed pages as NDJSON lines or Server-Sent Events (one chunk per page)"""
+    sse = format == "sse"
+    if sse:
+        meta = {
+            "total_count": first_page.total_count,
+            "incomplete_results": first_page.incomplete_results,
+        }
+        yield _sse("meta", json.dumps(meta))
+
+    try:
+        async for items in pages:
+            if sse:
+                yield "".join(_sse("repository", repo.model_dump_json()) for repo in items)
+            else:
+                yield "".join(repo.model_dump_json() + "\n" for repo in items)
+    except HTTPException as e:
+        # Headers are already sent, so report upstream failures in-band
+        error = json.dumps({"error": e.detail, "status_code": e.status_code})
+        yield _sse("error", error) if sse else error + "\n"
+        return
+
+    if sse:
+        yield _sse("end", "{}")
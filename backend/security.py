@@ -1,5 +1,8 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
@@ -10,6 +13,73 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
+
+def make_password_context(time_cost: int, memory_cost: int, parallelism: int) -> CryptContext:
+    """Argon2 context with explicit cost parameters; older hashes report needs_update"""
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__rounds=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool's queue is full"""
+
+
+class PasswordHashPool:
+    """Bounded worker pool for Argon2 hashing and verification
+
+    Argon2 releases the GIL, so a dedicated thread pool gets real parallelism
+    without pickling overhead, and keeps login storms from occupying the
+    shared threadpool other endpoints rely on. At most ``max_workers`` jobs
+    run and ``max_queue`` wait; anything beyond that is rejected immediately
+    with PasswordHasherBusy so callers can answer 503 instead of piling up.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int = 2, max_queue: int = 16, metrics=None):
+        self.context = context
+        self.metrics = metrics
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="argon2")
+        self._pending = 0
+        self.rejected = 0
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self._pending += 1
+        if self.metrics is not None:
+            fn = self.metrics.time_hash(fn)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also return a new hash if the stored one uses outdated parameters"""
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -25,3 +95,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+def token_fingerprint(token: str) -> str:
+    """Stable, non-reversible identifier for a token (never store the token itself)"""
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
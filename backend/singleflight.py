@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+from fastapi import Request
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight task
+
+    The shared work runs in its own task, so a caller that disconnects (and
+    is cancelled) never cancels the call other waiters depend on. Results and
+    exceptions are delivered to every waiter alike.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight(),
+            "leaders": self.leaders,
+            "shared": self.shared,
+        }
+
+
+async def get_search_flight(request: Request) -> SingleFlight:
+    """Dependency returning the single-flight group for upstream searches"""
+    return request.app.state.search_flight
@@ -2,13 +2,20 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import Mock
 import os
+import tempfile
 
 # Set test environment variables
+_test_dir = tempfile.mkdtemp()
 os.environ.update({
     "GITHUB_CLIENT_ID": "test_client_id",
     "GITHUB_CLIENT_SECRET": "test_client_secret", 
     "SECRET_KEY": "test_secret_key",
-    "FRONTEND_URL": "http://localhost:3000"
+    "FRONTEND_URL": "http://localhost:3000",
+    # Keep the test run away from the real scheduler.db
+    "DATABASE_URL": f"sqlite:///{_test_dir}/test.db",
+    "SEARCH_INDEX_PATH": f"{_test_dir}/search_index.db",
+    # Keep upstream retries from slowing down error-path tests
+    "GITHUB_RETRY_BACKOFF": "0.001",
 })
 
 from main import app
@@ -40,3 +47,49 @@ def client():
 def mock_settings():
     """Mock settings for testing"""
     return get_test_settings()
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """Per-test SQLite database with all tables created"""
+    from sqlalchemy import create_engine
+    from database import Base
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/test.db", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session_factory(db_engine):
+    """Async session factory bound to the per-test database"""
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import NullPool
+
+    url = str(db_engine.url).replace("sqlite://", "sqlite+aiosqlite://", 1)
+    async_engine = create_async_engine(url, poolclass=NullPool)
+    return async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def local_user(db_engine):
+    """A local account with a linked GitHub token"""
+    from sqlalchemy.orm import Session
+    from models.local_user import LocalUser
+    from security import get_password_hash
+
+    with Session(db_engine, expire_on_commit=False) as db:
+        user = LocalUser(
+            email="local@example.com",
+            username="localuser",
+            hashed_password=get_password_hash("correct-password"),
+            github_id=42,
+            github_token="gho_linked_token",
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
@@ -0,0 +1,132 @@
+import asyncio
+import httpx
+import respx
+from fastapi.testclient import TestClient
+from analytics import REPOSITORY_FIELDS, AnalyticsService, last_page
+from config import get_settings
+from security import token_fingerprint
+
+NOW = 1718000000.0  # 2024-06-10T06:13:20Z
+
+
+def repo(repo_id: int, language: str = None, stars: int = 0, private: bool = False) -> dict:
+    return {
+        "id": repo_id,
+        "name": f"repo-{repo_id}",
+        "html_url": f"https://github.com/octo/repo-{repo_id}",
+        "stargazers_count": stars,
+        "forks_count": 1,
+        "language": language,
+        "private": private,
+    }
+
+
+def push(event_id: str, day: str, commits: int = 1) -> dict:
+    return {
+        "id": event_id,
+        "type": "PushEvent",
+        "created_at": f"{day}T12:00:00Z",
+        "payload": {"commits": [{}] * commits},
+    }
+
+
+class FakeGitHub:
+    """Serves /user, paginated /user/repos and the public event feed"""
+
+    def __init__(self):
+        self.repos = [repo(i, "Python" if i % 3 else "Go", stars=i) for i in range(1, 251)]
+        self.events = [push("e2", "2024-06-09", 3), {"id": "e1", "type": "WatchEvent", "created_at": "2024-06-01T00:00:00Z"}]
+        self.calls = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request.url.path)
+        if request.url.path == "/user":
+            return httpx.Response(200, json={"login": "octo"})
+        if request.url.path == "/user/repos":
+            page = int(request.url.params["page"])
+            headers = {"link": '<https://api.github.com/user/repos?per_page=100&page=3>; rel="last"'}
+            return httpx.Response(200, json=self.repos[(page - 1) * 100:page * 100], headers=headers)
+        if request.url.path == "/users/octo/events/public":
+            return httpx.Response(200, json=self.events)
+        return httpx.Response(404)
+
+
+def test_last_page_from_link_header():
+    """Test the page count is read from GitHub's Link header"""
+    response = httpx.Response(
+        200,
+        headers={"link": '<https://api.github.com/user/repos?page=2>; rel="next", '
+                         '<https://api.github.com/user/repos?page=7>; rel="last"'},
+        request=httpx.Request("GET", "https://api.github.com/user/repos"),
+    )
+    assert last_page(response) == 7
+    assert last_page(httpx.Response(200, request=response.request)) == 1
+
+
+def test_analytics_state_keeps_only_summarized_fields():
+    """Test cached states hold slimmed repositories, not GitHub's full payloads"""
+    github = FakeGitHub()
+    github.repos = [{**repo(1, "Python", stars=5), "owner": {"login": "octo"}, "topics": ["x"] * 50}]
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(github))
+        service = AnalyticsService(client, get_settings(), clock=lambda: NOW)
+        summary = await service.get("gho_token")
+        entry = await service.cache.peek(f"analytics:{token_fingerprint('gho_token')}")
+        await client.aclose()
+        return summary, entry
+
+    summary, entry = asyncio.run(scenario())
+
+    assert summary["total_stars"] == 5
+    assert set(entry.value.repositories[0]) == set(REPOSITORY_FIELDS)
+
+
+def test_analytics_aggregates_and_updates_incrementally():
+    """Test all repo pages are aggregated, results cached, and only new events folded in"""
+    github = FakeGitHub()
+    now = [NOW]
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(github))
+        service = AnalyticsService(client, get_settings(), ttl=60, clock=lambda: now[0])
+        first = await service.get("gho_token")
+        cached = await service.get("gho_token")
+        calls_after_first = len(github.calls)
+
+        github.events = [push("e3", "2024-06-10", 2)] + github.events
+        now[0] += 120
+        refreshed = await service.get("gho_token")
+        await client.aclose()
+        return first, cached, calls_after_first, refreshed
+
+    first, cached, calls_after_first, refreshed = asyncio.run(scenario())
+
+    assert first["total_repos"] == 250
+    assert first["total_stars"] == sum(range(1, 251))
+    assert first["languages"] == {"Python": 167, "Go": 83}
+    assert [r["id"] for r in first["top_repositories"]] == [250, 249, 248, 247, 246]
+    assert first["total_commits"] == 3
+    assert first["activity"] == {"2024-06-01": 1, "2024-06-09": 1}
+    assert cached == first
+    # /user once, three repo pages, one event page; the cached visit adds nothing
+    assert calls_after_first == 5
+
+    assert refreshed["total_commits"] == 5
+    assert refreshed["active_days"] == 3
+    assert github.calls.count("/user") == 1
+
+
+@respx.mock
+def test_analytics_endpoint(client: TestClient):
+    """Test the endpoint requires a GitHub token and returns the aggregates"""
+    github = FakeGitHub()
+    respx.route(host="api.github.com").mock(side_effect=github)
+
+    anonymous = client.get("/api/analytics")
+    response = client.get("/api/analytics?authorization=Bearer gho_analytics_token")
+
+    assert anonymous.status_code == 401
+    assert response.status_code == 200
+    assert response.json()["login"] == "octo"
+    assert response.json()["total_repos"] == 250
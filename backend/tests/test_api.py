@@ -149,7 +149,8 @@ def test_get_user_missing_auth(client: TestClient):
     """Test user info retrieval without authorization"""
     response = client.get("/api/user")
     
-    assert response.status_code == 422  # Missing required parameter
+    assert response.status_code == 401
+    assert "Invalid authorization header" in response.json()["detail"]
 
 
 def test_get_user_invalid_auth_format(client: TestClient):
@@ -182,3 +183,562 @@ def test_search_pagination_validation(client: TestClient):
     # Test invalid per_page number
     response = client.get("/api/search?q=test&per_page=101")
     assert response.status_code == 422
+
+
+def test_search_uses_injected_http_client(client: TestClient):
+    """Test the shared GitHub client can be swapped for a local stand-in"""
+    from github_client import get_http_client
+
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(
+            200,
+            json={"total_count": 0, "incomplete_results": False, "items": []}
+        )
+
+    stand_in = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.app.dependency_overrides[get_http_client] = lambda: stand_in
+
+    response = client.get("/api/search?q=local")
+
+    assert response.status_code == 200
+    assert len(seen) == 1
+    assert seen[0].url.path == "/search/repositories"
+
+
+@respx.mock
+def test_search_repositories_cached(client: TestClient):
+    """Test repeated identical searches are served from the cache"""
+    route = respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(
+            200,
+            json={"total_count": 0, "incomplete_results": False, "items": []}
+        )
+    )
+
+    assert client.get("/api/search?q=React").status_code == 200
+    assert client.get("/api/search?q=react%20").status_code == 200
+    assert route.call_count == 1
+
+    # Authenticated callers do not share the anonymous keyspace
+    assert client.get("/api/search?q=react&authorization=Bearer test_token").status_code == 200
+    assert route.call_count == 2
+
+    stats = client.get("/api/cache/stats").json()
+    assert stats["enabled"] is True
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+@respx.mock
+def test_search_tracks_rate_limit_budget(client: TestClient):
+    """Test GitHub rate-limit headers are tracked and exhausted budgets shed"""
+    import time
+
+    respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(
+            200,
+            json={"total_count": 0, "incomplete_results": False, "items": []},
+            headers={
+                "X-RateLimit-Limit": "10",
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(int(time.time()) + 600),
+                "X-RateLimit-Resource": "search",
+            }
+        )
+    )
+
+    assert client.get("/api/search?q=first").status_code == 200
+
+    budgets = client.get("/api/rate-limits").json()["budgets"]
+    assert budgets == [
+        {
+            "bucket": "anonymous",
+            "resource": "search",
+            "limit": 10,
+            "remaining": 0,
+            "reset_in": budgets[0]["reset_in"],
+            "blocked_for": None,
+        }
+    ]
+
+    response = client.get("/api/search?q=second")
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+@respx.mock
+def test_search_revalidates_stale_entry_with_etag(client: TestClient):
+    """Test expired cache entries are revalidated with If-None-Match"""
+    from cache import TTLCache
+
+    # Entries go stale immediately but are retained for revalidation
+    client.app.state.search_cache = TTLCache(ttl=0, retention=60)
+    route = respx.get("https://api.github.com/search/repositories").mock(
+        side_effect=[
+            httpx.Response(
+                200,
+                json={"total_count": 7, "incomplete_results": False, "items": []},
+                headers={"ETag": '"abc123"'}
+            ),
+            httpx.Response(304),
+        ]
+    )
+
+    assert client.get("/api/search?q=etag").json()["total_count"] == 7
+    response = client.get("/api/search?q=etag")
+
+    assert response.status_code == 200
+    assert response.json()["total_count"] == 7
+    assert route.calls[1].request.headers["If-None-Match"] == '"abc123"'
+    assert client.get("/api/cache/stats").json()["not_modified"] == 1
+
+
+@respx.mock
+def test_search_serves_stale_on_upstream_error(client: TestClient):
+    """Test a retained entry is served when GitHub keeps failing after retries"""
+    from cache import TTLCache
+
+    client.app.state.search_cache = TTLCache(ttl=0, retention=60)
+    route = respx.get("https://api.github.com/search/repositories").mock(
+        side_effect=[
+            httpx.Response(
+                200,
+                json={"total_count": 3, "incomplete_results": False, "items": []},
+                headers={"ETag": '"v1"'}
+            ),
+        ] + [httpx.Response(502)] * 3
+    )
+
+    assert client.get("/api/search?q=flaky").json()["total_count"] == 3
+    response = client.get("/api/search?q=flaky")
+
+    assert response.status_code == 200
+    assert response.json()["total_count"] == 3
+    # The first call plus the failing one retried twice
+    assert route.call_count == 4
+    assert client.get("/api/cache/stats").json()["stale_served"] == 1
+
+
+@respx.mock
+def test_get_user_revalidates_with_etag(client: TestClient):
+    """Test /user profile lookups are revalidated with conditional requests once stale"""
+    from cache import TTLCache
+
+    client.app.state.user_cache = TTLCache(ttl=0, retention=3600)
+    route = respx.get("https://api.github.com/user").mock(
+        side_effect=[
+            httpx.Response(
+                200,
+                json={"id": 12345, "login": "testuser"},
+                headers={"ETag": '"user-v1"'}
+            ),
+            httpx.Response(304),
+        ]
+    )
+
+    first = client.get("/api/user?authorization=Bearer test_token")
+    second = client.get("/api/user?authorization=Bearer test_token")
+
+    assert first.json() == second.json()
+    assert second.json()["login"] == "testuser"
+    assert route.calls[1].request.headers["If-None-Match"] == '"user-v1"'
+
+
+@respx.mock
+def test_get_user_upstream_failures(client: TestClient):
+    """Test GitHub outages on /user give 502/503 (or the retained profile), never a 500"""
+    from cache import TTLCache
+
+    client.app.state.user_cache = TTLCache(ttl=0, retention=3600)
+    respx.get("https://api.github.com/user").mock(
+        side_effect=[httpx.Response(200, json={"id": 12345, "login": "testuser"}, headers={"ETag": '"v1"'})]
+        + [httpx.Response(502)] * 100
+    )
+
+    assert client.get("/api/user?authorization=Bearer cached_token").json()["login"] == "testuser"
+    assert client.get("/api/user?authorization=Bearer cached_token").json()["login"] == "testuser"
+
+    statuses = [client.get("/api/user?authorization=Bearer other_token") for _ in range(6)]
+    assert {response.status_code for response in statuses} <= {502, 503}
+    assert statuses[-1].status_code == 503
+    assert "Retry-After" in statuses[-1].headers
+    # Once the breaker is open the retained profile is still served
+    assert client.get("/api/user?authorization=Bearer cached_token").json()["login"] == "testuser"
+
+
+@respx.mock
+def test_get_user_served_from_cache_until_logout(client: TestClient):
+    """Test a fresh cached profile skips GitHub and logout forgets it"""
+    route = respx.get("https://api.github.com/user").mock(
+        return_value=httpx.Response(200, json={"id": 12345, "login": "testuser"})
+    )
+    headers = {"Authorization": "Bearer test_token"}
+
+    first = client.get("/api/user", headers=headers)
+    second = client.get("/api/user", headers=headers)
+    assert first.json() == second.json()
+    assert route.call_count == 1
+
+    client.post("/auth/logout", headers=headers, follow_redirects=False)
+    client.get("/api/user", headers=headers)
+    assert route.call_count == 2
+
+
+@respx.mock
+def test_search_serves_stale_while_revalidating(client: TestClient):
+    """Test stale entries are served immediately and refreshed in the background"""
+    import time
+    from cache import TTLCache
+
+    cache = TTLCache(ttl=0, stale_window=60)
+    client.app.state.search_cache = cache
+    client.app.state.search_refresher.cache = cache
+    respx.get("https://api.github.com/search/repositories").mock(
+        side_effect=[
+            httpx.Response(200, json={"total_count": 1, "incomplete_results": False, "items": []}),
+            httpx.Response(200, json={"total_count": 2, "incomplete_results": False, "items": []}),
+        ]
+    )
+
+    assert client.get("/api/search?q=swr").json()["total_count"] == 1
+    # Stale copy is served while the refresh happens off the request path
+    assert client.get("/api/search?q=swr").json()["total_count"] == 1
+
+    for _ in range(50):
+        if respx.calls.call_count == 2 and not client.app.state.search_refresher.stats()["running"]:
+            break
+        time.sleep(0.01)
+
+    assert client.get("/api/search?q=swr").json()["total_count"] == 2
+    stats = client.get("/api/cache/stats").json()
+    assert stats["stale_served"] == 2
+    assert stats["background_refresh"]["scheduled"] >= 1
+
+
+@respx.mock
+def test_search_with_local_token_uses_linked_github_token(client: TestClient, db_session_factory, local_user):
+    """Test a local JWT is resolved to the linked GitHub token for upstream calls"""
+    from principal import PrincipalResolver
+    from security import create_access_token
+
+    resolver = PrincipalResolver(session_factory=db_session_factory)
+    client.app.state.principal_resolver = resolver
+    route = respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(
+            200,
+            json={"total_count": 0, "incomplete_results": False, "items": []}
+        )
+    )
+    token = create_access_token({"sub": local_user.email, "type": "local"})
+
+    client.get(f"/api/search?q=one&authorization=Bearer {token}")
+    client.get(f"/api/search?q=two&authorization=Bearer {token}")
+
+    assert route.calls.last.request.headers["Authorization"] == "Bearer gho_linked_token"
+    assert resolver.lookups == 1
+
+
+@respx.mock
+def test_authorization_header_accepted(client: TestClient, db_session_factory, local_user):
+    """Test the Authorization header works for search and /user like the query parameter"""
+    from database import get_async_db
+    from principal import PrincipalResolver
+    from security import create_access_token
+
+    async def override_get_async_db():
+        async with db_session_factory() as db:
+            yield db
+
+    client.app.dependency_overrides[get_async_db] = override_get_async_db
+    client.app.state.principal_resolver = PrincipalResolver(session_factory=db_session_factory)
+    route = respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(
+            200,
+            json={"total_count": 0, "incomplete_results": False, "items": []}
+        )
+    )
+    token = create_access_token({"sub": local_user.email, "type": "local"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    search = client.get("/api/search?q=test", headers=headers)
+    user = client.get("/api/user", headers=headers)
+
+    assert search.status_code == 200
+    assert search.headers["Cache-Control"].startswith("private")
+    assert route.calls.last.request.headers["Authorization"] == "Bearer gho_linked_token"
+    assert user.status_code == 200
+    assert user.json()["email"] == local_user.email
+
+
+def make_repo(repo_id: int) -> dict:
+    return {
+        "id": repo_id,
+        "name": f"repo-{repo_id}",
+        "full_name": f"user/repo-{repo_id}",
+        "description": None,
+        "html_url": f"https://github.com/user/repo-{repo_id}",
+        "stargazers_count": repo_id,
+        "forks_count": 0,
+        "language": "Python",
+        "updated_at": "2023-01-01T00:00:00Z",
+        "owner": {"login": "user", "avatar_url": "https://github.com/user.png"},
+    }
+
+
+def paged_search_handler(total_count: int, failing_page: int = None):
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        per_page = int(request.url.params["per_page"])
+        if page == failing_page:
+            return httpx.Response(500, json={"message": "boom"})
+        start = (page - 1) * per_page
+        ids = range(start, min(start + per_page, total_count))
+        return httpx.Response(
+            200,
+            json={
+                "total_count": total_count,
+                "incomplete_results": False,
+                "items": [make_repo(i) for i in ids],
+            }
+        )
+    return handler
+
+
+@respx.mock
+def test_stream_search_ndjson(client: TestClient):
+    """Test multi-page results are streamed as NDJSON up to the limit"""
+    import json
+
+    route = respx.get("https://api.github.com/search/repositories").mock(
+        side_effect=paged_search_handler(total_count=250)
+    )
+
+    response = client.get("/api/search/stream?q=stream&limit=230&per_page=100")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 230
+    assert [repo["id"] for repo in lines] == list(range(230))
+    assert route.call_count == 3
+
+
+@respx.mock
+def test_stream_search_sse(client: TestClient):
+    """Test Server-Sent Events framing with meta and end events"""
+    respx.get("https://api.github.com/search/repositories").mock(
+        side_effect=paged_search_handler(total_count=3)
+    )
+
+    response = client.get("/api/search/stream?q=sse&format=sse")
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events == ["event: meta"] + ["event: repository"] * 3 + ["event: end"]
+
+
+@respx.mock
+def test_stream_search_reports_errors_in_band(client: TestClient):
+    """Test later-page failures end the stream with an error record"""
+    import json
+
+    respx.get("https://api.github.com/search/repositories").mock(
+        side_effect=paged_search_handler(total_count=300, failing_page=2)
+    )
+
+    response = client.get("/api/search/stream?q=broken&limit=300")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 101
+    assert lines[-1] == {"error": "GitHub API error occurred", "status_code": 500}
+
+
+def test_stream_search_first_page_error_status(client: TestClient):
+    """Test a failing first page is reported with a normal HTTP status"""
+    with respx.mock:
+        respx.get("https://api.github.com/search/repositories").mock(
+            return_value=httpx.Response(422, json={"message": "Validation Failed"})
+        )
+        response = client.get("/api/search/stream?q=bad")
+
+    assert response.status_code == 422
+
+
+@respx.mock
+def test_search_hybrid_falls_back_then_serves_locally(client: TestClient):
+    """Test hybrid searches call GitHub on an index miss and answer locally afterwards"""
+    repo = make_repo(9001)
+    repo["name"] = "zanzibarql"
+    repo["description"] = "Query engine for zanzibar tuples"
+    route = respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(
+            200, json={"total_count": 1, "incomplete_results": False, "items": [repo]}
+        )
+    )
+
+    first = client.get("/api/search?q=zanzibarql&source=hybrid")
+    second = client.get("/api/search?q=zanzibar tuples&source=hybrid")
+
+    assert first.json()["items"][0]["id"] == 9001
+    assert second.json()["items"][0]["id"] == 9001
+    assert route.call_count == 1
+    assert client.get("/api/cache/stats").json()["local_index"]["hits"] >= 1
+
+
+@respx.mock
+def test_authenticated_results_stay_out_of_local_index(client: TestClient):
+    """Test results fetched with a caller's token can't be read anonymously from the index"""
+    repo = make_repo(9101)
+    repo["full_name"] = "acme/secret-proj"
+    repo["name"] = "secret-proj"
+    repo["description"] = "Quuxleaked internal tooling"
+    respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(
+            200, json={"total_count": 1, "incomplete_results": False, "items": [repo]}
+        )
+    )
+
+    client.get("/api/search?q=quuxleaked", headers={"Authorization": "Bearer gho_victim"})
+    response = client.get("/api/search?q=quuxleaked&source=local")
+
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+
+
+@respx.mock
+def test_search_local_never_calls_github(client: TestClient):
+    """Test source=local answers from the index alone, even when it has nothing"""
+    route = respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(500)
+    )
+
+    response = client.get("/api/search?q=nothingindexedhere&source=local")
+
+    assert response.status_code == 200
+    assert response.json() == {"total_count": 0, "items": [], "incomplete_results": False}
+    assert route.call_count == 0
+
+
+@respx.mock
+def test_search_projects_only_model_fields(client: TestClient):
+    """Test extra GitHub fields are dropped while parsing the upstream payload"""
+    repo = dict(make_repo(7), node_id="R_abc", topics=["x"], forks_url="https://api.github.com/x")
+    respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(
+            200, json={"total_count": 1, "incomplete_results": False, "items": [repo]}
+        )
+    )
+
+    response = client.get("/api/search?q=projection")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["items"][0] == make_repo(7)
+
+
+@respx.mock
+def test_search_malformed_upstream_payload(client: TestClient):
+    """Test an upstream payload that doesn't match our models maps to 502"""
+    respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(200, json={"total_count": 1, "items": [{"id": "x"}]})
+    )
+
+    response = client.get("/api/search?q=malformed")
+
+    assert response.status_code == 502
+
+
+@respx.mock
+def test_batch_search_dedupes_and_reports_per_query(client: TestClient):
+    """Test a batch returns results in order, runs duplicates once and isolates errors"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.params["q"].startswith("broken"):
+            return httpx.Response(422, json={"message": "Validation Failed"})
+        return httpx.Response(
+            200, json={"total_count": 1, "incomplete_results": False, "items": [make_repo(1)]}
+        )
+
+    route = respx.get("https://api.github.com/search/repositories").mock(side_effect=handler)
+
+    response = client.post("/api/search/batch", json={"queries": [
+        {"q": "batchtile", "language": "python"},
+        {"q": "broken"},
+        {"q": "batchtile", "language": "python"},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status_code"] for result in results] == [200, 422, 200]
+    assert results[0]["response"]["items"][0]["id"] == 1
+    assert results[0] == results[2]
+    assert results[1]["error"] == "Invalid search query. Please check your parameters."
+    assert route.call_count == 2
+
+
+@respx.mock
+def test_batch_search_reports_invalid_queries_per_item(client: TestClient):
+    """Test invalid queries get their own 422 entry while the rest of the batch runs"""
+    respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(
+            200, json={"total_count": 1, "incomplete_results": False, "items": [make_repo(1)]}
+        )
+    )
+
+    response = client.post("/api/search/batch", json={"queries": [
+        {"q": " "},
+        {"q": "mixedbatch"},
+        {"q": "mixedbatch", "page": 101},
+        {"language": "python"},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status_code"] for result in results] == [422, 200, 422, 422]
+    assert "Query cannot be empty" in results[0]["error"]
+    assert results[2]["error"].startswith("page:")
+    assert results[3]["error"].startswith("q:")
+    assert results[1]["response"]["items"][0]["id"] == 1
+
+
+def test_batch_search_limits(client: TestClient):
+    """Test empty, oversized and malformed batches are rejected"""
+    too_many = [{"q": f"q{i}"} for i in range(51)]
+
+    assert client.post("/api/search/batch", json={"queries": []}).status_code == 422
+    assert client.post("/api/search/batch", json={"queries": too_many}).status_code == 422
+    assert client.post(
+        "/api/search/batch", json={"queries": [{"q": "x"}], "source": "nowhere"}
+    ).status_code == 422
+
+
+@respx.mock
+def test_search_etag_and_cache_headers(client: TestClient):
+    """Test search responses carry a strong ETag, cache headers and answer 304 on a match"""
+    respx.get("https://api.github.com/search/repositories").mock(
+        side_effect=paged_search_handler(total_count=100)
+    )
+
+    anonymous = client.get("/api/search?q=etag&per_page=50", headers={"Accept-Encoding": "gzip"})
+    etag = anonymous.headers["etag"]
+    not_modified = client.get("/api/search?q=etag&per_page=50", headers={"If-None-Match": etag})
+    authenticated = client.get("/api/search?q=etag&per_page=50&authorization=Bearer gho_etag")
+
+    assert anonymous.status_code == 200
+    assert etag.startswith('"') and etag.endswith('-gzip"')
+    assert anonymous.headers["cache-control"] == "public, max-age=60"
+    assert {"Authorization", "Accept-Encoding"} <= set(anonymous.headers["vary"].split(", "))
+    assert anonymous.headers["content-encoding"] == "gzip"
+    assert len(anonymous.json()["items"]) == 50
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.content == b""
+    assert authenticated.headers["cache-control"] == "private, max-age=60"
+    # The identity variant has its own strong ETag, and either form revalidates
+    identity = client.get("/api/search?q=etag&per_page=50", headers={"Accept-Encoding": "identity"})
+    assert identity.headers["etag"] == etag.replace('-gzip"', '"')
+    assert client.get(
+        "/api/search?q=etag&per_page=50", headers={"If-None-Match": identity.headers["etag"]}
+    ).status_code == 304
@@ -119,3 +119,38 @@ def test_github_callback_missing_state_cookie(client: TestClient):
     
     assert response.status_code == 400
     assert "Invalid state parameter" in response.json()["detail"]
+
+
+@respx.mock
+def test_github_callback_refreshes_profile_cache(client: TestClient, db_session_factory, local_user):
+    """Test the callback seeds the new token's profile and drops the re-linked one's"""
+    from database import get_async_db
+    from security import create_access_token
+
+    async def override_get_async_db():
+        async with db_session_factory() as db:
+            yield db
+
+    client.app.dependency_overrides[get_async_db] = override_get_async_db
+    respx.post("https://github.com/login/oauth/access_token").mock(
+        return_value=httpx.Response(200, json={"access_token": "gho_new_token"})
+    )
+    user_route = respx.get("https://api.github.com/user").mock(
+        return_value=httpx.Response(200, json={"id": 42, "login": "testuser"})
+    )
+
+    client.get("/api/user", headers={"Authorization": "Bearer gho_linked_token"})
+    client.cookies.set("oauth_state", "test_state")
+    client.cookies.set("link_token", create_access_token({"sub": local_user.email, "type": "local"}))
+    verifier = client.app.state.principal_resolver.verifier
+    verified = verifier.verifications
+    client.get("/auth/callback?code=test_code&state=test_state", follow_redirects=False)
+    assert user_route.call_count == 2
+    # The link token goes through the shared verifier like any other local token
+    assert verifier.verifications == verified + 1
+
+    # The new token's profile came with the callback; the old one is looked up again
+    client.get("/api/user", headers={"Authorization": "Bearer gho_new_token"})
+    assert user_route.call_count == 2
+    client.get("/api/user", headers={"Authorization": "Bearer gho_linked_token"})
+    assert user_route.call_count == 3
@@ -0,0 +1,42 @@
+from starlette.testclient import TestClient
+from benchmarks.fake_github import FakeGitHub, FakeGitHubConfig
+from benchmarks.loadtest import Result, compare, percentile
+
+
+def test_percentile_nearest_rank():
+    """Test percentiles pick an observed value by nearest rank"""
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compare_flags_regressions():
+    """Test throughput drops, p95 increases and new status codes beyond tolerance are reported"""
+    baseline = {"throughput": 100.0, "p95_ms": 10.0, "status_codes": {"200": 10}}
+    result = Result("s", 10, 1, 1.0, 90.0, 5.0, 11.0, 12.0, {"200": 10}, 0, None)
+    assert compare(result, baseline, tolerance=0.25) == []
+
+    result.throughput, result.p95_ms, result.status_codes = 70.0, 13.0, {"200": 9, "500": 1}
+    assert len(compare(result, baseline, tolerance=0.25)) == 3
+
+
+def test_fake_github_rate_limit_and_etag():
+    """Test the fake API counts down rate limits and revalidates /user by ETag"""
+    fake = FakeGitHub(FakeGitHubConfig(latency=0, jitter=0, rate_limit=2))
+    client = TestClient(fake.app)
+    headers = {"Authorization": "Bearer gho_fake"}
+
+    first = client.get("/search/repositories", params={"q": "python", "per_page": 5}, headers=headers)
+    second = client.get("/search/repositories", params={"q": "python", "per_page": 5}, headers=headers)
+    limited = client.get("/search/repositories", params={"q": "python"}, headers=headers)
+
+    assert first.json() == second.json()
+    assert len(first.json()["items"]) == 5
+    assert second.headers["x-ratelimit-remaining"] == "0"
+    assert limited.status_code == 403
+
+    user = client.get("/user", headers=headers)
+    revalidated = client.get("/user", headers={**headers, "If-None-Match": user.headers["etag"]})
+    assert revalidated.status_code == 304
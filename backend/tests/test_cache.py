@@ -0,0 +1,202 @@
+import asyncio
+from cache import TTLCache
+from github_search import search_cache_key
+from models.searchrequest import SearchRequest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    """Test entries are dropped once their TTL elapses"""
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl=5, clock=clock)
+
+    async def scenario():
+        await cache.set("k", "v")
+        assert await cache.get("k") == "v"
+        clock.now = 6
+        assert await cache.get("k") is None
+
+    asyncio.run(scenario())
+
+    stats = asyncio.run(cache.stats())
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+    assert stats["size"] == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test LRU eviction keeps recently read entries"""
+    cache = TTLCache(max_entries=2, ttl=60)
+
+    async def scenario():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+    assert asyncio.run(scenario()) == (1, None, 3)
+    assert asyncio.run(cache.stats())["evictions"] == 1
+
+
+def test_search_cache_key_normalization():
+    """Test equivalent queries share a key and auth gets its own keyspace"""
+    first = SearchRequest(q="  React ", language="JavaScript")
+    second = SearchRequest(q="react", language="javascript")
+
+    assert search_cache_key(first) == search_cache_key(second)
+    assert search_cache_key(first) != search_cache_key(first, "token")
+    assert "token" not in search_cache_key(first, "token")
+    assert search_cache_key(first) != search_cache_key(SearchRequest(q="react", page=2))
+
+
+def test_ttl_cache_retains_revalidatable_entries():
+    """Test stale entries with validators survive until retention ends"""
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl=5, retention=10, clock=clock)
+
+    async def scenario():
+        await cache.set("k", "v", etag='"e"')
+        await cache.set("plain", "v")
+        clock.now = 6
+        stale = await cache.get_entry("k")
+        assert stale is not None and not cache.is_fresh(stale)
+        assert await cache.get("k") is None
+        assert await cache.get_entry("plain") is None
+
+        await cache.touch("k")
+        assert await cache.get("k") == "v"
+
+        clock.now = 30
+        assert await cache.get_entry("k") is None
+
+    asyncio.run(scenario())
+    assert asyncio.run(cache.stats())["not_modified"] == 1
+
+
+SAMPLE_RESPONSE = {
+    "total_count": 1,
+    "incomplete_results": False,
+    "items": [
+        {
+            "id": 1,
+            "name": "test-repo",
+            "full_name": "user/test-repo",
+            "description": "A test repository",
+            "html_url": "https://github.com/user/test-repo",
+            "stargazers_count": 100,
+            "forks_count": 20,
+            "language": "Python",
+            "updated_at": "2023-01-01T00:00:00Z",
+            "owner": {"login": "user", "avatar_url": "https://github.com/user.png"},
+        }
+    ],
+}
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio client methods the backend uses"""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, px=None):
+        self.store[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    async def scan_iter(self, match="*"):
+        prefix = match.rstrip("*")
+        for key in list(self.store):
+            if key.startswith(prefix):
+                yield key
+
+    async def aclose(self):
+        pass
+
+
+def test_entry_codec_round_trips_search_response():
+    """Test shared-store payloads are compressed and decode back to models"""
+    from cache import CacheEntry, encode_entry, decode_entry
+    from models.searchresponse import SearchResponse
+
+    value = SearchResponse(**SAMPLE_RESPONSE)
+    payload = encode_entry(CacheEntry(value=value, fresh_until=1, expires_at=2, etag='"e"'))
+    decoded = decode_entry(payload)
+
+    assert len(payload) < len(value.model_dump_json())
+    assert decoded.value == value
+    assert decoded.etag == '"e"'
+
+
+def test_sqlite_backend_is_shared_and_persistent(tmp_path):
+    """Test entries written by one worker are visible to another and after restart"""
+    from cache import SQLiteCacheBackend
+    from models.searchresponse import SearchResponse
+
+    path = str(tmp_path / "cache.db")
+
+    async def scenario():
+        writer = TTLCache(ttl=60, backend=SQLiteCacheBackend(path, table="cache_search"))
+        await writer.set("k", SearchResponse(**SAMPLE_RESPONSE), etag='"e"')
+        await writer.close()
+
+        reader = TTLCache(ttl=60, backend=SQLiteCacheBackend(path, table="cache_search"))
+        value = await reader.get("k")
+        await reader.close()
+        return value
+
+    value = asyncio.run(scenario())
+    assert value.items[0].full_name == "user/test-repo"
+
+
+def test_sqlite_backend_evicts_least_recently_used(tmp_path):
+    """Test the on-disk store stays bounded"""
+    from cache import SQLiteCacheBackend
+
+    clock = FakeClock()
+    clock.now = 100.0
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), max_entries=2, clock=clock)
+    cache = TTLCache(ttl=60, backend=backend, clock=clock)
+
+    async def scenario():
+        for key in ("a", "b"):
+            await cache.set(key, {"key": key})
+            clock.now += 1
+        await cache.get("a")
+        clock.now += 1
+        await cache.set("c", {"key": "c"})
+        return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+    assert asyncio.run(scenario()) == ({"key": "a"}, None, {"key": "c"})
+    assert cache.evictions == 1
+
+
+def test_redis_backend_with_fake_client():
+    """Test the Redis-protocol backend stores compressed entries under its prefix"""
+    from cache import RedisCacheBackend
+
+    fake = FakeRedis()
+    cache = TTLCache(ttl=60, backend=RedisCacheBackend(prefix="lens:user:", client=fake))
+
+    async def scenario():
+        await cache.set("user:abc", {"login": "testuser"})
+        assert list(fake.store) == ["lens:user:user:abc"]
+        assert await cache.get("user:abc") == {"login": "testuser"}
+        await cache.clear()
+        return await cache.get("user:abc")
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,143 @@
+import asyncio
+import httpx
+import pytest
+import respx
+from fastapi.testclient import TestClient
+from client_ratelimit import (
+    ClientRateLimiter, MemoryBucketStore, Quota, SQLiteBucketStore, parse_quotas,
+)
+from github_resilience import AdmissionTransport, UpstreamBusy
+
+
+def test_parse_quotas():
+    """Test quota specs become per-second rates with the request count as burst"""
+    quotas = parse_quotas("/api/search=60/60, /api/analytics=10/5")
+    assert quotas == {"/api/search": Quota(rate=1.0, burst=60), "/api/analytics": Quota(rate=2.0, burst=10)}
+    with pytest.raises(ValueError):
+        parse_quotas("/api/search=lots")
+
+
+def test_token_bucket_refills_over_time():
+    """Test the burst is spent, then tokens come back at the configured rate"""
+    now = [0.0]
+    store = MemoryBucketStore(clock=lambda: now[0])
+    quota = Quota(rate=0.5, burst=2)
+
+    async def scenario():
+        results = [await store.take("k", quota) for _ in range(3)]
+        now[0] = 2.0
+        results.append(await store.take("k", quota))
+        results.append(await store.take("other", quota))
+        return results
+
+    assert asyncio.run(scenario()) == [0.0, 0.0, 2.0, 0.0, 0.0]
+
+
+def test_take_charges_cost_capped_at_burst():
+    """Test multi-token takes wait for the whole cost, never longer than a full refill"""
+    store = MemoryBucketStore(clock=lambda: 0.0)
+    quota = Quota(rate=1.0, burst=5)
+
+    async def scenario():
+        return [await store.take("k", quota, cost=3), await store.take("k", quota, cost=3), await store.take("big", quota, cost=50)]
+
+    assert asyncio.run(scenario()) == [0.0, 1.0, 0.0]
+
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    """Test two stores on one file (two workers) draw from the same bucket"""
+    path = str(tmp_path / "limits.db")
+    first, second = SQLiteBucketStore(path, clock=lambda: 100.0), SQLiteBucketStore(path, clock=lambda: 100.0)
+    quota = Quota(rate=1.0, burst=2)
+
+    async def scenario():
+        return [await first.take("k", quota), await second.take("k", quota), await first.take("k", quota)]
+
+    assert asyncio.run(scenario()) == [0.0, 0.0, 1.0]
+    asyncio.run(first.close())
+    asyncio.run(second.close())
+
+
+@respx.mock
+def test_search_quota_returns_429_with_retry_after(client: TestClient):
+    """Test a client over its quota is rejected before any GitHub call"""
+    route = respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(200, json={"total_count": 0, "incomplete_results": False, "items": []})
+    )
+    client.app.state.client_limiter = ClientRateLimiter(
+        MemoryBucketStore(), {"/api/search": Quota(rate=0.1, burst=2)}
+    )
+
+    statuses = [client.get(f"/api/search?q=quota{i}").status_code for i in range(3)]
+    limited = client.get("/api/search?q=quota")
+    # Unverified bearer tokens share the caller's IP bucket
+    made_up = client.get("/api/search?q=quota&authorization=Bearer not-a-real-token")
+
+    assert statuses == [200, 200, 429]
+    assert limited.headers["retry-after"] == "10"
+    assert made_up.status_code == 429
+    assert route.call_count == 2
+    # Routes without a quota are unaffected
+    assert client.get("/api/rate-limits").status_code == 200
+
+
+def test_admission_queues_then_sheds():
+    """Test calls beyond the in-flight cap wait for a slot, and are shed once the queue is full"""
+    gate = asyncio.Event()
+
+    async def upstream(request):
+        await gate.wait()
+        return httpx.Response(200, json={})
+
+    async def scenario():
+        transport = AdmissionTransport(httpx.MockTransport(upstream), max_in_flight=1, max_queued=1, queue_timeout=1)
+        client = httpx.AsyncClient(transport=transport)
+        first = asyncio.ensure_future(client.get("https://api.github.com/user"))
+        queued = asyncio.ensure_future(client.get("https://api.github.com/user"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(UpstreamBusy) as shed:
+            await client.get("https://api.github.com/user")
+        assert transport.stats()["queued"] == 1
+        gate.set()
+        responses = await asyncio.gather(first, queued)
+        stats = transport.stats()
+        await client.aclose()
+        return shed.value, responses, stats
+
+    shed, responses, stats = asyncio.run(scenario())
+
+    assert shed.status_code == 429
+    assert shed.headers["Retry-After"] == "1"
+    assert [response.status_code for response in responses] == [200, 200]
+    assert stats == {"max_in_flight": 1, "in_flight": 0, "queued": 0, "rejected": 1}
+
+
+@respx.mock
+def test_fan_out_routes_pay_per_github_search(client: TestClient):
+    """Test batch queries and stream pages are charged to the caller's search bucket"""
+    def github_search(request):
+        total = 300 if request.url.params["q"].startswith("big") else 0
+        return httpx.Response(200, json={"total_count": total, "incomplete_results": False, "items": []})
+
+    respx.get("https://api.github.com/search/repositories").mock(side_effect=github_search)
+    client.app.state.client_limiter = ClientRateLimiter(
+        MemoryBucketStore(),
+        {
+            "/api/search": Quota(rate=0.1, burst=10),
+            "/api/search/batch": Quota(rate=0.1, burst=10),
+            "/api/search/stream": Quota(rate=0.1, burst=10),
+        },
+    )
+
+    first = client.post("/api/search/batch", json={"queries": [{"q": f"fan{i}"} for i in range(8)]})
+    second = client.post("/api/search/batch", json={"queries": [{"q": f"fan{i}"} for i in range(8)]})
+    # Pages past total_count are never fetched, so they cost nothing
+    small = client.get("/api/search/stream?q=fan&limit=300&per_page=100")
+    big = client.get("/api/search/stream?q=big&limit=300&per_page=100")
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers["retry-after"]) >= 1
+    assert small.status_code == 200
+    assert big.status_code == 429
+    assert client.get("/api/search?q=fan").status_code == 429
@@ -0,0 +1,96 @@
+import gzip
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from compression import CompressionMiddleware, decoded_etag, encoded_etag, negotiate
+
+
+def test_negotiate_honours_q_values_and_preference():
+    """Test the client's weights win and ties fall back to our preference order"""
+    available = ("zstd", "br", "gzip")
+    assert negotiate("gzip, br", available) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", available) == "gzip"
+    assert negotiate("*", available) == "zstd"
+    assert negotiate("br;q=0, identity", ("br", "gzip")) is None
+    assert negotiate(None, available) is None
+
+
+def make_app(minimum_size: int = 100) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+
+    @app.get("/big")
+    async def big():
+        return {"data": "x" * 1000}
+
+    @app.get("/small")
+    async def small():
+        return {"data": "x"}
+
+    @app.get("/tagged")
+    async def tagged():
+        return PlainTextResponse("z" * 1000, headers={"ETag": '"abc"'})
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse("y" * 1000)
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for i in range(3):
+                yield f'{{"n": {i}}}\n' * 50
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+def test_compresses_large_responses_only():
+    """Test bodies above the threshold are gzipped and small ones pass through"""
+    client = TestClient(make_app())
+
+    big = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/big", headers={"Accept-Encoding": "identity"})
+
+    assert big.headers["content-encoding"] == "gzip"
+    assert int(big.headers["content-length"]) < 1000
+    assert big.json() == {"data": "x" * 1000}
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in identity.headers
+
+
+def test_streams_pass_through_uncompressed():
+    """Test streamed NDJSON is forwarded chunk by chunk without encoding"""
+    client = TestClient(make_app())
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text.count("\n") == 150
+
+
+def test_gzip_output_is_deterministic():
+    """Test identical bodies compress to identical bytes (no timestamp in the header)"""
+    client = TestClient(make_app())
+
+    def raw_body() -> bytes:
+        with client.stream("GET", "/text", headers={"Accept-Encoding": "gzip"}) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            return b"".join(response.iter_raw())
+
+    first = raw_body()
+    assert raw_body() == first
+    assert gzip.decompress(first) == b"y" * 1000
+
+
+def test_encoded_variants_get_their_own_etag():
+    """Test compressed bodies carry a coding-specific ETag that maps back to the original"""
+    client = TestClient(make_app())
+
+    encoded = client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/tagged", headers={"Accept-Encoding": "identity"})
+
+    assert encoded.headers["etag"] == '"abc-gzip"'
+    assert identity.headers["etag"] == '"abc"'
+    assert encoded_etag('W/"abc"', "br") == 'W/"abc-br"'
+    assert decoded_etag('"abc-zstd"') == '"abc"'
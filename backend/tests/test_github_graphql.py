@@ -0,0 +1,198 @@
+import asyncio
+import base64
+import json
+import httpx
+import pytest
+import respx
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from config import get_settings
+from cache import CacheEntry, TTLCache
+from github_search import fetch_search, graphql_cursor, graphql_search_query, refresh_search
+from models.searchrequest import SearchRequest
+from main import app
+from tests.conftest import get_test_settings
+
+
+class FakeGraphQLServer:
+    """Minimal stand-in for GitHub's /graphql search, honoring first/after cursors"""
+
+    def __init__(self, count: int = 10):
+        self.nodes = [
+            {
+                "databaseId": i,
+                "name": f"repo-{i}",
+                "nameWithOwner": f"owner/repo-{i}",
+                "description": None,
+                "url": f"https://github.com/owner/repo-{i}",
+                "stargazerCount": 100 - i,
+                "forkCount": i,
+                "primaryLanguage": {"name": "Python"} if i % 2 else None,
+                "updatedAt": "2024-01-01T00:00:00Z",
+                "owner": {"login": "owner", "avatarUrl": "https://github.com/owner.png"},
+            }
+            for i in range(1, count + 1)
+        ]
+        self.requests = []
+        self.errors = None
+        # Simulate GitHub changing its cursor encoding: only cursors it issued are accepted
+        self.opaque_cursors = False
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.requests.append(body)
+        if self.errors:
+            return httpx.Response(200, json={"data": None, "errors": self.errors})
+
+        variables = body["variables"]
+        offset = 0
+        if variables["after"]:
+            cursor = base64.b64decode(variables["after"]).decode()
+            prefix = "opaque:" if self.opaque_cursors else "cursor:"
+            if not cursor.startswith(prefix):
+                return httpx.Response(200, json={"data": None, "errors": [{"message": "invalid cursor"}]})
+            offset = int(cursor.split(":")[1])
+        nodes = self.nodes[offset:offset + variables["first"]]
+        end = offset + len(nodes)
+        prefix = "opaque" if self.opaque_cursors else "cursor"
+        return httpx.Response(200, json={
+            "data": {"search": {
+                "repositoryCount": len(self.nodes),
+                "nodes": nodes + [{}],
+                "pageInfo": {
+                    "endCursor": base64.b64encode(f"{prefix}:{end}".encode()).decode(),
+                    "hasNextPage": end < len(self.nodes),
+                },
+            }}
+        })
+
+
+def graphql_settings():
+    settings = get_test_settings()
+    settings.search_provider = "graphql"
+    return settings
+
+
+def test_graphql_cursor_and_sort_qualifier():
+    """Test page offsets map to GitHub's cursor format and sort becomes a qualifier"""
+    assert graphql_cursor(0) is None
+    assert base64.b64decode(graphql_cursor(40)) == b"cursor:40"
+    assert graphql_search_query(SearchRequest(q="react", language="js", sort="forks", order="asc")) == (
+        "react language:js sort:forks-asc"
+    )
+    assert graphql_search_query(SearchRequest(q="react", sort="best-match")) == "react"
+
+
+def test_fetch_search_graphql_pages_through_mock_server():
+    """Test page/per_page are served from the right cursor with REST-shaped items"""
+    server = FakeGraphQLServer(count=10)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+            return await fetch_search(
+                client, graphql_settings(), SearchRequest(q="repo", page=3, per_page=3), "ghp_token"
+            )
+
+    result = asyncio.run(scenario())
+
+    assert result.response.total_count == 10
+    assert [repo.id for repo in result.response.items] == [7, 8, 9]
+    assert result.response.items[0].full_name == "owner/repo-7"
+    assert result.response.items[0].language == "Python"
+    assert result.response.items[1].language is None
+    assert server.requests[0]["variables"]["first"] == 3
+    assert "watchers" not in server.requests[0]["query"]
+
+
+def test_graphql_refresh_skips_revalidation():
+    """Test a stale entry refreshed over GraphQL isn't counted as a conditional revalidation"""
+    server = FakeGraphQLServer(count=3)
+    stale = CacheEntry(value=None, fresh_until=0, expires_at=0, etag='"old"')
+
+    async def scenario():
+        cache = TTLCache(ttl=60)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+            response = await refresh_search(
+                client, graphql_settings(), cache, "key", SearchRequest(q="repo"), "ghp_token", stale=stale,
+            )
+        return response, cache.revalidations, await cache.get_entry("key")
+
+    response, revalidations, entry = asyncio.run(scenario())
+
+    assert response.total_count == 3
+    assert revalidations == 0
+    assert entry.etag is None
+
+
+def test_fetch_search_graphql_walks_end_cursors_when_built_cursor_rejected():
+    """Test a changed cursor encoding falls back to paging through pageInfo.endCursor"""
+    server = FakeGraphQLServer(count=10)
+    server.opaque_cursors = True
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+            return await fetch_search(
+                client, graphql_settings(), SearchRequest(q="repo", page=3, per_page=3), "ghp_token"
+            )
+
+    result = asyncio.run(scenario())
+
+    assert [repo.id for repo in result.response.items] == [7, 8, 9]
+    # Rejected built cursor, then pages 1, 2 and 3
+    assert len(server.requests) == 4
+    assert server.requests[1]["variables"]["after"] is None
+
+
+def test_fetch_search_graphql_invalid_query_is_422():
+    """Test errors on the first page still mean an invalid query"""
+    server = FakeGraphQLServer()
+    server.errors = [{"type": "INVALID", "message": "bad query"}]
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+            await fetch_search(client, graphql_settings(), SearchRequest(q="repo", page=2), "ghp_token")
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(scenario())
+    assert exc.value.status_code == 422
+    assert len(server.requests) == 2
+
+
+def test_fetch_search_graphql_rate_limited():
+    """Test GraphQL RATE_LIMITED errors map to the same 403 as REST"""
+    server = FakeGraphQLServer()
+    server.errors = [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+            await fetch_search(client, graphql_settings(), SearchRequest(q="repo"), "ghp_token")
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(scenario())
+    assert exc.value.status_code == 403
+
+
+@respx.mock
+def test_search_endpoint_uses_graphql_provider():
+    """Test authenticated searches go to /graphql and anonymous ones stay on REST"""
+    server = FakeGraphQLServer(count=4)
+    graphql = respx.post("https://api.github.com/graphql").mock(side_effect=server)
+    rest = respx.get("https://api.github.com/search/repositories").mock(
+        return_value=httpx.Response(200, json={"total_count": 0, "incomplete_results": False, "items": []})
+    )
+
+    app.dependency_overrides[get_settings] = graphql_settings
+    try:
+        with TestClient(app) as client:
+            authed = client.get(
+                "/api/search?q=graphqlonly&page=2&per_page=2&authorization=Bearer ghp_graphql_token"
+            )
+            anonymous = client.get("/api/search?q=graphqlanon")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [repo["id"] for repo in authed.json()["items"]] == [3, 4]
+    assert authed.json()["total_count"] == 4
+    assert anonymous.status_code == 200
+    assert graphql.calls[0].request.headers["authorization"] == "Bearer ghp_graphql_token"
+    assert rest.call_count == 1
@@ -0,0 +1,140 @@
+import asyncio
+import httpx
+import pytest
+from github_resilience import IDEMPOTENT, CircuitOpenError, LatencyTracker, ResilientTransport, endpoint_group
+
+
+class Upstream:
+    """Inner transport answering from a list of statuses (or exceptions)"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else 200
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome)
+
+
+def make_transport(upstream, **kwargs):
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    kwargs.setdefault("jitter", lambda: 1.0)
+    transport = ResilientTransport(httpx.MockTransport(upstream), sleep=sleep, **kwargs)
+    return transport, sleeps
+
+
+def send(transport, method="GET", url="https://api.github.com/search/repositories"):
+    async def scenario():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.request(method, url)
+    return asyncio.run(scenario())
+
+
+def test_endpoint_group():
+    """Test breakers are grouped by the first path segment"""
+    assert endpoint_group("/search/repositories") == "search"
+    assert endpoint_group("/users/octo/events/public") == "users"
+    assert endpoint_group("/") == "root"
+
+
+def test_retries_5xx_and_connection_errors_with_backoff():
+    """Test idempotent calls are retried with exponential backoff until they succeed"""
+    upstream = Upstream([502, httpx.ConnectError("reset"), 200])
+    transport, sleeps = make_transport(upstream, retry_attempts=2, retry_backoff=0.1)
+
+    response = send(transport)
+
+    assert response.status_code == 200
+    assert upstream.calls == 3
+    assert sleeps == [0.1, 0.2]
+    assert transport.stats()["retries"] == 2
+
+
+def test_gives_up_and_skips_non_idempotent_requests():
+    """Test the last 5xx is returned after the retry budget and POSTs are never retried"""
+    upstream = Upstream([503, 503, 503])
+    transport, _ = make_transport(upstream, retry_attempts=1)
+    assert send(transport).status_code == 503
+    assert upstream.calls == 2
+
+    upstream = Upstream([502])
+    transport, _ = make_transport(upstream)
+    assert send(transport, "POST", "https://api.github.com/graphql").status_code == 502
+    assert upstream.calls == 1
+
+
+def test_posts_marked_idempotent_are_retried():
+    """Test read-only POSTs (GraphQL queries) opt into retries"""
+    upstream = Upstream([502, 200])
+    transport, _ = make_transport(upstream)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.post(
+                "https://api.github.com/graphql", json={"query": "{ viewer { login } }"}, extensions=IDEMPOTENT
+            )
+
+    assert asyncio.run(scenario()).status_code == 200
+    assert upstream.calls == 2
+
+
+def test_read_timeouts_are_not_retried():
+    """Test a read timeout surfaces immediately instead of multiplying the wait"""
+    upstream = Upstream([httpx.ReadTimeout("slow")])
+    transport, _ = make_transport(upstream)
+    with pytest.raises(httpx.ReadTimeout):
+        send(transport)
+    assert upstream.calls == 1
+
+
+def test_circuit_opens_fails_fast_and_recovers():
+    """Test the breaker opens after repeated failures, then a probe closes it"""
+    now = [0.0]
+    upstream = Upstream([500, 500, 500])
+    transport, _ = make_transport(
+        upstream, retry_attempts=0, failure_threshold=3, reset_timeout=10, clock=lambda: now[0]
+    )
+
+    for _ in range(3):
+        assert send(transport).status_code == 500
+    with pytest.raises(CircuitOpenError) as exc:
+        send(transport)
+    assert exc.value.retry_after == 10
+    assert upstream.calls == 3
+    # Other endpoint groups are unaffected
+    assert send(transport, url="https://api.github.com/user").status_code == 200
+
+    now[0] = 11
+    assert send(transport).status_code == 200
+    assert transport.breakers["search"].state == "closed"
+
+
+def test_hedged_request_wins_over_slow_primary():
+    """Test a second copy is sent after the recent p95 and the faster answer is used"""
+    calls = []
+
+    async def upstream(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"call": len(calls)})
+
+    transport = ResilientTransport(
+        httpx.MockTransport(upstream), hedge_enabled=True, hedge_min_delay=0.01
+    )
+    transport.latencies["search"] = tracker = LatencyTracker()
+    for _ in range(20):
+        tracker.observe(0.01)
+
+    response = send(transport)
+
+    assert response.json() == {"call": 2}
+    assert transport.stats()["hedges"] == 1
+    assert transport.stats()["hedge_wins"] == 1
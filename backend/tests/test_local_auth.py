@@ -0,0 +1,104 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+
+@pytest.fixture
+def auth_client(client: TestClient, db_session_factory):
+    """Test client whose async DB dependency uses the per-test database"""
+    from database import get_async_db
+
+    async def override_get_async_db():
+        async with db_session_factory() as db:
+            yield db
+
+    client.app.dependency_overrides[get_async_db] = override_get_async_db
+    return client
+
+
+def test_register_and_login(auth_client: TestClient):
+    """Test a registered user can log in through the async session path"""
+    response = auth_client.post(
+        "/auth/register",
+        json={"email": "new@example.com", "username": "newuser", "password": "s3cret"}
+    )
+    assert response.status_code == 200
+
+    response = auth_client.post(
+        "/auth/login", json={"email": "new@example.com", "password": "s3cret"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["token_type"] == "bearer"
+    assert data["user"]["login"] == "newuser"
+
+    # The issued token resolves to the local account on /api/user
+    response = auth_client.get(f"/api/user?authorization=Bearer {data['access_token']}")
+    assert response.status_code == 200
+    assert response.json()["email"] == "new@example.com"
+
+
+def test_register_duplicate_email(auth_client: TestClient, local_user):
+    """Test registering an existing email is rejected"""
+    response = auth_client.post(
+        "/auth/register",
+        json={"email": local_user.email, "username": "other", "password": "pw"}
+    )
+
+    assert response.status_code == 400
+    assert "Email already registered" in response.json()["detail"]
+
+
+def test_login_wrong_password(auth_client: TestClient, local_user):
+    """Test a wrong password returns 401"""
+    response = auth_client.post(
+        "/auth/login", json={"email": local_user.email, "password": "wrong"}
+    )
+
+    assert response.status_code == 401
+
+
+def test_sqlite_pragmas_applied_on_connect():
+    """Test WAL journaling is enabled on application connections"""
+    from database import engine
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+
+def test_login_rehashes_outdated_parameters(auth_client: TestClient, db_engine, local_user):
+    """Test hashes made with old Argon2 costs are upgraded on successful login"""
+    from sqlalchemy.orm import Session
+    from models.local_user import LocalUser
+    from security import PasswordHashPool, make_password_context
+
+    auth_client.app.state.password_pool = PasswordHashPool(
+        make_password_context(time_cost=2, memory_cost=1024, parallelism=1)
+    )
+
+    response = auth_client.post(
+        "/auth/login", json={"email": local_user.email, "password": "correct-password"}
+    )
+
+    assert response.status_code == 200
+    with Session(db_engine) as db:
+        stored = db.query(LocalUser).filter(LocalUser.email == local_user.email).one()
+        assert "m=1024,t=2,p=1" in stored.hashed_password
+
+
+def test_register_returns_503_when_hashing_pool_saturated(auth_client: TestClient):
+    """Test backpressure from the hashing pool surfaces as 503 + Retry-After"""
+    from security import PasswordHashPool, make_password_context
+
+    pool = PasswordHashPool(make_password_context(2, 1024, 1), max_workers=1, max_queue=0)
+    pool._pending = 1  # one job already running, no queue slots left
+    auth_client.app.state.password_pool = pool
+
+    response = auth_client.post(
+        "/auth/register",
+        json={"email": "busy@example.com", "username": "busy", "password": "pw"}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert pool.stats()["rejected"] == 1
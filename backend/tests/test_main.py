@@ -23,3 +23,12 @@ def test_cors_headers(client: TestClient):
     
     # FastAPI automatically handles CORS preflight requests
     assert response.status_code in [200, 405]  # 405 is also acceptable for OPTIONS
+
+
+def test_lifespan_creates_shared_http_client(client: TestClient):
+    """Test a single pooled GitHub client is created for the app"""
+    import httpx
+
+    http_client = client.app.state.http_client
+    assert isinstance(http_client, httpx.AsyncClient)
+    assert not http_client.is_closed
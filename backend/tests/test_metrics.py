@@ -0,0 +1,168 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from cache import TTLCache
+from metrics import Histogram, Metrics, MetricsMiddleware, cache_collector, github_endpoint
+from security import PasswordHashPool, make_password_context
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test histogram samples follow the Prometheus text format"""
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.1, "/a")
+    histogram.observe(3.0, "/a")
+
+    assert histogram.samples() == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 3.15',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_middleware_labels_by_route_template():
+    """Test request latency is labelled with the route template, not the raw path"""
+    metrics = Metrics()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    with TestClient(app) as client:
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/missing")
+
+    output = metrics.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2' in output
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in output
+    assert "http_requests_in_flight 0.0" in output
+
+
+def test_github_client_hooks_record_upstream_latency():
+    """Test upstream calls are timed per normalized endpoint and status"""
+    metrics = Metrics()
+
+    async def scenario():
+        client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(404 if "ghost" in request.url.path else 200)),
+            event_hooks={"request": [metrics.on_github_request], "response": [metrics.on_github_response]},
+        )
+        await client.get("https://api.github.com/users/octo/events/public")
+        await client.get("https://api.github.com/users/ghost/events/public")
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+    assert github_endpoint("/repos/octo/hello/stargazers") == "/repos/{owner}/{repo}/stargazers"
+    output = metrics.render()
+    assert 'github_request_duration_seconds_count{method="GET",endpoint="/users/{user}/events/public",status="200"} 1' in output
+    assert 'github_request_duration_seconds_count{method="GET",endpoint="/users/{user}/events/public",status="404"} 1' in output
+
+
+def test_db_and_hash_timings(tmp_path):
+    """Test SQL statements and Argon2 work are timed by operation"""
+    metrics = Metrics()
+    engine = create_engine(f"sqlite:///{tmp_path}/metrics.db")
+    metrics.instrument_engine(engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    engine.dispose()
+
+    pool = PasswordHashPool(make_password_context(1, 8, 1), max_workers=1, metrics=metrics)
+    asyncio.run(pool.hash("secret"))
+    pool.shutdown()
+
+    output = metrics.render()
+    assert 'db_query_duration_seconds_count{operation="SELECT"} 1' in output
+    assert 'password_hash_duration_seconds_count{operation="hash"} 1' in output
+
+
+def test_failed_statements_are_counted_and_unwound(tmp_path):
+    """Test a statement that raises leaves no stale start time on the connection"""
+    metrics = Metrics()
+    engine = create_engine(f"sqlite:///{tmp_path}/metrics.db")
+    metrics.instrument_engine(engine)
+    with engine.connect() as conn:
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info["metrics_start"] == []
+    engine.dispose()
+
+    output = metrics.render()
+    assert 'db_query_errors_total{operation="SELECT"} 1.0' in output
+    assert 'db_query_duration_seconds_count{operation="SELECT"} 1' in output
+
+
+def test_cache_collector_reports_hit_ratio():
+    """Test cache counters and hit ratio are read at scrape time"""
+    metrics = Metrics()
+    cache = TTLCache(ttl=60)
+    metrics.add_collector(cache_collector("search", lambda: cache))
+    metrics.add_collector(cache_collector("user", lambda: None))
+
+    async def scenario():
+        await cache.set("k", "v")
+        await cache.get("k")
+        await cache.get("k")
+        await cache.get("other")
+
+    asyncio.run(scenario())
+
+    output = metrics.render()
+    assert 'cache_hit_ratio{cache="search"} 0.6666666666666666' in output
+    assert 'cache="user"' not in output
+
+
+def test_collector_families_render_contiguously():
+    """Test samples from several collectors are grouped under one header per family"""
+    metrics = Metrics()
+    metrics.add_collector(cache_collector("search", lambda: TTLCache(ttl=60)))
+    metrics.add_collector(cache_collector("user", lambda: TTLCache(ttl=60)))
+
+    lines = metrics.render().splitlines()
+    for family, kind in (
+        ("cache_hits_total", "counter"),
+        ("cache_misses_total", "counter"),
+        ("cache_stale_served_total", "counter"),
+        ("cache_hit_ratio", "gauge"),
+    ):
+        header = lines.index(f"# TYPE {family} {kind}")
+        family_lines = [i for i, line in enumerate(lines) if line.startswith(family)]
+        assert family_lines == [header + 1, header + 2]
+        assert lines[header + 1].startswith(f'{family}{{cache="search"}} ')
+        assert lines[header + 2].startswith(f'{family}{{cache="user"}} ')
+
+
+def test_metrics_endpoint_disabled_by_default(client: TestClient):
+    """Test /metrics is not served unless metrics are enabled"""
+    assert client.get("/metrics").status_code == 404
+
+
+def test_upstream_collector_reports_circuits():
+    """Test retry counters and breaker state are exported from the GitHub transport"""
+    from github_resilience import ResilientTransport
+    from metrics import upstream_collector
+
+    metrics = Metrics()
+    transport = ResilientTransport(httpx.MockTransport(lambda request: httpx.Response(500)), retry_attempts=0, failure_threshold=1)
+    client = httpx.AsyncClient(transport=transport)
+    metrics.add_collector(upstream_collector(lambda: client))
+
+    async def scenario():
+        await client.get("https://api.github.com/search/repositories")
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+    output = metrics.render()
+    assert "github_retries_total 0" in output
+    assert 'github_circuit_open{group="search"} 1' in output
@@ -0,0 +1,89 @@
+import asyncio
+from principal import PrincipalResolver
+from security import create_access_token
+
+
+def test_local_token_resolved_once(db_session_factory, local_user):
+    """Test repeated resolutions of a local JWT hit the cache, not the database"""
+    resolver = PrincipalResolver(session_factory=db_session_factory)
+    token = create_access_token({"sub": local_user.email, "type": "local"})
+
+    async def scenario():
+        first = await resolver.resolve(f"Bearer {token}")
+        second = await resolver.resolve(f"Bearer {token}")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.kind == "local"
+    assert first.github_token == "gho_linked_token"
+    assert second is first
+    assert resolver.lookups == 1
+
+
+def test_invalidate_email_reloads_linked_token(db_engine, db_session_factory, local_user):
+    """Test re-linking a GitHub account is picked up immediately"""
+    from sqlalchemy.orm import Session
+    from models.local_user import LocalUser
+
+    resolver = PrincipalResolver(session_factory=db_session_factory)
+    token = create_access_token({"sub": local_user.email, "type": "local"})
+
+    async def scenario():
+        await resolver.resolve(f"Bearer {token}")
+        with Session(db_engine) as db:
+            db.query(LocalUser).filter(LocalUser.email == local_user.email).update(
+                {"github_token": "gho_new_token"}
+            )
+            db.commit()
+        await resolver.invalidate_email(local_user.email)
+        return await resolver.resolve(f"Bearer {token}")
+
+    assert asyncio.run(scenario()).github_token == "gho_new_token"
+    assert resolver.lookups == 2
+
+
+def test_non_jwt_and_missing_tokens():
+    """Test GitHub tokens pass through and missing headers are anonymous"""
+    resolver = PrincipalResolver()
+
+    github = asyncio.run(resolver.resolve("Bearer gho_plain"))
+    anonymous = asyncio.run(resolver.resolve(None))
+
+    assert (github.kind, github.github_token) == ("github", "gho_plain")
+    assert (anonymous.kind, anonymous.github_token) == ("anonymous", None)
+
+
+def test_verifier_caches_claims_until_exp(db_session_factory, local_user):
+    """Test a local JWT is signature-checked once while its claims are cached"""
+    from principal import TokenVerifier
+
+    now = [1000.0]
+    verifier = TokenVerifier(clock=lambda: now[0])
+    resolver = PrincipalResolver(ttl=0.001, session_factory=db_session_factory, verifier=verifier)
+    token = create_access_token({"sub": local_user.email, "type": "local"})
+
+    async def scenario():
+        first = await resolver.resolve(f"Bearer {token}")
+        await asyncio.sleep(0.01)  # principal entry expired, claims still cached
+        second = await resolver.resolve(f"Bearer {token}")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.kind == second.kind == "local"
+    assert verifier.verifications == 1
+    assert resolver.lookups == 2
+
+
+def test_verifier_skips_github_tokens():
+    """Test tokens that aren't JWT-shaped never reach the decoder"""
+    from principal import TokenVerifier
+
+    verifier = TokenVerifier()
+    resolver = PrincipalResolver(verifier=verifier)
+
+    assert asyncio.run(verifier.verify("gho_plain")) is None
+    assert asyncio.run(resolver.resolve("Bearer ghp_abc123")).kind == "github"
+    assert asyncio.run(resolver.resolve("Bearer not.a.jwt")).kind == "github"
+    assert verifier.verifications == 0
@@ -0,0 +1,95 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from github_ratelimit import RateLimitManager
+
+
+def make_manager(now=1000.0, **kwargs):
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    manager = RateLimitManager(clock=lambda: now, sleep=fake_sleep, **kwargs)
+    return manager, slept
+
+
+def test_record_reads_rate_limit_headers():
+    """Test budgets are learned from X-RateLimit headers"""
+    manager, _ = make_manager()
+    manager.record("ghp_secret", "search", httpx.Headers({
+        "X-RateLimit-Limit": "30",
+        "X-RateLimit-Remaining": "12",
+        "X-RateLimit-Reset": "1060",
+        "X-RateLimit-Resource": "search",
+    }))
+
+    budget = manager.budget("ghp_secret", "search")
+    assert (budget.limit, budget.remaining, budget.reset_at) == (30, 12, 1060.0)
+    assert "ghp_secret" not in str(manager.snapshot())
+
+
+def test_acquire_delays_until_reset_when_soon():
+    """Test an exhausted budget that resets shortly is queued, not failed"""
+    manager, slept = make_manager(max_delay=5)
+    manager.record(None, "search", httpx.Headers({
+        "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": "1003",
+    }))
+
+    asyncio.run(manager.acquire(None, "search"))
+
+    assert slept == [3.0]
+    assert manager.delayed == 1
+
+
+def test_acquire_sheds_when_reset_is_far():
+    """Test requests are shed with Retry-After before hitting GitHub's wall"""
+    manager, _ = make_manager(max_delay=5)
+    manager.record(None, "search", httpx.Headers({"Retry-After": "60"}), status_code=403)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(manager.acquire(None, "search"))
+
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "61"
+    assert manager.shed == 1
+
+
+def test_acquire_reserves_budget_locally():
+    """Test concurrent acquisitions draw down the known budget"""
+    manager, _ = make_manager(reserve=1, max_delay=0)
+    manager.record(None, "core", httpx.Headers({
+        "X-RateLimit-Remaining": "2",
+        "X-RateLimit-Reset": "2000",
+    }))
+
+    asyncio.run(manager.acquire(None, "core"))
+    with pytest.raises(HTTPException):
+        asyncio.run(manager.acquire(None, "core"))
+
+
+def test_pick_server_token_prefers_most_budget():
+    """Test anonymous searches are spread to the server token with most headroom"""
+    manager, _ = make_manager(server_tokens=["a", "b"])
+    manager.record("a", "search", httpx.Headers({"X-RateLimit-Remaining": "3"}))
+    manager.record("b", "search", httpx.Headers({"X-RateLimit-Remaining": "20"}))
+
+    assert manager.pick_server_token("search") == "b"
+    assert RateLimitManager().pick_server_token("search") is None
+
+
+def test_caller_budgets_are_bounded_and_aggregated():
+    """Test made-up tokens can't grow the table or show up individually in the snapshot"""
+    manager, _ = make_manager(max_buckets=3, server_tokens=["ghs_server"])
+    for token in (None, "ghs_server"):
+        manager.record(token, "search", httpx.Headers({"X-RateLimit-Remaining": "5"}))
+    for i in range(10):
+        manager.record(f"gho_random_{i}", "search", httpx.Headers({"X-RateLimit-Remaining": "0", "Retry-After": "60"}))
+
+    snapshot = manager.snapshot()
+
+    assert [budget["bucket"] for budget in snapshot["budgets"]] == ["anonymous", "server:0"]
+    assert snapshot["caller_tokens"] == {"search": {"tracked": 1, "exhausted": 1}}
+    assert manager.budget(None, "search").remaining == 5
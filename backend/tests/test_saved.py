@@ -0,0 +1,136 @@
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from github_ratelimit import RateLimitManager
+from config import get_settings
+from saved_repos import SavedRepositoryRefresher, star_query
+from security import create_access_token
+
+
+def repo(repo_id: int, stars: int = 10) -> dict:
+    return {
+        "id": repo_id,
+        "name": f"repo-{repo_id}",
+        "full_name": f"octo/repo-{repo_id}",
+        "description": "Saved répo",
+        "html_url": f"https://github.com/octo/repo-{repo_id}",
+        "stargazers_count": stars,
+        "forks_count": 1,
+        "language": "Python",
+        "updated_at": "2024-01-01T00:00:00Z",
+        "owner": {"login": "octo", "avatar_url": "https://github.com/octo.png"},
+    }
+
+
+@pytest.fixture
+def saved_client(client: TestClient, db_session_factory, local_user):
+    """Client bound to the per-test database with a local user's token"""
+    from database import get_async_db
+
+    async def override_get_async_db():
+        async with db_session_factory() as db:
+            yield db
+
+    client.app.dependency_overrides[get_async_db] = override_get_async_db
+    token = create_access_token({"sub": local_user.email})
+    client.params = {"authorization": f"Bearer {token}"}
+    return client
+
+
+def get_saved(client: TestClient, since: int = 0) -> dict:
+    return client.get("/api/saved", params={**client.params, "since": since}).json()
+
+
+def test_sync_returns_only_unseen_changes(saved_client: TestClient):
+    """Test two devices converge by exchanging versions instead of full lists"""
+    first = saved_client.post("/api/saved/sync", json={"since": 0, "upserts": [repo(1), repo(2)]}).json()
+    assert first["version"] == 1
+    assert [change["repo_id"] for change in first["changes"]] == [1, 2]
+
+    # A replay of the same items is not a change
+    replay = saved_client.post("/api/saved/sync", json={"since": 1, "upserts": [repo(1)]}).json()
+    assert replay == {"version": 1, "changes": []}
+
+    # A second device removes one repo and updates another
+    second = saved_client.post(
+        "/api/saved/sync", json={"since": 1, "upserts": [repo(2, stars=99)], "deletes": [1]}
+    ).json()
+    assert second["version"] == 2
+    assert {(c["repo_id"], c["deleted"]) for c in second["changes"]} == {(1, True), (2, False)}
+
+    # The first device catches up from version 1; a fresh device skips tombstones
+    delta = get_saved(saved_client, since=1)
+    assert len(delta["changes"]) == 2
+    full = get_saved(saved_client)
+    assert [c["repository"]["stargazers_count"] for c in full["changes"]] == [99]
+    assert get_saved(saved_client, since=2) == {"version": 2, "changes": []}
+
+
+def test_saved_requires_local_account(client: TestClient):
+    """Test anonymous callers and unlinked GitHub tokens cannot sync"""
+    assert client.get("/api/saved").status_code == 401
+    assert client.get("/api/saved?authorization=Bearer gho_unlinked").status_code == 403
+
+
+def test_star_query_batches_with_aliases():
+    """Test many repositories are fetched in one query without string interpolation"""
+    query, variables = star_query(["octo/a", "octo/b"])
+    assert "r0: repository(owner: $o0, name: $n0)" in query
+    assert "r1: repository(owner: $o1, name: $n1)" in query
+    assert variables == {"o0": "octo", "n0": "a", "o1": "octo", "n1": "b"}
+
+
+def test_refresh_updates_counts_and_bumps_versions(saved_client: TestClient, db_session_factory):
+    """Test the refresh job makes one call per batch and only versions changed rows"""
+    saved_client.post("/api/saved/sync", json={"upserts": [repo(1), repo(2), repo(3)]})
+    requests = []
+
+    # repo-1 gained stars, repo-2 is unchanged and repo-3 was deleted upstream
+    stars = {"repo-1": 500, "repo-2": 10, "repo-3": None}
+
+    def github(request: httpx.Request) -> httpx.Response:
+        variables = json.loads(request.content)["variables"]
+        requests.append(variables)
+        data = {}
+        for i in range(len(variables) // 2):
+            count = stars[variables[f"n{i}"]]
+            data[f"r{i}"] = None if count is None else {"stargazerCount": count, "forkCount": 1}
+        return httpx.Response(200, json={"data": data})
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(github))
+        refresher = SavedRepositoryRefresher(
+            client, get_settings(), RateLimitManager(server_tokens=["ghp_server"]),
+            session_factory=db_session_factory, batch_size=2,
+        )
+        updated = await refresher.refresh_all()
+        await client.aclose()
+        return updated
+
+    assert asyncio.run(scenario()) == 1
+    assert len(requests) == 2
+
+    delta = get_saved(saved_client, since=1)
+    assert delta["version"] == 2
+    assert [(c["repo_id"], c["repository"]["stargazers_count"]) for c in delta["changes"]] == [(1, 500)]
+
+    # Counts written by the job compare equal to what the client would send back
+    replay = saved_client.post("/api/saved/sync", json={"since": 2, "upserts": [repo(1, stars=500)]}).json()
+    assert replay["changes"] == []
+
+
+def test_concurrent_syncs_get_distinct_versions(db_session_factory, local_user):
+    """Test simultaneous syncs for one user never share a version"""
+    from models.repository import Repository
+    from saved_repos import apply_changes
+
+    async def sync(repo_id: int) -> int:
+        async with db_session_factory() as db:
+            return await apply_changes(db, local_user.id, [Repository(**repo(repo_id))], [])
+
+    async def scenario():
+        return await asyncio.gather(*(sync(repo_id) for repo_id in range(1, 6)))
+
+    assert sorted(asyncio.run(scenario())) == [1, 2, 3, 4, 5]
@@ -0,0 +1,106 @@
+import asyncio
+from models.repository import Repository
+from models.searchrequest import SearchRequest
+from search_index import SearchIndex, match_expression
+
+
+def make_repository(repo_id: int, name: str, description: str = None, stars: int = 0,
+                    forks: int = 0, language: str = "Python") -> Repository:
+    return Repository(
+        id=repo_id,
+        name=name,
+        full_name=f"owner/{name}",
+        description=description,
+        html_url=f"https://github.com/owner/{name}",
+        stargazers_count=stars,
+        forks_count=forks,
+        language=language,
+        updated_at=f"2024-01-{repo_id:02d}T00:00:00Z",
+        owner={"login": "owner", "avatar_url": "https://github.com/owner.png"},
+    )
+
+
+REPOSITORIES = [
+    make_repository(1, "fastapi", "Modern web framework for building APIs", stars=70000, forks=6000),
+    make_repository(2, "flask", "Lightweight web framework", stars=65000, forks=16000),
+    make_repository(3, "express", "Fast web framework for node", stars=63000, forks=13000, language="JavaScript"),
+    make_repository(4, "httpx", "Async HTTP client", stars=12000, forks=800),
+]
+
+
+def test_match_expression_skips_qualifiers():
+    """Test free-text terms become prefix matches and qualifiers are dropped"""
+    assert match_expression("Web  framework language:python") == '"web"* "framework"*'
+    assert match_expression("stars:>10") is None
+
+
+def test_local_search_filters_and_sorts(tmp_path):
+    """Test local answers honor language/min_stars filters and sort order"""
+    async def scenario():
+        index = SearchIndex(str(tmp_path / "index.db"))
+        await index.ingest(REPOSITORIES)
+
+        by_stars = await index.search(SearchRequest(q="web framework"))
+        python_only = await index.search(SearchRequest(q="framework", language="python"))
+        by_forks = await index.search(SearchRequest(q="framework", sort="forks", order="asc"))
+        popular = await index.search(SearchRequest(q="framework", min_stars=64000))
+        missing = await index.search(SearchRequest(q="kubernetes"))
+        stats = await index.stats()
+        await index.close()
+        return by_stars, python_only, by_forks, popular, missing, stats
+
+    by_stars, python_only, by_forks, popular, missing, stats = asyncio.run(scenario())
+
+    assert [repo.name for repo in by_stars.items] == ["fastapi", "flask", "express"]
+    assert by_stars.total_count == 3
+    assert [repo.name for repo in python_only.items] == ["fastapi", "flask"]
+    assert [repo.name for repo in by_forks.items] == ["fastapi", "express", "flask"]
+    assert [repo.name for repo in popular.items] == ["fastapi", "flask"]
+    assert missing.total_count == 0
+    assert stats == {"repositories": 4, "hits": 4, "misses": 1, "ingested": 4}
+
+
+def test_local_search_ranks_by_relevance_without_sort(tmp_path):
+    """Test bm25 ranks name matches above description matches for best-match queries"""
+    async def scenario():
+        index = SearchIndex(str(tmp_path / "index.db"))
+        await index.ingest([
+            make_repository(1, "awesome-lists", "A list of httpx plugins", stars=90000),
+            make_repository(2, "httpx", "Async HTTP client", stars=10),
+        ])
+        response = await index.search(SearchRequest(q="httpx", sort="best-match"))
+        await index.close()
+        return response
+
+    response = asyncio.run(scenario())
+
+    assert [repo.name for repo in response.items] == ["httpx", "awesome-lists"]
+
+
+def test_reingest_updates_and_prunes(tmp_path):
+    """Test re-ingested repositories are updated in place and the oldest are pruned"""
+    now = [1000.0]
+
+    async def scenario():
+        index = SearchIndex(str(tmp_path / "index.db"), max_repositories=3, clock=lambda: now[0])
+        await index.ingest(REPOSITORIES[:1])
+        now[0] += 1
+        await index.ingest(REPOSITORIES[1:3])
+        now[0] += 1
+        await index.ingest([make_repository(2, "flask", "Renamed microframework", stars=1)])
+        now[0] += 1
+        await index.ingest(REPOSITORIES[3:])
+
+        old_text = await index.search(SearchRequest(q="lightweight"))
+        new_text = await index.search(SearchRequest(q="microframework"))
+        pruned = await index.search(SearchRequest(q="fastapi"))
+        count = (await index.stats())["repositories"]
+        await index.close()
+        return old_text, new_text, pruned, count
+
+    old_text, new_text, pruned, count = asyncio.run(scenario())
+
+    assert old_text.total_count == 0
+    assert new_text.items[0].stargazers_count == 1
+    assert pruned.total_count == 0
+    assert count == 3
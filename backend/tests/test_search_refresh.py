@@ -0,0 +1,152 @@
+import asyncio
+import httpx
+from cache import TTLCache
+from config import get_settings
+from github_ratelimit import RateLimitManager
+from github_search import search_cache_key
+from models.searchrequest import SearchRequest
+from search_refresh import HotKeyTracker, SearchRefresher
+from search_service import SearchService
+from singleflight import SingleFlight
+
+
+def test_hot_key_tracker_ranks_and_decays():
+    """Test the most requested keys are reported first and cold keys decay away"""
+    tracker = HotKeyTracker()
+    for _ in range(3):
+        tracker.record("react", SearchRequest(q="react"))
+    tracker.record("vue", SearchRequest(q="vue"))
+
+    assert [key for key, _ in tracker.top(1)] == ["react"]
+
+    tracker.decay()
+    assert [key for key, _ in tracker.top(5)] == ["react", "vue"]
+    tracker.decay()
+    assert [key for key, _ in tracker.top(5)] == ["react"]
+
+
+def test_refresh_hot_keys_prefetches_expiring_entries():
+    """Test hot keys close to expiry are refreshed before users see them stale"""
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.params["q"])
+        return httpx.Response(200, json={"total_count": 5, "incomplete_results": False, "items": []})
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        cache = TTLCache(ttl=5)
+        refresher = SearchRefresher(client, get_settings(), cache, SingleFlight(), hot_keys=5)
+
+        params = SearchRequest(q="react")
+        key = search_cache_key(params)
+        refresher.track(key, params, None)
+        refresher.track("ignored", SearchRequest(q="private"), "user-token")
+
+        await refresher.refresh_hot_keys(refresh_ahead=10)
+        await asyncio.gather(*refresher._tasks)
+        await client.aclose()
+        return await cache.get(key)
+
+    cached = asyncio.run(scenario())
+
+    assert requested == ["react"]
+    assert cached.total_count == 5
+
+
+def make_search_service(handler):
+    rate_limits = RateLimitManager()
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler),
+        event_hooks={"response": [rate_limits.on_response]},
+    )
+    cache = TTLCache(ttl=60)
+    flight = SingleFlight()
+    refresher = SearchRefresher(client, get_settings(), cache, flight, rate_limits, prefetch_min_remaining=10)
+    return SearchService(client, get_settings(), cache, flight, rate_limits, refresher)
+
+
+def test_next_page_is_prefetched_and_counted_as_hit():
+    """Test page N+1 is fetched in the background and served from cache when requested"""
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(int(request.url.params["page"]))
+        return httpx.Response(
+            200,
+            headers={"x-ratelimit-remaining": "25", "x-ratelimit-limit": "30"},
+            json={"total_count": 60, "incomplete_results": False, "items": []},
+        )
+
+    async def scenario():
+        service = make_search_service(handler)
+        await service.search(SearchRequest(q="react", per_page=30))
+        await asyncio.gather(*service.refresher._tasks)
+        await service.search(SearchRequest(q="react", page=2, per_page=30))
+        await service.client.aclose()
+        return service.refresher.stats()["prefetch"]
+
+    prefetch = asyncio.run(scenario())
+
+    # Page 2 is the last page, so nothing further is prefetched
+    assert requested == [1, 2]
+    assert prefetch == {"issued": 1, "hits": 1, "skipped_budget": 0, "hit_ratio": 1.0}
+
+
+def test_prefetch_skipped_when_budget_low():
+    """Test prefetching never spends the last of a token's search quota"""
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(int(request.url.params["page"]))
+        return httpx.Response(
+            200,
+            headers={"x-ratelimit-remaining": "8", "x-ratelimit-limit": "30"},
+            json={"total_count": 500, "incomplete_results": False, "items": []},
+        )
+
+    async def scenario():
+        service = make_search_service(handler)
+        await service.search(SearchRequest(q="react"))
+        await service.client.aclose()
+        return service.refresher.stats()["prefetch"]
+
+    prefetch = asyncio.run(scenario())
+
+    assert requested == [1]
+    assert prefetch["issued"] == 0
+    assert prefetch["skipped_budget"] == 1
+
+
+def test_anonymous_prefetch_with_server_token_feeds_index():
+    """Test a prefetch sent with a server token still counts as anonymous"""
+    tokens = []
+    ingested = []
+
+    class RecordingIndex:
+        async def ingest(self, items):
+            ingested.append(len(items))
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        tokens.append(request.headers.get("authorization"))
+        return httpx.Response(
+            200,
+            headers={"x-ratelimit-remaining": "25", "x-ratelimit-limit": "30"},
+            json={"total_count": 60, "incomplete_results": False, "items": []},
+        )
+
+    async def scenario():
+        rate_limits = RateLimitManager(server_tokens=["server-token"])
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        refresher = SearchRefresher(
+            client, get_settings(), TTLCache(ttl=60), SingleFlight(), rate_limits, index=RecordingIndex()
+        )
+        params = SearchRequest(q="react", page=2, per_page=30)
+        issued = refresher.prefetch(search_cache_key(params), params)
+        await asyncio.gather(*refresher._tasks)
+        await client.aclose()
+        return issued
+
+    assert asyncio.run(scenario()) is True
+    assert tokens == ["Bearer server-token"]
+    assert ingested == [0]
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """Test identical concurrent calls run the work once"""
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"total_count": 1}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 4}
+
+
+def test_errors_propagate_to_every_waiter():
+    """Test an upstream HTTPException reaches all waiters"""
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=403, detail="API rate limit exceeded")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(flight.do("k", work) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(r, HTTPException) and r.status_code == 403 for r in results)
+
+
+def test_leader_cancellation_does_not_cancel_waiters():
+    """Test a disconnecting leader leaves the shared call running"""
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+    assert flight.in_flight() == 0
@@ -12,73 +12,38 @@ export function Analytics() {
     const fetchUserStats = useCallback(async () => {
         setLoading(true);
         try {
+            const backendUrl = import.meta.env.VITE_BACKEND_URL || 'http://localhost:8000';
             const token = localStorage.getItem('github_token');
-            
-            // Fetch user repos
-            const reposRes = await fetch(`https://api.github.com/user/repos?per_page=100`, {
-                headers: { Authorization: `Bearer ${token}` }
-            });
-            const repos = await reposRes.json();
-
-            // Fetch user events for activity
-            const eventsRes = await fetch(`https://api.github.com/users/${user.login}/events/public?per_page=100`, {
-                headers: { Authorization: `Bearer ${token}` }
-            });
-            const events = await eventsRes.json();
-
-            // Calculate stats
-            const totalStars = repos.reduce((sum, repo) => sum + repo.stargazers_count, 0);
-            const totalForks = repos.reduce((sum, repo) => sum + repo.forks_count, 0);
-            const languages = {};
-            
-            repos.forEach(repo => {
-                if (repo.language) {
-                    languages[repo.language] = (languages[repo.language] || 0) + 1;
-                }
-            });
-
-            const topLanguages = Object.entries(languages)
-                .sort((a, b) => b[1] - a[1])
-                .slice(0, 5);
-
-            const topRepos = repos
-                .sort((a, b) => b.stargazers_count - a.stargazers_count)
-                .slice(0, 5);
 
-            // Calculate activity stats
-            const commitEvents = events.filter(e => e.type === 'PushEvent');
-            const totalCommits = commitEvents.reduce((sum, e) => sum + (e.payload.commits?.length || 0), 0);
-            
-            // Activity heatmap (last 30 days)
-            const activityMap = {};
-            const thirtyDaysAgo = new Date();
-            thirtyDaysAgo.setDate(thirtyDaysAgo.getDate() - 30);
-            
-            events.forEach(event => {
-                const date = new Date(event.created_at).toDateString();
-                if (new Date(event.created_at) >= thirtyDaysAgo) {
-                    activityMap[date] = (activityMap[date] || 0) + 1;
-                }
+            // Aggregates are computed (and cached) by the backend
+            const response = await fetch(`${backendUrl}/api/analytics`, {
+                headers: {
+                    Authorization: `Bearer ${token}`,
+                },
             });
+            if (!response.ok) {
+                throw new Error('Failed to fetch analytics');
+            }
+            const data = await response.json();
 
             setStats({
-                totalRepos: repos.length,
-                totalStars,
-                totalForks,
-                topLanguages,
-                topRepos,
-                publicRepos: repos.filter(r => !r.private).length,
-                privateRepos: repos.filter(r => r.private).length,
-                totalCommits,
-                recentActivity: Object.entries(activityMap).length,
-                activityMap
+                totalRepos: data.total_repos,
+                totalStars: data.total_stars,
+                totalForks: data.total_forks,
+                topLanguages: data.top_languages,
+                topRepos: data.top_repositories,
+                publicRepos: data.public_repos,
+                privateRepos: data.private_repos,
+                totalCommits: data.total_commits,
+                recentActivity: data.active_days,
+                activityMap: data.activity
             });
         } catch (err) {
             console.error('Error fetching stats:', err);
         } finally {
             setLoading(false);
         }
-    }, [user?.login]);
+    }, []);
 
     useEffect(() => {
         if (user) {
@@ -36,6 +36,17 @@ export function AuthProvider({ children }) {
   };
 
   const logout = () => {
+    const token = localStorage.getItem('github_token');
+    if (token) {
+      // Let the backend drop its cached profile for this token
+      const backendUrl = import.meta.env.VITE_BACKEND_URL || 'http://localhost:8000';
+      fetch(`${backendUrl}/auth/logout`, {
+        method: 'POST',
+        headers: { Authorization: `Bearer ${token}` },
+        redirect: 'manual',
+        keepalive: true,
+      }).catch(() => {});
+    }
     localStorage.removeItem('github_token');
     localStorage.removeItem('github_user');
     setUser(null);